@@ -0,0 +1,90 @@
+import asyncio
+
+
+class AsyncStore:
+    """
+    An asyncio facade of a Store for checkout services running on an event loop.
+
+    Orders arriving in the same iteration of the event loop are processed
+    together: they are validated first come, first served and the stock of
+    every product is updated once for the whole batch.
+
+    :param store: The Store to be wrapped.
+    """
+
+    def __init__(self, store):
+        self._store = store
+        self._pending_orders = []
+        self._flush_scheduled = False
+
+    @property
+    def store(self):
+        """Get the wrapped store."""
+        return self._store
+
+    async def order(self, shopping_list):
+        """
+        Processes an order together with the other orders of the same loop iteration.
+
+        :param shopping_list: List of tuples (product, quantity) to purchase.
+        :return: Total price of the order.
+        :raises TypeError: If a quantity is not an integer.
+        :raises ValueError: If there is not enough stock to fulfill the order or if a product is not found.
+        """
+        loop = asyncio.get_running_loop()
+        result = loop.create_future()
+        self._pending_orders.append((shopping_list, result))
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            loop.call_soon(self._flush_orders)
+        return await result
+
+    def _flush_orders(self):
+        """Processes all pending orders as one batch."""
+        # Orders nobody waits for anymore are not bought
+        pending_orders = [(shopping_list, future) for shopping_list, future in self._pending_orders
+                          if not future.cancelled()]
+        self._pending_orders = []
+        self._flush_scheduled = False
+        if not pending_orders:
+            return
+
+        try:
+            results = self._store.order_many([shopping_list for shopping_list, _ in pending_orders])
+        except Exception as error:
+            # Unexpected errors fail the whole batch instead of leaving its orders waiting forever
+            for _, future in pending_orders:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        for (_, future), result in zip(pending_orders, results):
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    async def quote(self, carts):
+        """
+        Prices a batch of carts without changing any stock, outside the event loop.
+
+        :param carts: List of shopping lists, each a list of tuples (product, quantity).
+        :return: List with a tuple (line totals, cart total) per cart.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self._store.quote, carts)
+
+    async def add_product(self, products):
+        """
+        Adds products to the store inventory.
+
+        :param products: List of products to be added to the store.
+        """
+        self._store.add_product(products)
+
+    async def remove_product(self, product):
+        """
+        Removes a product from the store inventory.
+
+        :param product: The product to be removed.
+        """
+        self._store.remove_product(product)
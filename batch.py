@@ -0,0 +1,101 @@
+import json
+import math
+from time import perf_counter
+
+
+def _shopping_list(store_obj, lines, products_by_name):
+    """
+    Resolves the lines of an order record to a shopping list.
+
+    :param store_obj: Store the order is placed in.
+    :param lines: List of [product id or name, quantity] pairs.
+    :param products_by_name: Dictionary mapping product names to products.
+    :return: List of tuples (product, quantity).
+    :raises ValueError: If a product is not found.
+    """
+    shopping_list = []
+    for product_key, quantity in lines:
+        if isinstance(product_key, str):
+            product = products_by_name.get(product_key)
+        else:
+            product = store_obj.product_by_id(product_key)
+        if product is None:
+            raise ValueError(f"Product {product_key} not in store")
+        shopping_list.append((product, quantity))
+    return shopping_list
+
+
+def percentile(sorted_values, share):
+    """
+    Get a percentile of sorted values by the nearest rank method.
+
+    :param sorted_values: List of values sorted in increasing order.
+    :param share: Share of the values at or below the percentile, e.g. 0.99.
+    :return: The percentile or 0.0 for no values.
+    """
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(math.ceil(share * len(sorted_values)), 1) - 1]
+
+
+def process_orders(store_obj, order_file, output, buffer_size=1_000):
+    """
+    Places the orders of a JSON lines stream and writes a result record per order.
+
+    Every order line is {"lines": [[product id or name, quantity], ...]}.
+    Result records are {"order": number, "ok": true, "total": price, "seconds": latency}
+    or {"order": number, "ok": false, "error": message}, written buffer_size at a time.
+
+    :param store_obj: Store the orders are placed in.
+    :param order_file: Text stream of order lines.
+    :param output: Text stream the result records are written to.
+    :param buffer_size: Number of result records written together.
+    :return: Summary dictionary with the numbers of orders, accepted and rejected orders,
+             the seconds, orders per second and latency percentiles of the accepted orders in seconds.
+    """
+    products_by_name = {product.name: product for product in store_obj}
+    latencies = []
+    records = []
+    order_count = rejected_count = 0
+    start = perf_counter()
+    for line in order_file:
+        if not line.strip():
+            continue
+        order_count += 1
+        order_start = perf_counter()
+        try:
+            shopping_list = _shopping_list(store_obj, json.loads(line)["lines"], products_by_name)
+            total_price = store_obj.order(shopping_list)
+        except (ValueError, TypeError, KeyError) as error:
+            rejected_count += 1
+            records.append(json.dumps({"order": order_count, "ok": False, "error": str(error)}))
+        else:
+            latency = perf_counter() - order_start
+            latencies.append(latency)
+            records.append(json.dumps({"order": order_count, "ok": True, "total": total_price, "seconds": latency}))
+        if len(records) >= buffer_size:
+            output.write("\n".join(records) + "\n")
+            records = []
+    if records:
+        output.write("\n".join(records) + "\n")
+    output.flush()
+
+    seconds = perf_counter() - start
+    latencies.sort()
+    return {"orders": order_count, "accepted": order_count - rejected_count, "rejected": rejected_count,
+            "seconds": seconds, "orders_per_second": order_count / seconds if seconds > 0 else 0.0,
+            "p50": percentile(latencies, 0.5), "p90": percentile(latencies, 0.9),
+            "p99": percentile(latencies, 0.99), "max": latencies[-1] if latencies else 0.0}
+
+
+def format_summary(summary):
+    """
+    Formats the summary of process_orders for the operator.
+
+    :param summary: Summary dictionary returned by process_orders.
+    :return: Text of the summary.
+    """
+    return (f"{summary['orders']} orders ({summary['accepted']} accepted, {summary['rejected']} rejected) "
+            f"in {summary['seconds']:.2f}s, {summary['orders_per_second']:,.0f} orders/s\n"
+            f"latency p50 {summary['p50'] * 1e6:.0f}us, p90 {summary['p90'] * 1e6:.0f}us, "
+            f"p99 {summary['p99'] * 1e6:.0f}us, max {summary['max'] * 1e6:.0f}us")
@@ -0,0 +1,710 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import threading
+import timeit
+import tracemalloc
+
+from async_store import AsyncStore
+from price_cache import PriceCache
+from product_table import ProductTable
+from products import Product, LimitedProduct
+from importer import import_catalog
+from journal import Journal
+from metrics import Metrics
+from sqlite_store import SqliteStore
+from simulation import write_order_log, replay_parallel, replay_sequential
+from rules import RulesEngine
+from stock_index import LowStockIndex
+from snapshot import save_snapshot, load_snapshot, load_store
+from promotions import SecondHalfPrice, ThirdOneFree, PercentDiscount
+from store import Store
+
+
+def make_products(size, start=0):
+    """
+    Creates a catalog of products for benchmarking.
+
+    :param size: Number of products to create.
+    :param start: Number of the first product.
+    :return: List of products.
+    """
+    return [Product(f"Product {number}", price=number % 500 + 1, quantity=1000)
+            for number in range(start, start + size)]
+
+
+def bench_store_lookup(sizes=(1_000, 10_000, 100_000), repeat=200):
+    """
+    Compares membership checks of the store index against a linear list scan.
+
+    :param sizes: Catalog sizes to benchmark.
+    :param repeat: Number of lookups per measurement.
+    """
+    print("Store lookup (seconds per lookup)")
+    for size in sizes:
+        products_list = make_products(size)
+        best_buy = Store(list(products_list))
+        # Last product is the worst case of a linear scan
+        product = products_list[-1]
+        scan_time = timeit.timeit(lambda: any(prod is product for prod in products_list), number=repeat) / repeat
+        index_time = timeit.timeit(lambda: product in best_buy, number=repeat) / repeat
+        print(f"{size:>9} products: list scan {scan_time:.2e}, index {index_time:.2e}, "
+              f"speedup x{scan_time / index_time:.0f}")
+
+
+def bench_bulk_order(line_counts=(1_000, 10_000), catalog_size=1_000):
+    """
+    Measures the time of processing orders with many lines.
+
+    :param line_counts: Numbers of order lines to benchmark.
+    :param catalog_size: Number of products in the store.
+    """
+    print("Bulk order (seconds per order)")
+    for line_count in line_counts:
+        products_list = make_products(catalog_size)
+        for product in products_list:
+            product.quantity = line_count
+        best_buy = Store(products_list)
+        shopping_list = [(products_list[line % catalog_size], 1) for line in range(line_count)]
+        order_time = timeit.timeit(lambda: best_buy.order(shopping_list), number=1)
+        print(f"{line_count:>9} lines: {order_time:.2e}")
+
+
+def bench_promotions(quantities=(1_000, 100_000, 1_000_000)):
+    """
+    Compares the closed form promotion prices against pricing every item in a loop.
+
+    :param quantities: Purchased quantities to benchmark.
+    """
+    print("Promotions (seconds per price)")
+    product = Product("Cable", price=9.99, quantity=max(quantities))
+
+    def loop_second_half_price(quantity):
+        return sum(0.5 * product.price if count % 2 == 0 else product.price for count in range(1, quantity + 1))
+
+    def loop_third_one_free(quantity):
+        return sum(0 if count % 3 == 0 else product.price for count in range(1, quantity + 1))
+
+    for promotion, loop_price in [(SecondHalfPrice("Second Half price!"), loop_second_half_price),
+                                  (ThirdOneFree("Third One Free!"), loop_third_one_free)]:
+        for quantity in quantities:
+            loop_time = timeit.timeit(lambda: loop_price(quantity), number=1)
+            closed_time = timeit.timeit(lambda: promotion.apply_promotion(product, quantity), number=100) / 100
+            print(f"{type(promotion).__name__:>16} x{quantity:<9} loop {loop_time:.2e}, closed form {closed_time:.2e}")
+
+
+def bench_quote(cart_count=10_000, cart_size=5, catalog_size=1_000):
+    """
+    Compares quoting a batch of carts against pricing every cart on its own.
+
+    :param cart_count: Number of carts in the batch.
+    :param cart_size: Number of lines per cart.
+    :param catalog_size: Number of products in the store.
+    """
+    print("Batch quote (seconds per batch)")
+    products_list = make_products(catalog_size)
+    promotions = [None, SecondHalfPrice("Second Half price!"), ThirdOneFree("Third One Free!")]
+    for number, product in enumerate(products_list):
+        if promotions[number % 3] is not None:
+            product.promotion = promotions[number % 3]
+    best_buy = Store(products_list)
+    carts = [[(products_list[(cart * 7 + line * 13) % catalog_size], line + 1) for line in range(cart_size)]
+             for cart in range(cart_count)]
+    single_time = timeit.timeit(lambda: [best_buy.quote([cart]) for cart in carts], number=1)
+    batch_time = timeit.timeit(lambda: best_buy.quote(carts), number=1)
+    print(f"{cart_count:>9} carts: one by one {single_time:.2e}, batch {batch_time:.2e}")
+
+
+def bench_catalog_memory(size=1_000_000):
+    """
+    Compares memory use and construction time of Product objects and a ProductTable.
+
+    :param size: Number of products in the catalog.
+    """
+    print(f"Catalog of {size} products")
+
+    def build_objects():
+        return [Product(f"Product {number}", price=number % 500 + 1, quantity=1000) for number in range(size)]
+
+    def build_table():
+        table = ProductTable()
+        for number in range(size):
+            table.append(f"Product {number}", price=number % 500 + 1, quantity=1000)
+        return table
+
+    for label, build in [("Product objects", build_objects), ("ProductTable", build_table)]:
+        tracemalloc.start()
+        start = timeit.default_timer()
+        catalog = build()
+        build_time = timeit.default_timer() - start
+        memory, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{label:>16}: {build_time:.2f}s, {memory / 2 ** 20:.0f} MiB")
+        del catalog
+
+
+def bench_concurrent_orders(thread_counts=(1, 2, 4, 8), orders_per_thread=5_000, catalog_size=1_000):
+    """
+    Compares order throughput of per product locks against one global lock.
+
+    :param thread_counts: Numbers of ordering threads to benchmark.
+    :param orders_per_thread: Number of orders placed by every thread.
+    :param catalog_size: Number of products in the store.
+    """
+    print("Concurrent orders (orders per second)")
+    for thread_count in thread_counts:
+        results = []
+        for concurrent in (False, True):
+            products_list = make_products(catalog_size)
+            for product in products_list:
+                product.quantity = thread_count * orders_per_thread
+            best_buy = Store(products_list, concurrent=concurrent)
+            global_lock = threading.Lock()
+
+            def checkout(offset):
+                for number in range(orders_per_thread):
+                    shopping_list = [(products_list[(offset + number * 31 + line) % catalog_size], 1)
+                                     for line in range(3)]
+                    if concurrent:
+                        best_buy.order(shopping_list)
+                    else:
+                        with global_lock:
+                            best_buy.order(shopping_list)
+
+            threads = [threading.Thread(target=checkout, args=(offset * 97,)) for offset in range(thread_count)]
+            start = timeit.default_timer()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            results.append(thread_count * orders_per_thread / (timeit.default_timer() - start))
+        print(f"{thread_count:>9} threads: global lock {results[0]:.0f}, per product locks {results[1]:.0f}")
+
+
+def bench_async_orders(coroutine_count=10_000, catalog_size=100):
+    """
+    Measures the order throughput of concurrent coroutines ordering from an AsyncStore.
+
+    :param coroutine_count: Number of concurrent ordering coroutines.
+    :param catalog_size: Number of products in the store.
+    """
+    print("Async orders (orders per second)")
+    products_list = make_products(catalog_size)
+    for product in products_list:
+        product.quantity = coroutine_count
+    async_store = AsyncStore(Store(products_list))
+    shopping_lists = [[(products_list[(number + line) % catalog_size], 1) for line in range(3)]
+                      for number in range(coroutine_count)]
+
+    async def checkout():
+        await asyncio.gather(*(async_store.order(shopping_list) for shopping_list in shopping_lists))
+
+    order_time = timeit.timeit(lambda: asyncio.run(checkout()), number=1)
+    print(f"{coroutine_count:>9} coroutines: {coroutine_count / order_time:.0f}")
+
+
+def bench_snapshot_startup(size=1_000_000):
+    """
+    Measures the startup time of a store loaded from a snapshot.
+
+    :param size: Number of products in the snapshot.
+    """
+    print(f"Snapshot of {size} products (seconds)")
+    table = ProductTable()
+    for number in range(size):
+        table.append(f"Product {number}", price=number % 500 + 1, quantity=1000)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "store.snapshot")
+        save_time = timeit.timeit(lambda: save_snapshot(table, path), number=1)
+        table_time = timeit.timeit(lambda: load_snapshot(path), number=1)
+        store_time = timeit.timeit(lambda: load_store(path), number=1)
+        print(f"save {save_time:.2f}, lazy table {table_time:.4f}, full store {store_time:.2f}")
+
+
+def bench_journal(batch_sizes=(1, 16, 256), order_count=2_000, catalog_size=100):
+    """
+    Measures order throughput of a journaled store for different group commit sizes.
+
+    :param batch_sizes: Numbers of records written with one fsync.
+    :param order_count: Number of orders placed.
+    :param catalog_size: Number of products in the store.
+    """
+    print("Journaled orders (orders per second)")
+    for batch_size in batch_sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            journal = Journal.open(os.path.join(directory, "store.snapshot"), os.path.join(directory, "store.log"),
+                                   batch_size=batch_size)
+            products_list = make_products(catalog_size)
+            journal.store.add_product(products_list)
+            order_time = timeit.timeit(lambda: [journal.store.order([(products_list[number % catalog_size], 1)])
+                                                for number in range(order_count)], number=1)
+            journal.close()
+        print(f"{batch_size:>9} records per fsync: {order_count / order_time:.0f}")
+
+
+def bench_sqlite_store(sizes=(10_000, 1_000_000, 10_000_000), memory_limit=1_000_000, repeat=100):
+    """
+    Compares a SqliteStore against the in-memory Store.
+
+    :param sizes: Catalog sizes to benchmark.
+    :param memory_limit: Largest catalog size also benchmarked with the in-memory Store.
+    :param repeat: Number of orders per measurement.
+    """
+    print("SqliteStore against Store (seconds)")
+
+    def build_sqlite_store(size, chunk_size=100_000):
+        sqlite_store = SqliteStore()
+        for start in range(0, size, chunk_size):
+            sqlite_store.add_product(make_products(min(chunk_size, size - start), start))
+        return sqlite_store
+
+    for size in sizes:
+        stores = [("SqliteStore", lambda: build_sqlite_store(size))]
+        if size <= memory_limit:
+            stores.append(("Store", lambda: Store(make_products(size))))
+        for label, build in stores:
+            start = timeit.default_timer()
+            store = build()
+            build_time = timeit.default_timer() - start
+            total_time = timeit.timeit(lambda: store.total_quantity, number=1)
+            product = store.product_by_id(next(iter(store)).product_id)
+            order_time = timeit.timeit(lambda: store.order([(product, 1)]), number=repeat) / repeat
+            print(f"{size:>9} {label:>11}: build {build_time:.2f}, total_quantity {total_time:.2e}, "
+                  f"order {order_time:.2e}")
+
+
+def bench_search(size=1_000_000, promoted_share=1_000, repeat=100):
+    """
+    Measures searching a large catalog for cheap products with a promotion.
+
+    :param size: Number of products in the store.
+    :param promoted_share: Every promoted_share-th product gets a promotion.
+    :param repeat: Number of searches per measurement.
+    """
+    print(f"Search in {size} products (seconds per search)")
+    products_list = make_products(size)
+    promotion = ThirdOneFree("Third One Free!")
+    for product in products_list[::promoted_share]:
+        product.promotion = promotion
+    best_buy = Store(products_list)
+    index_time = timeit.timeit(lambda: next(best_buy.search(limit=1)), number=1)
+    scan_time = timeit.timeit(lambda: [product for product in best_buy.all_products
+                                       if product.price < 300 and product.promotion is not None][:10], number=1)
+    search_time = timeit.timeit(lambda: list(best_buy.search(max_price=300, promoted=True, limit=10)),
+                                number=repeat) / repeat
+    print(f"build index {index_time:.2f}, full scan {scan_time:.2e}, indexed search {search_time:.2e}")
+
+
+def bench_import(sizes=(100_000, 1_000_000)):
+    """
+    Measures time and peak memory of streaming a CSV catalog into a SqliteStore.
+
+    :param sizes: Numbers of catalog rows to import.
+    """
+    print("Catalog import")
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "catalog.csv")
+            with open(path, "w", encoding="utf-8") as file:
+                file.write("name,price,quantity\n")
+                file.writelines(f"Product {number},{number % 500 + 1},1000\n" for number in range(size))
+            sqlite_store = SqliteStore(os.path.join(directory, "store.db"))
+            tracemalloc.start()
+            import_time = timeit.timeit(lambda: import_catalog(path, sqlite_store), number=1)
+            _, peak_memory = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            sqlite_store.close()
+        print(f"{size:>9} rows: {import_time:.2f}s, peak {peak_memory / 2 ** 20:.1f} MiB")
+
+
+def bench_simulation(order_count=200_000, worker_counts=(1, 2, 4), catalog_size=1_000):
+    """
+    Compares replaying an order log sequentially and in a process pool.
+
+    :param order_count: Number of orders in the log.
+    :param worker_counts: Numbers of worker processes to benchmark.
+    :param catalog_size: Number of products in the store.
+    """
+    print(f"Replay of {order_count} orders (seconds)")
+    products_list = make_products(catalog_size)
+    for product in products_list:
+        product.quantity = order_count * 3
+    promotion = SecondHalfPrice("Second Half price!")
+    for product in products_list[::2]:
+        product.promotion = promotion
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "orders.jsonl")
+        write_order_log(path, ([(products_list[(number * 7 + line) % catalog_size], line + 1) for line in range(3)]
+                               for number in range(order_count)))
+        for worker_count in worker_counts:
+            parallel_time = timeit.timeit(lambda: replay_parallel(Store(products_list), path, worker_count), number=1)
+            print(f"{worker_count:>9} workers: {parallel_time:.2f}")
+        sequential_time = timeit.timeit(lambda: replay_sequential(Store(products_list), path), number=1)
+        print(f"sequential {sequential_time:.2f}")
+
+
+def bench_metrics(size=10_000, cart_size=10, orders=10_000):
+    """
+    Compares orders of stores with and without metrics.
+
+    :param size: Number of products in the store.
+    :param cart_size: Number of lines per order.
+    :param orders: Number of orders per measurement.
+    """
+    print(f"Orders of {cart_size} lines with metrics (seconds per order)")
+    for concurrent in (False, True):
+        times = {}
+        for metrics in (None, Metrics()):
+            products_list = generate_products(size, "mixed")
+            best_buy = Store(products_list, concurrent=concurrent, metrics=metrics)
+            carts = generate_carts(products_list, 100, cart_size)
+            cart_numbers = iter(range(orders * 5))
+            times[metrics is not None] = _measure(lambda: best_buy.order(carts[next(cart_numbers) % len(carts)]),
+                                                  orders, 3)
+        print(f"concurrent={concurrent}: disabled {times[False]:.2e}, enabled {times[True]:.2e}, "
+              f"overhead {times[True] / times[False] - 1:.0%}")
+
+
+def bench_rules(size=10_000, cart_size=10, carts=1_000):
+    """
+    Compares pricing carts with compiled rule plans and with apply_promotion per line.
+
+    :param size: Number of products in the store.
+    :param cart_size: Number of lines per cart.
+    :param carts: Number of carts per measurement.
+    """
+    print(f"Pricing carts of {cart_size} lines (seconds per cart)")
+    products_list = generate_products(size, "all")
+    best_buy = Store(products_list)
+    engine = RulesEngine(best_buy)
+    cart_list = generate_carts(products_list, carts, cart_size)
+
+    def apply_promotions():
+        # Grouped and checked like the carts of the engine and Store.order
+        for cart in cart_list:
+            sum(product.promotion.apply_promotion(product, quantity)
+                for product, quantity in best_buy._group_order(cart).values())
+
+    def price_carts():
+        for cart in cart_list:
+            engine.price_cart(cart)
+
+    price_carts()
+    apply_time = _measure(apply_promotions, 1, 3) / carts
+    plan_time = _measure(price_carts, 1, 3) / carts
+    print(f"apply_promotion {apply_time:.2e}, compiled plans {plan_time:.2e}")
+
+
+def bench_price_cache(size=10_000, requests=100_000, maxsize=10_000, exponent=1.1):
+    """
+    Compares pricing Zipf distributed (product, quantity) requests with and without a PriceCache.
+
+    :param size: Number of products in the store.
+    :param requests: Number of requested line prices.
+    :param maxsize: Maxsize of the cache.
+    :param exponent: Exponent of the Zipf distribution; higher values repeat more.
+    """
+    print(f"Zipf distributed line prices (seconds per price, exponent {exponent})")
+    products_list = generate_products(size, "all")
+    generator = random.Random(0)
+    lines = [(product, quantity) for product in products_list for quantity in (1, 2, 3, 5, 10)]
+    generator.shuffle(lines)
+    weights = [1 / rank ** exponent for rank in range(1, len(lines) + 1)]
+    request_lines = generator.choices(lines, weights=weights, k=requests)
+
+    def uncached():
+        for product, quantity in request_lines:
+            product.promotion.apply_promotion(product, quantity)
+
+    cache = PriceCache(maxsize)
+
+    def cached():
+        for product, quantity in request_lines:
+            cache.price(product, quantity)
+
+    uncached_time = _measure(uncached, 1, 3) / requests
+    cached_time = _measure(cached, 1, 3) / requests
+    stats = cache.stats
+    print(f"apply_promotion {uncached_time:.2e}, cached {cached_time:.2e}, "
+          f"hit rate {stats['hits'] / (stats['hits'] + stats['misses']):.0%}, evictions {stats['evictions']}")
+
+
+def bench_order_many(size=1_000, cart_size=3, batch_sizes=(100, 1_000, 10_000)):
+    """
+    Compares the throughput of Store.order_many against calling Store.order in a loop.
+
+    :param size: Number of products in the store.
+    :param cart_size: Number of lines per order.
+    :param batch_sizes: Numbers of orders per batch.
+    """
+    print(f"Batches of orders with {cart_size} lines (orders per second)")
+    for batch_size in batch_sizes:
+        products_list = generate_products(size, "mixed")
+        best_buy = Store(products_list)
+        carts = generate_carts(products_list, batch_size, cart_size)
+
+        def order_loop():
+            for cart in carts:
+                best_buy.order(cart)
+
+        loop_time = _measure(order_loop, 1, 3)
+        batch_time = _measure(lambda: best_buy.order_many(carts), 1, 3)
+        print(f"{batch_size:>6} orders: order loop {batch_size / loop_time:,.0f}, "
+              f"order_many {batch_size / batch_time:,.0f}")
+
+
+def bench_low_stock(size=1_000_000, k=10, repeat=100):
+    """
+    Compares top-k low stock queries of a LowStockIndex against a scan of all products.
+
+    :param size: Number of products in the store.
+    :param k: Number of products at risk to find.
+    :param repeat: Number of queries per measurement.
+    """
+    print(f"Top {k} products at risk in {size} products (seconds per query)")
+    generator = random.Random(0)
+    products_list = [Product(f"Product {number}", price=10, quantity=generator.randint(1, 10_000))
+                     for number in range(size)]
+    best_buy = Store(products_list)
+    build_time = timeit.timeit(lambda: LowStockIndex(best_buy), number=1)
+    index = LowStockIndex(best_buy)
+    carts = generate_carts(products_list, 1_000, 3)
+    order_time = _measure(lambda: [best_buy.order(cart) for cart in carts], 1, 1) / len(carts)
+    scan_time = timeit.timeit(lambda: sorted(best_buy, key=lambda product: product.quantity)[:k], number=1)
+    query_time = timeit.timeit(lambda: index.at_risk(k), number=repeat) / repeat
+    print(f"build index {build_time:.2f}, order with index {order_time:.2e}, full scan {scan_time:.2e}, "
+          f"indexed query {query_time:.2e}")
+
+
+def bench_money(size=10_000, cart_size=10, carts=1_000):
+    """
+    Compares pricing carts with integer cents against plain float arithmetic.
+
+    Both paths use the same closed forms per promotion on prices taken out
+    of the products beforehand, so only the number types differ; the float
+    path does no rounding. Pricing through Product.line_cents is measured too.
+
+    :param size: Number of products in the store.
+    :param cart_size: Number of lines per cart.
+    :param carts: Number of carts.
+    """
+    print(f"Pricing carts of {cart_size} lines, mixed promotions (seconds per cart)")
+    products_list = generate_products(size, "mixed")
+    cart_lines = generate_carts(products_list, carts, cart_size)
+    kinds = {type(None): 0, SecondHalfPrice: 1, ThirdOneFree: 2, PercentDiscount: 3}
+    carts_data = [[(kinds[type(product.promotion)], product.price, product.price_cents,
+                    getattr(product.promotion, "percent", 0), quantity) for product, quantity in cart]
+                  for cart in cart_lines]
+
+    def float_line(kind, price, percent, quantity):
+        if kind == 0:
+            return price * quantity
+        if kind == 1:
+            return price * (2 * quantity - quantity // 2) / 2
+        if kind == 2:
+            return price * (quantity - quantity // 3)
+        return price * quantity * (100 - percent) / 100
+
+    def cents_line(kind, cents, percent, quantity):
+        if kind == 0:
+            return cents * quantity
+        if kind == 1:
+            return (cents * (2 * quantity - quantity // 2) + 1) // 2
+        if kind == 2:
+            return cents * (quantity - quantity // 3)
+        return (cents * quantity * (100 - percent) + 50) // 100
+
+    def float_totals():
+        return [sum(float_line(kind, price, percent, quantity) for kind, price, _, percent, quantity in cart)
+                for cart in carts_data]
+
+    def cents_totals():
+        return [sum(cents_line(kind, cents, percent, quantity) for kind, _, cents, percent, quantity in cart)
+                for cart in carts_data]
+
+    def product_totals():
+        return [sum(product.line_cents(quantity) for product, quantity in cart) for cart in cart_lines]
+
+    float_time = _measure(float_totals, 5, 9) / carts
+    cents_time = _measure(cents_totals, 5, 9) / carts
+    product_time = _measure(product_totals, 5, 9) / carts
+    drifted = sum(float_total != cents_total / 100 for float_total, cents_total in zip(float_totals(), cents_totals()))
+    print(f"float {float_time:.2e}, cents {cents_time:.2e} ({float_time / cents_time:.2f}x), "
+          f"Product.line_cents {product_time:.2e}, float totals differing from the cents {drifted} of {carts}")
+
+
+# Shares of products without a promotion in the promotion mixes of the suite
+PROMOTION_MIXES = {"none": 1.0, "mixed": 0.5, "all": 0.0}
+
+
+def generate_products(size, promotion_mix="none", seed=0):
+    """
+    Generates a reproducible catalog of products for the benchmark suite.
+
+    Every tenth product is a LimitedProduct; all products have enough stock
+    for repeated orders.
+
+    :param size: Number of products to generate.
+    :param promotion_mix: Name of a mix in PROMOTION_MIXES.
+    :param seed: Seed of the random generator.
+    :return: List of products.
+    """
+    generator = random.Random(seed)
+    promotions = [SecondHalfPrice("Second Half price!"), ThirdOneFree("Third One Free!"),
+                  PercentDiscount("30% off!", percent=30)]
+    share_without_promotion = PROMOTION_MIXES[promotion_mix]
+    products_list = []
+    for number in range(size):
+        price = round(generator.uniform(1, 2000), 2)
+        if number % 10 == 9:
+            product = LimitedProduct(f"Product {number}", price=price, quantity=10 ** 12, limit=10 ** 6)
+        else:
+            product = Product(f"Product {number}", price=price, quantity=10 ** 12)
+        if generator.random() >= share_without_promotion:
+            product.promotion = generator.choice(promotions)
+        products_list.append(product)
+    return products_list
+
+
+def generate_carts(products_list, cart_count, cart_size, seed=0):
+    """
+    Generates reproducible shopping lists from a catalog.
+
+    :param products_list: List of products to choose from.
+    :param cart_count: Number of shopping lists.
+    :param cart_size: Number of lines per shopping list.
+    :param seed: Seed of the random generator.
+    :return: List of shopping lists.
+    """
+    generator = random.Random(seed)
+    return [[(generator.choice(products_list), generator.randint(1, 5)) for _ in range(cart_size)]
+            for _ in range(cart_count)]
+
+
+def _measure(function, number, repeat):
+    """
+    Get the best time of a function over several runs.
+
+    :param function: Function without arguments.
+    :param number: Number of calls per run.
+    :param repeat: Number of runs.
+    :return: Seconds per call of the fastest run.
+    """
+    return min(timeit.repeat(function, number=number, repeat=repeat)) / number
+
+
+def run_suite(sizes=(1_000, 10_000, 100_000, 1_000_000), cart_sizes=(1, 10, 100),
+              promotion_mixes=tuple(PROMOTION_MIXES), repeat=5):
+    """
+    Measures the hot paths of products, promotions and the store.
+
+    :param sizes: Catalog sizes.
+    :param cart_sizes: Numbers of lines per order.
+    :param promotion_mixes: Names of mixes in PROMOTION_MIXES.
+    :param repeat: Number of runs per measurement; the fastest counts.
+    :return: Dictionary mapping benchmark names to seconds per call.
+    """
+    results = {}
+    product = Product("Benchmark", price=9.99, quantity=10 ** 12)
+    results["product_buy"] = _measure(lambda: product.buy(1), 10_000, repeat)
+    results["product_buy_cents"] = _measure(lambda: product.buy_cents(1), 10_000, repeat)
+    for promotion in (SecondHalfPrice("Second Half price!"), ThirdOneFree("Third One Free!"),
+                      PercentDiscount("30% off!", percent=30)):
+        for quantity in (1, 1_000, 1_000_000):
+            results[f"apply_promotion[{type(promotion).__name__},{quantity}]"] = _measure(
+                lambda: promotion.apply_promotion(product, quantity), 1_000, repeat)
+
+    for size in sizes:
+        for promotion_mix in promotion_mixes:
+            products_list = generate_products(size, promotion_mix)
+            best_buy = Store(list(products_list))
+            name = f"{size},{promotion_mix}"
+            for cart_size in cart_sizes:
+                carts = generate_carts(products_list, 100, cart_size)
+                cart_numbers = iter(range(10 ** 9))
+                results[f"store_order[{name},{cart_size}]"] = _measure(
+                    lambda: best_buy.order(carts[next(cart_numbers) % len(carts)]), len(carts), repeat)
+            if promotion_mix == promotion_mixes[0]:
+                probe = products_list[-1]
+                results[f"store_contains[{size}]"] = _measure(lambda: probe in best_buy, 10_000, repeat)
+                results[f"store_all_products[{size}]"] = _measure(lambda: best_buy.all_products, 1_000, repeat)
+    return results
+
+
+def compare_results(results, baseline, threshold):
+    """
+    Finds benchmarks that got slower than the baseline by more than a threshold.
+
+    :param results: Dictionary mapping benchmark names to seconds per call.
+    :param baseline: Results of an earlier run.
+    :param threshold: Allowed slowdown as a fraction, e.g. 0.25 for 25%.
+    :return: List of tuples (name, baseline seconds, seconds) of the regressions.
+    """
+    return [(name, baseline[name], seconds) for name, seconds in sorted(results.items())
+            if name in baseline and seconds > baseline[name] * (1 + threshold)]
+
+
+def main():
+    """Runs the benchmark suite or the comparison studies."""
+    parser = argparse.ArgumentParser(description="Benchmarks of the store hot paths.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument("--cart-sizes", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--promotion-mixes", nargs="+", choices=list(PROMOTION_MIXES), default=list(PROMOTION_MIXES))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="Path of a JSON file for the results")
+    parser.add_argument("--baseline", help="Path of a JSON file with results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed slowdown against the baseline")
+    parser.add_argument("--studies", action="store_true", help="Run the comparison studies instead of the suite")
+    arguments = parser.parse_args()
+
+    if arguments.studies:
+        run_studies()
+        return
+
+    results = run_suite(arguments.sizes, arguments.cart_sizes, arguments.promotion_mixes, arguments.repeat)
+    for name, seconds in sorted(results.items()):
+        print(f"{name:<50} {seconds:.3e}")
+    if arguments.output:
+        with open(arguments.output, "w", encoding="utf-8") as file:
+            json.dump({"python": platform.python_version(), "results": results}, file, indent=2)
+    if arguments.baseline:
+        with open(arguments.baseline, encoding="utf-8") as file:
+            baseline = json.load(file)["results"]
+        regressions = compare_results(results, baseline, arguments.threshold)
+        for name, baseline_seconds, seconds in regressions:
+            print(f"Regression {name}: {baseline_seconds:.3e} -> {seconds:.3e} (x{seconds / baseline_seconds:.2f})")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions over {arguments.threshold:.0%} against {arguments.baseline}")
+
+
+def run_studies():
+    """Runs all comparison studies."""
+    bench_store_lookup()
+    bench_bulk_order()
+    bench_promotions()
+    bench_quote()
+    bench_catalog_memory()
+    bench_concurrent_orders()
+    bench_async_orders()
+    bench_snapshot_startup()
+    bench_journal()
+    bench_sqlite_store()
+    bench_search()
+    bench_import()
+    bench_simulation()
+    bench_metrics()
+    bench_rules()
+    bench_price_cache()
+    bench_order_many()
+    bench_low_stock()
+    bench_money()
+
+
+if __name__ == "__main__":
+    main()
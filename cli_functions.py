@@ -1,17 +1,152 @@
+from itertools import islice
+
+from money import format_cents
+
+PAGE_HELP = "n: next page, p: previous page, g <page>: go to page, /<name>: search, /: all products"
+
+
+class CatalogPager:
+    """
+    Pages through the active products of a store without listing all of them.
+
+    Products are loaded from the store only as far as the pages that were
+    shown, and keep their numbers while the pager is used, so a product can
+    be selected by the number it was shown with. The store is walked again
+    for every load, skipping the loaded product ids, so products can be added
+    or removed between the pages.
+
+    :param store_obj: Store object containing products.
+    :type store_obj: Store
+    :param page_size: Number of products per page.
+    :type page_size: int
+    """
+
+    def __init__(self, store_obj, page_size=20):
+        self._store = store_obj
+        self._page_size = page_size
+        self.search(None)
+
+    def search(self, name_prefix):
+        """
+        Restricts the pages to products whose name starts with a prefix.
+
+        :param name_prefix: Start of the product names, or None or empty for all products.
+        """
+        self.name_prefix = name_prefix or None
+        self._loaded = []
+        self._loaded_ids = set()
+        self.current_page = 1
+
+    def _products(self):
+        """Get an iterator of the active products matching the search."""
+        if self.name_prefix is None:
+            return (product for product in self._store if product.is_active)
+        return self._store.search(name_prefix=self.name_prefix)
+
+    def _load(self, count):
+        """Loads products from the store until count products are loaded or none are left."""
+        if len(self._loaded) < count:
+            # A new iterator per load, as the store may have changed since the last page
+            new_products = (product for product in self._products() if product.product_id not in self._loaded_ids)
+            for product in islice(new_products, count - len(self._loaded)):
+                self._loaded.append(product)
+                self._loaded_ids.add(product.product_id)
+
+    def page(self, page_number):
+        """
+        Get the products of a page.
+
+        :param page_number: Number of the page, starting with 1.
+        :return: List of the products on the page, empty if the page is beyond the last one.
+        """
+        end = page_number * self._page_size
+        self._load(end)
+        return self._loaded[end - self._page_size:end]
+
+    def product(self, item_number):
+        """
+        Get a product by the number it is shown with.
+
+        :param item_number: Number of the product, starting with 1.
+        :return: The product or None if there is no product with the number.
+        """
+        if item_number < 1:
+            return None
+        self._load(item_number)
+        return self._loaded[item_number - 1] if item_number <= len(self._loaded) else None
+
+    def render(self, page_number):
+        """
+        Formats a page of products as one text.
+
+        :param page_number: Number of the page, starting with 1.
+        :return: Text of the page.
+        """
+        first_number = (page_number - 1) * self._page_size + 1
+        lines = [8 * "-"]
+        if self.name_prefix is not None:
+            lines.append(f"Search: {self.name_prefix}")
+        lines.extend(f"{item_number}. {product}"
+                     for item_number, product in enumerate(self.page(page_number), start=first_number))
+        if len(lines) == 1 + (self.name_prefix is not None):
+            lines.append("No products")
+        lines.append(f"Page {page_number} ({PAGE_HELP})")
+        lines.append(8 * "-")
+        return "\n".join(lines)
+
+
+def handle_page_command(pager, command):
+    """
+    Moves the pager to another page or search and shows it.
+
+    :param pager: CatalogPager of the listing.
+    :type pager: CatalogPager
+    :param command: Text entered by the user.
+    :type command: str
+    :return: True if the text was a page command, False otherwise.
+    :rtype: bool
+    """
+    command = command.strip()
+    if command == "n":
+        if pager.page(pager.current_page + 1):
+            pager.current_page += 1
+        else:
+            print("This is the last page")
+    elif command == "p":
+        pager.current_page = max(pager.current_page - 1, 1)
+    elif command.startswith("g"):
+        try:
+            page_number = int(command[1:])
+        except ValueError:
+            print("Please enter a page number after g!")
+            return True
+        if page_number < 1 or (page_number > 1 and not pager.page(page_number)):
+            print(f"Not found page {page_number}")
+            return True
+        pager.current_page = page_number
+    elif command.startswith("/"):
+        pager.search(command[1:].strip())
+    else:
+        return False
+    print(pager.render(pager.current_page))
+    return True
+
+
 def show_items(store_obj):
     """
-    Displays all products in the store.
+    Shows the products in the store page by page.
 
     :param store_obj: Store object containing products.
     :type store_obj: Store
     """
-    products_list = store_obj.all_products
-    item_number = 1
-    print(8 * "-")
-    for product in products_list:
-        print(f"{item_number}. {product}")
-        item_number += 1
-    print(8 * "-")
+    pager = CatalogPager(store_obj)
+    print(pager.render(pager.current_page))
+    while True:
+        command = input("Page command (empty to return): ")
+        if not command.strip():
+            return
+        if not handle_page_command(pager, command):
+            print(PAGE_HELP)
 
 
 def show_total_amount(store_obj):
@@ -44,21 +179,30 @@ def ask_for_number(text):
         print("Please enter a Number!")
 
 
-def ask_order_item(number_of_products):
+def ask_order_item(pager):
     """
     Asks the user to select a product and its quantity for the order.
 
-    :param number_of_products: The total number of products available.
-    :type number_of_products: int
-    :return: A tuple containing the selected product index and quantity.
-    :rtype: tuple(int, int) or (None, None)
+    Page commands entered instead of a product number move through the listing.
+
+    :param pager: CatalogPager of the listed products.
+    :type pager: CatalogPager
+    :return: A tuple containing the selected product and quantity.
+    :rtype: tuple(Product, int) or (None, None)
     """
     while True:
-        user_item_choice = ask_for_number("Which product # do you want? ")
-        if user_item_choice is None:
+        user_input = input("Which product # do you want? ")
+        if not user_input.strip():
             return None, None
-        if 1 <= user_item_choice <= number_of_products:
-            user_item_choice -= 1
+        if handle_page_command(pager, user_input):
+            continue
+        try:
+            user_item_choice = int(user_input)
+        except ValueError:
+            print(f"Please enter a Number! ({PAGE_HELP})")
+            continue
+        product = pager.product(user_item_choice)
+        if product is not None:
             break
         print(f"Not found product with index {user_item_choice}")
 
@@ -67,24 +211,24 @@ def ask_order_item(number_of_products):
         if user_quantity is None or user_quantity >= 0:
             break
         print("Amount must be a positive Number!")
-    return user_item_choice, user_quantity
+    return product, user_quantity
 
 
-def get_order_list(products_list):
+def get_order_list(pager):
     """
     Collects a list of ordered items from the user.
 
-    :param products_list: List of available products in the store.
-    :type products_list: list
+    :param pager: CatalogPager of the listed products.
+    :type pager: CatalogPager
     :return: List of tuples containing products and their ordered quantities.
     :rtype: list[tuple(Product, int)]
     """
     order_list = []
     while True:
-        item_number, order_quantity = ask_order_item(len(products_list))
-        if item_number is None or order_quantity is None:
+        product, order_quantity = ask_order_item(pager)
+        if product is None or order_quantity is None:
             break
-        order_list.append((products_list[item_number], order_quantity))
+        order_list.append((product, order_quantity))
         print("Product added to list!\n")
     return order_list
 
@@ -104,7 +248,7 @@ def print_shopping_cart(order_list):
                            order_list if prod == product)
             controlled_items.append(product)
             complete_order_list.append((product, quantity))
-    shopping_cart = "\n".join(f"{i + 1}. {product.name}, Price: {product.price}, "
+    shopping_cart = "\n".join(f"{i + 1}. {product.name}, Price: {format_cents(product.price_cents)}, "
                               f"Quantity: {quantity}" for i, (product, quantity) in
                               enumerate(complete_order_list))
     shopping_cart = shopping_cart or "Empty"
@@ -131,29 +275,66 @@ def is_ordering_finished(order_list):
             print("Please confirm with yes or no/empty")
 
 
+def renew_reservation(store_obj, reservation, order_list):
+    """
+    Reserves the items of an order again when its reservation expired.
+
+    The items of an expired reservation are not held anymore, so all of
+    them are reserved again in a new reservation.
+
+    :param store_obj: Store object containing products.
+    :type store_obj: Store
+    :param reservation: Reservation of the items, or None if nothing was reserved yet.
+    :type reservation: Reservation
+    :param order_list: List of ordered items.
+    :type order_list: list[tuple(Product, int)]
+    :return: The held reservation, or None if nothing was reserved yet.
+    :rtype: Reservation
+    :raises ValueError: If the items cannot be reserved again.
+    """
+    store_obj.expire_reservations()
+    if reservation is None or reservation.state != "expired":
+        return reservation
+    print("Your reservation expired, reserving your items again")
+    return store_obj.reserve(order_list)
+
+
 def place_an_order(store_obj):
     """
     Handles the process of placing an order by selecting products and quantities.
 
+    Items are reserved as soon as they are added, so they are still in stock
+    when the order is finished. When the reservation expires, the items are
+    reserved again.
+
     :param store_obj: Store object containing products.
     :type store_obj: Store
     """
-    products_list = store_obj.all_products
+    pager = CatalogPager(store_obj)
     order_list = []
+    reservation = None
 
-    show_items(store_obj)
+    print(pager.render(pager.current_page))
     print("When you want to finish your order, enter empty text")
     while True:
-        order_list += get_order_list(products_list)
+        new_items = get_order_list(pager)
+        if new_items:
+            try:
+                reservation = renew_reservation(store_obj, reservation, order_list)
+                reservation = store_obj.reserve(new_items, reservation=reservation)
+                order_list += new_items
+            except (ValueError, TypeError) as e:
+                print(f"Could not reserve the items: {e}")
         if is_ordering_finished(order_list):
             break
     if order_list:
         try:
-            total_sum = store_obj.order(order_list)
-            print(f"{8 * '*'}\nOrder made! Total payment: {total_sum}")
+            reservation = renew_reservation(store_obj, reservation, order_list)
+            total_cents = store_obj.checkout_cents(reservation)
+            print(f"{8 * '*'}\nOrder made! Total payment: {format_cents(total_cents)}")
         except (ValueError, TypeError) as e:
+            store_obj.cancel_reservation(reservation)
             print(f"There was an Error while processing your order: {e}")
             input("Press enter to continue...")
     else:
         print("Thanks for nothing")
-
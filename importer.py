@@ -0,0 +1,182 @@
+import csv
+import json
+from itertools import islice
+
+from products import Product, NonStockedProduct, LimitedProduct, reserve_product_ids
+
+
+def read_rows(path):
+    """
+    Reads catalog rows from a CSV file with a header or a JSON lines file.
+
+    :param path: Path of the file; files ending with .csv are read as CSV.
+    :return: Generator of tuples (line number, row dictionary); rows that cannot be read
+             are dictionaries with an error.
+    """
+    with open(path, newline="", encoding="utf-8") as file:
+        if str(path).endswith(".csv"):
+            reader = csv.DictReader(file)
+            for row in reader:
+                yield reader.line_num, row
+            return
+        for line_number, line in enumerate(file, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as error:
+                yield line_number, {"error": f"Invalid JSON: {error}"}
+                continue
+            yield line_number, row if isinstance(row, dict) else {"error": "Row needs to be a JSON object"}
+
+
+def _optional(row, key, convert):
+    """
+    Get an optional value of a row, converting strings read from CSV.
+
+    :param row: Row dictionary.
+    :param key: Name of the column.
+    :param convert: Function converting a string to the value.
+    :return: The value or None if the column is missing or empty.
+    """
+    value = row.get(key)
+    if value is None or value == "":
+        return None
+    if isinstance(value, str):
+        return convert(value)
+    return value
+
+
+def _number(text):
+    """Converts a CSV price to an integer or float."""
+    return float(text) if any(character in text for character in ".eE") else int(text)
+
+
+def _boolean(text):
+    """Converts a CSV flag to a boolean."""
+    if text.strip().lower() not in ("true", "false", "1", "0", "yes", "no"):
+        raise ValueError(f"Flag needs to be true or false: {text} was given")
+    return text.strip().lower() in ("true", "1", "yes")
+
+
+def parse_product(row, promotions):
+    """
+    Creates a product of the matching class from a catalog row.
+
+    Rows have the columns name, price, quantity, limit, stocked, product_id
+    and promotion; all but name and price are optional.
+
+    :param row: Row dictionary.
+    :param promotions: Dictionary mapping promotion names to promotions.
+    :return: Product instance.
+    :raises TypeError: If any of the values has a wrong type.
+    :raises ValueError: If any of the values are invalid or the promotion is unknown.
+    """
+    if "error" in row:
+        raise ValueError(row["error"])
+    name = row.get("name")
+    price = _optional(row, "price", _number)
+    if price is None:
+        raise ValueError("Price is missing")
+    quantity = _optional(row, "quantity", int) or 0
+    limit = _optional(row, "limit", int)
+    stocked = _optional(row, "stocked", _boolean)
+    product_id = _optional(row, "product_id", int)
+
+    if stocked is False:
+        if limit is not None:
+            raise ValueError("Products that are not stocked cannot have a limit")
+        product = NonStockedProduct(name, price, product_id=product_id)
+    elif limit is not None:
+        product = LimitedProduct(name, price, quantity, limit, product_id=product_id)
+    else:
+        product = Product(name, price, quantity, product_id=product_id)
+
+    promotion_name = row.get("promotion")
+    if promotion_name:
+        if promotion_name not in promotions:
+            raise ValueError(f"Unknown promotion: {promotion_name}")
+        product.promotion = promotions[promotion_name]
+    return product
+
+
+def _reserve_row_ids(path):
+    """
+    Moves the generated product ids past the explicit ids of a catalog file.
+
+    Rows without an id then never take the id of a later row.
+
+    :param path: Path of a CSV or JSON lines catalog file.
+    """
+    max_product_id = 0
+    for _, row in read_rows(path):
+        try:
+            product_id = _optional(row, "product_id", int)
+        except (TypeError, ValueError):
+            continue
+        if product_id is not None and product_id > max_product_id:
+            max_product_id = product_id
+    reserve_product_ids(max_product_id)
+
+
+def _validate_batch(batch, store, promotions):
+    """
+    Creates the products of a batch of rows, separating the rejected rows.
+
+    :param batch: List of tuples (line number, row dictionary).
+    :param store: Store the products will be added to.
+    :param promotions: Dictionary mapping promotion names to promotions.
+    :return: Tuple (list of products, list of tuples (line number, row, error message)).
+    """
+    products = []
+    rejects = []
+    product_ids = set()
+    for line_number, row in batch:
+        try:
+            product = parse_product(row, promotions)
+        except (TypeError, ValueError) as error:
+            rejects.append((line_number, row, str(error)))
+            continue
+        if product.product_id in product_ids or store.product_by_id(product.product_id) is not None:
+            rejects.append((line_number, row, f"Product id {product.product_id} is already in use"))
+            continue
+        product_ids.add(product.product_id)
+        products.append(product)
+    return products, rejects
+
+
+def import_catalog(path, store, promotions=(), reject_path=None, batch_size=10_000):
+    """
+    Streams a catalog file into a store in batches.
+
+    Only one batch of rows is kept in memory at a time. Rows that fail the
+    product checks are written to the reject file as JSON lines instead of
+    stopping the import. The file is read twice: first for the explicit
+    product ids, so ids generated for rows without one never collide.
+
+    :param path: Path of a CSV or JSON lines catalog file.
+    :param store: Store the products are added to.
+    :param promotions: Promotions the rows can refer to by name.
+    :param reject_path: Path of the reject file or None to drop rejected rows.
+    :param batch_size: Number of rows validated and added together.
+    :return: Tuple (number of imported products, number of rejected rows).
+    """
+    promotions_by_name = {str(promotion): promotion for promotion in promotions}
+    imported_count = rejected_count = 0
+    _reserve_row_ids(path)
+    rows = read_rows(path)
+    reject_file = None if reject_path is None else open(reject_path, "w", encoding="utf-8")
+    try:
+        while batch := list(islice(rows, batch_size)):
+            products, rejects = _validate_batch(batch, store, promotions_by_name)
+            if products:
+                store.add_product(products)
+            imported_count += len(products)
+            rejected_count += len(rejects)
+            if reject_file is not None:
+                for line_number, row, error in rejects:
+                    reject_file.write(json.dumps({"line": line_number, "row": row, "error": error}) + "\n")
+    finally:
+        if reject_file is not None:
+            reject_file.close()
+    return imported_count, rejected_count
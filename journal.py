@@ -0,0 +1,216 @@
+import json
+import os
+from threading import Lock
+
+from snapshot import (write_snapshot, load_store, _product_to_dict, _product_from_dict, _promotion_to_dict,
+                      _promotion_from_dict)
+from store import Store
+
+
+def _fsync_directory(path):
+    """
+    Syncs a directory, so renamed files in it survive a crash.
+
+    :param path: Path of the directory.
+    """
+    if os.name != "posix":
+        # Directories cannot be opened for syncing on other systems
+        return
+    directory = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(directory)
+    finally:
+        os.close(directory)
+
+
+def _apply_record(store, record):
+    """
+    Applies a journal record to a store.
+
+    Records hold the new values and not differences, so applying a record
+    more than once has the same effect as applying it once.
+
+    :param store: Store the record is applied to.
+    :param record: Dictionary of the record.
+    """
+    product = store.product_by_id(record.get("id"))
+    if record["op"] == "add":
+        product_dict = record["product"]
+        if store.product_by_id(product_dict["product_id"]) is None:
+            promotion = product_dict["promotion"]
+            store.add_product([_product_from_dict(product_dict,
+                                                  None if promotion is None else _promotion_from_dict(promotion))])
+    elif product is None:
+        return
+    elif record["op"] == "remove":
+        store.remove_product(product)
+    elif record["attribute"] == "active":
+        if record["value"]:
+            product.activate()
+        else:
+            product.deactivate()
+    elif record["attribute"] == "promotion":
+        product.promotion = _promotion_from_dict(record["value"])
+    else:
+        setattr(product, record["attribute"], record["value"])
+
+
+def recover(snapshot_path, log_path, concurrent=False):
+    """
+    Rebuilds a store from its last snapshot and the records of its journal.
+
+    A record cut off by a crash at the end of the journal is ignored.
+
+    :param snapshot_path: Path of the snapshot file.
+    :param log_path: Path of the journal file.
+    :param concurrent: True to create a concurrent store.
+    :return: Tuple (recovered store, number of replayed records).
+    """
+    if os.path.exists(snapshot_path):
+        store = load_store(snapshot_path, concurrent=concurrent)
+    else:
+        store = Store([], concurrent=concurrent)
+
+    record_count = 0
+    if os.path.exists(log_path):
+        with open(log_path, "rb") as file:
+            for line in file:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                _apply_record(store, record)
+                record_count += 1
+    return store, record_count
+
+
+class Journal:
+    """
+    An append-only write-ahead log of all inventory changes of a store.
+
+    Changes are collected in memory and written with a single fsync once
+    batch_size records are pending (group commit). Changes of the last
+    incomplete batch are lost in a crash unless commit is called.
+
+    :param store: Store to be journaled.
+    :param snapshot_path: Path of the snapshot the journal is based on.
+    :param log_path: Path of the journal file.
+    :param batch_size: Number of records written together.
+    :param compact_after: Number of records after which the store is saved as a new
+                          snapshot and the journal is emptied.
+    """
+
+    def __init__(self, store, snapshot_path, log_path, batch_size=64, compact_after=100_000):
+        self._store = store
+        self._snapshot_path = os.fspath(snapshot_path)
+        self._log_path = os.fspath(log_path)
+        self._batch_size = batch_size
+        self._compact_after = compact_after
+        self._file = open(self._log_path, "ab")
+        self._lock = Lock()
+        self._pending_records = []
+        self._record_count = 0
+
+        for product in store:
+            product.add_observer(self._product_changed)
+        store.add_observer(self._store_changed)
+
+    @classmethod
+    def open(cls, snapshot_path, log_path, batch_size=64, compact_after=100_000, concurrent=False):
+        """
+        Recovers a store from its snapshot and journal and starts journaling it.
+
+        :param snapshot_path: Path of the snapshot file.
+        :param log_path: Path of the journal file.
+        :param batch_size: Number of records written together.
+        :param compact_after: Number of records after which the journal is compacted.
+        :param concurrent: True to create a concurrent store.
+        :return: Journal of the recovered store.
+        """
+        store, _ = recover(snapshot_path, log_path, concurrent=concurrent)
+        journal = cls(store, snapshot_path, log_path, batch_size, compact_after)
+        # Start from a new snapshot, also dropping a record cut off by a crash
+        if os.path.getsize(log_path):
+            journal.compact()
+        return journal
+
+    @property
+    def store(self):
+        """Get the journaled store."""
+        return self._store
+
+    def _append(self, record):
+        """
+        Adds a record to the journal, writing the batch when it is full.
+
+        :param record: Dictionary of the record.
+        """
+        with self._lock:
+            self._pending_records.append(json.dumps(record).encode() + b"\n")
+            if len(self._pending_records) < self._batch_size:
+                return
+            self._write_pending()
+        if self._record_count >= self._compact_after:
+            self.compact()
+
+    def _write_pending(self):
+        """Writes and syncs all pending records; the lock needs to be held."""
+        if not self._pending_records:
+            return
+        self._file.write(b"".join(self._pending_records))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._record_count += len(self._pending_records)
+        self._pending_records = []
+
+    def _product_changed(self, product, attribute, old_value, new_value):
+        """Records the change of a product."""
+        if attribute == "promotion":
+            new_value = _promotion_to_dict(new_value)
+        self._append({"op": "set", "id": product.product_id, "attribute": attribute, "value": new_value})
+
+    def _store_changed(self, store, action, product):
+        """Records a product added to or removed from the store."""
+        if action == "add":
+            product.add_observer(self._product_changed)
+            promotion = None if product.promotion is None else _promotion_to_dict(product.promotion)
+            self._append({"op": "add", "product": _product_to_dict(product, promotion)})
+        else:
+            product.remove_observer(self._product_changed)
+            self._append({"op": "remove", "id": product.product_id})
+
+    def commit(self):
+        """Writes and syncs all pending records."""
+        with self._lock:
+            self._write_pending()
+
+    def compact(self):
+        """
+        Saves the store as a new snapshot and empties the journal.
+
+        The snapshot and its directory entry are synced before the journal is
+        emptied, so a crash at any point leaves either the old snapshot with
+        the full journal or the new snapshot.
+        """
+        with self._lock:
+            self._write_pending()
+            temporary_path = self._snapshot_path + ".tmp"
+            with open(temporary_path, "wb") as file:
+                write_snapshot(self._store, file)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temporary_path, self._snapshot_path)
+            _fsync_directory(os.path.dirname(os.path.abspath(self._snapshot_path)))
+            self._file.truncate(0)
+            os.fsync(self._file.fileno())
+            self._record_count = 0
+
+    def close(self):
+        """Commits all pending records and stops journaling the store."""
+        self.commit()
+        for product in self._store:
+            product.remove_observer(self._product_changed)
+        self._store.remove_observer(self._store_changed)
+        self._file.close()
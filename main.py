@@ -1,3 +1,8 @@
+import argparse
+import sys
+from contextlib import ExitStack
+
+from batch import process_orders, format_summary
 from cli_functions import *
 import products
 import store
@@ -42,10 +47,22 @@ def start(store_obj):
             print("Please choose a number from the menu!")
 
 
-def main():
+def main(argv=None):
     """
     Initializes the product list and store, then starts the store interface.
+
+    With --orders the orders of a JSON lines file (or stdin for "-") are
+    processed without prompts, writing a result record per order and a
+    summary to stderr.
+
+    :param argv: Command line arguments, sys.argv[1:] when None.
+    :return: Exit status, 1 if the order or output file could not be used.
     """
+    parser = argparse.ArgumentParser(description="Best Buy store.")
+    parser.add_argument("--orders", help='JSON lines file of orders to process, "-" for stdin')
+    parser.add_argument("--output", help="File for the result records, stdout when not given")
+    arguments = parser.parse_args(argv)
+
     try:
         # setup initial stock of inventory
         product_list = [products.Product("MacBook Air M2", price=1450, quantity=100),
@@ -65,13 +82,30 @@ def main():
         product_list[1].promotion = third_one_free
         product_list[3].promotion = thirty_percent
         best_buy = store.Store(product_list)
-        print(product_list[1] in best_buy)
+        if arguments.orders is None:
+            print(product_list[1] in best_buy)
     except (ValueError, TypeError) as e:
         print(e)
         return
 
-    start(best_buy)
+    if arguments.orders is None:
+        start(best_buy)
+        return
+
+    try:
+        # Files opened so far are closed even when opening or processing a later one fails
+        with ExitStack() as files:
+            order_file = (sys.stdin if arguments.orders == "-"
+                          else files.enter_context(open(arguments.orders, encoding="utf-8")))
+            output = (sys.stdout if arguments.output is None
+                      else files.enter_context(open(arguments.output, "w", encoding="utf-8")))
+            summary = process_orders(best_buy, order_file, output)
+    except OSError as e:
+        print(f"Could not process the orders: {e}", file=sys.stderr)
+        return 1
+    print(format_summary(summary), file=sys.stderr)
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,178 @@
+from bisect import bisect_left
+from threading import Lock
+from time import perf_counter
+
+# Upper bounds of the latency buckets in seconds
+LATENCY_BUCKETS = (0.000_01, 0.000_025, 0.000_05, 0.000_1, 0.000_25, 0.000_5, 0.001, 0.002_5, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+# Upper bounds of the buckets for the number of lines per order
+LINE_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+# Help texts and bucket bounds of the metrics recorded by stores
+METRICS = {
+    "bestbuy_orders_total": ("Orders placed successfully.", None),
+    "bestbuy_order_seconds": ("Time to process an order.", LATENCY_BUCKETS),
+    "bestbuy_order_lines": ("Distinct products per order.", LINE_BUCKETS),
+    "bestbuy_promotion_seconds": ("Time to price and buy an order line, by promotion.", LATENCY_BUCKETS),
+    "bestbuy_validation_failures_total": ("Orders rejected by the checks, by reason.", None),
+    "bestbuy_lock_wait_seconds": ("Time waiting for the product locks of an order.", LATENCY_BUCKETS),
+}
+
+
+class Histogram:
+    """
+    Counts observed values in buckets with fixed upper bounds.
+
+    :param buckets: Increasing upper bounds of the buckets.
+    """
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        # The last count is for values above the highest bound
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        """
+        Adds a value to the histogram.
+
+        :param value: The observed value.
+        """
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative_counts(self):
+        """
+        Get the number of values up to every bound, as Prometheus reports them.
+
+        :return: List of tuples (upper bound, count), ending with float("inf").
+        """
+        cumulative = []
+        total = 0
+        for bound, count in zip((*self.buckets, float("inf")), self.counts):
+            total += count
+            cumulative.append((bound, total))
+        return cumulative
+
+
+def _escape(value):
+    """Escapes a label value for the Prometheus text format."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels, extra=()):
+    """
+    Formats labels for the Prometheus text format.
+
+    :param labels: Tuple of (name, value) pairs.
+    :param extra: Additional (name, value) pairs.
+    :return: Label string including the braces, or an empty string without labels.
+    """
+    pairs = (*labels, *extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_number(value):
+    """Formats a value for the Prometheus text format."""
+    if value == float("inf"):
+        return "+Inf"
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Metrics:
+    """
+    Counters and latency histograms of store operations.
+
+    A store only records metrics when it is given a Metrics instance, so
+    stores without one pay a single None check per order.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._started = perf_counter()
+
+    def increment(self, name, amount=1, **labels):
+        """
+        Increases a counter.
+
+        :param name: Name of the counter.
+        :param amount: Amount to add.
+        :param labels: Labels of the counter.
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        """
+        Adds a value to a histogram.
+
+        :param name: Name of the histogram, one of METRICS.
+        :param value: The observed value.
+        :param labels: Labels of the histogram.
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(METRICS[name][1])
+            histogram.observe(value)
+
+    def reset(self):
+        """Drops all recorded values."""
+        with self._lock:
+            self._counters = {}
+            self._histograms = {}
+            self._started = perf_counter()
+
+    def snapshot(self):
+        """
+        Get a copy of all recorded values.
+
+        :return: Dictionary with "counters" mapping (name, labels) to values,
+                 "histograms" mapping (name, labels) to dictionaries with count, sum and
+                 cumulative buckets, and "orders_per_second" since the metrics were created or reset.
+        """
+        with self._lock:
+            elapsed = perf_counter() - self._started
+            counters = dict(self._counters)
+            histograms = {key: {"count": histogram.count, "sum": histogram.sum,
+                                "buckets": histogram.cumulative_counts()}
+                          for key, histogram in self._histograms.items()}
+        orders = sum(value for (name, _), value in counters.items() if name == "bestbuy_orders_total")
+        return {"counters": counters, "histograms": histograms,
+                "orders_per_second": orders / elapsed if elapsed > 0 else 0.0}
+
+    def to_prometheus(self):
+        """
+        Formats all recorded values in the Prometheus text exposition format.
+
+        :return: String with one line per sample.
+        """
+        snapshot = self.snapshot()
+        lines = []
+        for name in sorted({name for name, _ in snapshot["counters"]}):
+            lines.append(f"# HELP {name} {METRICS.get(name, ('', None))[0]}")
+            lines.append(f"# TYPE {name} counter")
+            for (counter_name, labels), value in sorted(snapshot["counters"].items()):
+                if counter_name == name:
+                    lines.append(f"{name}{_format_labels(labels)} {_format_number(value)}")
+        for name in sorted({name for name, _ in snapshot["histograms"]}):
+            lines.append(f"# HELP {name} {METRICS[name][0]}")
+            lines.append(f"# TYPE {name} histogram")
+            for (histogram_name, labels), histogram in sorted(snapshot["histograms"].items()):
+                if histogram_name != name:
+                    continue
+                for bound, count in histogram["buckets"]:
+                    lines.append(f"{name}_bucket{_format_labels(labels, (('le', _format_number(bound)),))} {count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_number(histogram['sum'])}")
+                lines.append(f"{name}_count{_format_labels(labels)} {histogram['count']}")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,66 @@
+from decimal import Decimal, ROUND_HALF_UP, ROUND_HALF_EVEN, ROUND_DOWN, ROUND_UP
+
+# Money amounts are plain integers of cents, so sums and products stay exact and fast.
+# They are only converted to floats or decimals at the edges, e.g. for printing.
+CENTS_PER_UNIT = 100
+ONE_CENT = Decimal("0.01")
+
+
+def round_cents(numerator, denominator, rounding=ROUND_HALF_UP):
+    """
+    Rounds a non-negative fraction of cents to whole cents.
+
+    :param numerator: Numerator of the amount in cents.
+    :param denominator: Positive denominator of the amount in cents.
+    :param rounding: ROUND_HALF_UP, ROUND_HALF_EVEN, ROUND_DOWN or ROUND_UP of the decimal module.
+    :return: int, rounded amount in cents.
+    :raises ValueError: If the rounding is not supported.
+    """
+    cents, remainder = divmod(numerator, denominator)
+    if rounding == ROUND_HALF_UP:
+        return cents + (2 * remainder >= denominator)
+    if rounding == ROUND_HALF_EVEN:
+        return cents + (2 * remainder > denominator or (2 * remainder == denominator and cents % 2 == 1))
+    if rounding == ROUND_DOWN:
+        return cents
+    if rounding == ROUND_UP:
+        return cents + (remainder > 0)
+    raise ValueError(f"Rounding is not supported: {rounding} was given")
+
+
+def to_cents(amount):
+    """
+    Converts an amount of money to whole cents, rounding half up.
+
+    Floats are read by their shortest representation, so 19.99 is 1999 cents.
+
+    :param amount: Amount as an integer, float or Decimal.
+    :return: int, amount in cents.
+    """
+    if isinstance(amount, int):
+        return amount * CENTS_PER_UNIT
+    if isinstance(amount, float):
+        amount = Decimal(repr(amount))
+    return int(amount.quantize(ONE_CENT, rounding=ROUND_HALF_UP).scaleb(2))
+
+
+def cents_to_decimal(cents):
+    """
+    Converts cents to an exact decimal amount.
+
+    :param cents: Amount in cents.
+    :return: Decimal with two decimal places.
+    """
+    return Decimal(cents).scaleb(-2)
+
+
+def format_cents(cents):
+    """
+    Formats cents for display.
+
+    :param cents: Amount in cents.
+    :return: String with two decimal places, e.g. "12.30".
+    """
+    sign = "-" if cents < 0 else ""
+    units, cents = divmod(abs(cents), CENTS_PER_UNIT)
+    return f"{sign}{units}.{cents:02d}"
@@ -0,0 +1,87 @@
+from collections import OrderedDict
+from threading import Lock
+
+from money import cents_to_decimal
+
+
+class PriceCache:
+    """
+    A bounded least recently used cache of exact line prices.
+
+    Entries are keyed by product id and quantity and remember the product,
+    its version and the version of its promotion. An entry is only served
+    for the same product with unchanged versions, so a new price or promotion
+    of the product or an edited promotion never returns a stale price.
+
+    :param maxsize: Largest number of cached line prices.
+    :raises ValueError: If maxsize is not positive.
+    """
+
+    def __init__(self, maxsize=100_000):
+        if maxsize < 1:
+            raise ValueError("Maxsize needs to be positive")
+        self._maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def __len__(self):
+        """Get the number of cached line prices."""
+        return len(self._entries)
+
+    def price(self, product, quantity):
+        """
+        Get the exact price of a product and quantity, calculating it on a miss.
+
+        :param product: The product to be priced.
+        :param quantity: Quantity of the product.
+        :return: Total price as a Decimal.
+        """
+        return cents_to_decimal(self.price_cents(product, quantity))
+
+    def price_cents(self, product, quantity):
+        """
+        Get the price of a product and quantity in cents, calculating it on a miss.
+
+        :param product: The product to be priced.
+        :param quantity: Quantity of the product.
+        :return: int, total price in cents.
+        """
+        promotion = product.promotion
+        version = (product.version, -1 if promotion is None else promotion.version)
+        key = (product.product_id, quantity)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] is product and entry[1] == version:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return entry[2]
+            self._misses += 1
+
+        price = product.line_cents(quantity)
+        with self._lock:
+            self._entries[key] = (product, version, price)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+        return price
+
+    def clear(self):
+        """Drops all cached line prices and resets the statistics."""
+        with self._lock:
+            self._entries.clear()
+            self._hits = self._misses = self._evictions = 0
+
+    @property
+    def stats(self):
+        """
+        Get the statistics of the cache.
+
+        :return: Dictionary with the numbers of hits, misses, evictions, the size and the maxsize.
+        """
+        with self._lock:
+            return {"hits": self._hits, "misses": self._misses, "evictions": self._evictions,
+                    "size": len(self._entries), "maxsize": self._maxsize}
@@ -0,0 +1,231 @@
+from array import array
+from weakref import WeakValueDictionary
+
+from products import *
+
+# Kinds of products stored in a table row
+PRODUCT, NON_STOCKED, LIMITED = 0, 1, 2
+
+# Limit stored for rows of products without a purchase limit
+NO_LIMIT = -1
+
+
+class ProductTable:
+    """
+    A columnar table storing many products in contiguous arrays.
+
+    Rows are only turned into Product objects when they are accessed. These
+    objects are views: reading or changing them reads or changes the table.
+    """
+
+    def __init__(self):
+        self._names = []
+        self._product_ids = array("q")
+        # Prices in whole cents
+        self._prices = array("q")
+        self._quantities = array("q")
+        self._limits = array("q")
+        self._kinds = array("b")
+        self._active = bytearray()
+        # Promotions, observers and versions are rare, so they are only stored for the rows having one
+        self._promotions = {}
+        self._observers = {}
+        self._versions = {}
+        self._views = WeakValueDictionary()
+
+    @classmethod
+    def _from_columns(cls, names, product_ids, prices, quantities, limits, kinds, active, promotions):
+        """
+        Creates a table from existing columns without copying them.
+
+        The columns may be read-only sequences like memoryviews of a snapshot;
+        they are copied into growable arrays when a row is appended.
+
+        :return: ProductTable using the columns.
+        """
+        table = cls()
+        table._names = names
+        table._product_ids = product_ids
+        table._prices = prices
+        table._quantities = quantities
+        table._limits = limits
+        table._kinds = kinds
+        table._active = active
+        table._promotions = promotions
+        return table
+
+    def _make_growable(self):
+        """Copies columns that cannot grow into lists and arrays."""
+        if isinstance(self._names, list):
+            return
+        self._names = list(self._names)
+        for attribute in ("_product_ids", "_prices", "_quantities", "_limits", "_kinds"):
+            column = getattr(self, attribute)
+            if isinstance(column, array):
+                # Already an array, e.g. prices converted from a legacy snapshot
+                continue
+            growable_column = array(column.format)
+            growable_column.frombytes(column.cast("B"))
+            setattr(self, attribute, growable_column)
+        self._active = bytearray(self._active)
+
+    def __len__(self):
+        """Get the number of rows in the table."""
+        return len(self._names)
+
+    def __getitem__(self, row):
+        """
+        Get the product view of a row.
+
+        :param row: Index of the row.
+        :return: Product view of the row.
+        :raises IndexError: If the row does not exist.
+        """
+        if not -len(self) <= row < len(self):
+            raise IndexError(f"Row {row} not in table")
+        row %= len(self)
+        view = self._views.get(row)
+        if view is None:
+            view = _ROW_CLASSES[self._kinds[row]]._from_row(self, row)
+            self._views[row] = view
+        return view
+
+    def __iter__(self):
+        """Iterate over the product views of all rows."""
+        return (self[row] for row in range(len(self)))
+
+    def append(self, name, price, quantity=0, limit=None, stocked=True, product_id=None):
+        """
+        Adds a product row to the table, validated like the product classes.
+
+        :param name: Name of the product.
+        :param price: Price of the product.
+        :param quantity: Quantity of the product in stock.
+        :param limit: Purchase limit of the product or None for no limit.
+        :param stocked: False for products that are not stocked.
+        :param product_id: Stable id (SKU) of the product, generated when not given.
+        :return: Index of the new row.
+        :raises TypeError: If any of the input values has a wrong type.
+        :raises ValueError: If any of the input values are invalid.
+        """
+        validate_name(name)
+        validate_price(price)
+        validate_quantity(quantity)
+        if limit is not None:
+            validate_limit(limit)
+        if not stocked and limit is not None:
+            raise ValueError("Products that are not stocked cannot have a limit")
+        product_id = validate_product_id(product_id)
+        self._make_growable()
+
+        if not stocked:
+            kind, quantity, active = NON_STOCKED, 0, True
+        else:
+            kind = PRODUCT if limit is None else LIMITED
+            active = quantity != 0
+        self._names.append(name)
+        self._product_ids.append(product_id)
+        self._prices.append(to_cents(price))
+        self._quantities.append(quantity)
+        self._limits.append(NO_LIMIT if limit is None else limit)
+        self._kinds.append(kind)
+        self._active.append(active)
+        return len(self) - 1
+
+
+class _ProductRow:
+    """Maps the attributes of a product to a row of a ProductTable."""
+
+    __slots__ = ()
+
+    @classmethod
+    def _from_row(cls, table, row):
+        view = object.__new__(cls)
+        view._table = table
+        view._row = row
+        return view
+
+    @property
+    def _product_id(self):
+        return self._table._product_ids[self._row]
+
+    @property
+    def _name(self):
+        return self._table._names[self._row]
+
+    @property
+    def _price(self):
+        return self._table._prices[self._row]
+
+    @_price.setter
+    def _price(self, price):
+        self._table._prices[self._row] = price
+
+    @property
+    def _quantity(self):
+        return self._table._quantities[self._row]
+
+    @_quantity.setter
+    def _quantity(self, quantity):
+        self._table._quantities[self._row] = quantity
+
+    @property
+    def _active(self):
+        return bool(self._table._active[self._row])
+
+    @_active.setter
+    def _active(self, active):
+        self._table._active[self._row] = active
+
+    @property
+    def _member(self):
+        return self._table._promotions.get(self._row)
+
+    @_member.setter
+    def _member(self, promotion):
+        self._table._promotions[self._row] = promotion
+
+    @property
+    def _observers(self):
+        return self._table._observers.get(self._row, ())
+
+    @_observers.setter
+    def _observers(self, observers):
+        self._table._observers[self._row] = observers
+
+    @property
+    def _version(self):
+        return self._table._versions.get(self._row, 0)
+
+    @_version.setter
+    def _version(self, version):
+        self._table._versions[self._row] = version
+
+    @property
+    def _limit(self):
+        return self._table._limits[self._row]
+
+    @_limit.setter
+    def _limit(self, limit):
+        self._table._limits[self._row] = limit
+
+
+class ProductRow(_ProductRow, Product):
+    """A Product stored in a row of a ProductTable."""
+
+    __slots__ = ("_table", "_row")
+
+
+class NonStockedProductRow(_ProductRow, NonStockedProduct):
+    """A NonStockedProduct stored in a row of a ProductTable."""
+
+    __slots__ = ("_table", "_row")
+
+
+class LimitedProductRow(_ProductRow, LimitedProduct):
+    """A LimitedProduct stored in a row of a ProductTable."""
+
+    __slots__ = ("_table", "_row")
+
+
+_ROW_CLASSES = {PRODUCT: ProductRow, NON_STOCKED: NonStockedProductRow, LIMITED: LimitedProductRow}
@@ -1,5 +1,116 @@
+from threading import Lock
+
+from money import to_cents, format_cents
 from promotions import *
 
+# Next id of products created without an explicit one, kept above every id in use in the process
+_next_product_id = 1
+_product_id_lock = Lock()
+
+
+def reserve_product_ids(product_id):
+    """
+    Moves the generated product ids past an id used by a product, e.g. one loaded from a file.
+
+    :param product_id: Highest product id in use.
+    """
+    global _next_product_id
+    if product_id < _next_product_id:
+        return
+    with _product_id_lock:
+        if product_id >= _next_product_id:
+            _next_product_id = product_id + 1
+
+
+def validate_name(name):
+    """
+    Checks the name of a product.
+
+    :param name: Name of the product.
+    :return: The valid name.
+    :raises TypeError: If the name is not a string.
+    :raises ValueError: If the name is empty.
+    """
+    if not isinstance(name, str):
+        raise TypeError(f"Name needs to be a string: {type(name).__name__} was given")
+    if not name.strip():
+        raise ValueError("Name cannot be empty")
+    return name
+
+
+def validate_price(price):
+    """
+    Checks the price of a product.
+
+    :param price: Price of the product.
+    :return: The valid price.
+    :raises TypeError: If the price is not a number.
+    :raises ValueError: If the price is negative.
+    """
+    if not isinstance(price, (float, int)):
+        raise TypeError(f"Price needs to be an integer or a float number: {type(price).__name__} was given")
+    if price < 0:
+        raise ValueError("Price needs to be positive")
+    return price
+
+
+def validate_quantity(quantity):
+    """
+    Checks a quantity of a product.
+
+    :param quantity: Quantity of the product.
+    :return: The valid quantity.
+    :raises TypeError: If the quantity is not an integer.
+    :raises ValueError: If the quantity is negative.
+    """
+    if not isinstance(quantity, int):
+        raise TypeError(f"Quantity needs to be an integer: {type(quantity).__name__} was given")
+    if quantity < 0:
+        raise ValueError("Quantity needs to be positive")
+    return quantity
+
+
+def validate_limit(limit):
+    """
+    Checks the purchase limit of a product.
+
+    :param limit: Purchase limit of the product.
+    :return: The valid limit.
+    :raises TypeError: If the limit is not an integer.
+    :raises ValueError: If the limit is negative.
+    """
+    if not isinstance(limit, int):
+        raise TypeError(f"Limit needs to be an integer: {type(limit).__name__} was given")
+    if limit < 0:
+        raise ValueError("Limit needs to be positive")
+    return limit
+
+
+def validate_product_id(product_id):
+    """
+    Checks the id of a product, generating a new one when it is not given.
+
+    Generated ids are never below an explicit id checked before, so they
+    cannot collide with products created or loaded earlier.
+
+    :param product_id: Id of the product or None.
+    :return: The valid product id.
+    :raises TypeError: If the product id is not an integer.
+    :raises ValueError: If the product id is negative.
+    """
+    global _next_product_id
+    if product_id is None:
+        with _product_id_lock:
+            product_id = _next_product_id
+            _next_product_id += 1
+        return product_id
+    if not isinstance(product_id, int) or isinstance(product_id, bool):
+        raise TypeError(f"Product id needs to be an integer: {type(product_id).__name__} was given")
+    if product_id < 0:
+        raise ValueError("Product id needs to be positive")
+    reserve_product_ids(product_id)
+    return product_id
+
 
 class Product:
     """
@@ -8,61 +119,91 @@ class Product:
     :param name: Name of the product.
     :param price: Price of the product.
     :param quantity: Quantity of the product in stock.
+    :param product_id: Stable id (SKU) of the product, generated when not given.
     :raises TypeError: If the quantity is not an integer.
     :raises ValueError: If any of the input values are invalid.
     """
 
-    def __init__(self, name, price, quantity):
-        # Error handling name
-        if not isinstance(name, str):
-            raise TypeError(f"Name needs to be a string: {type(name).__name__} was given")
-        if not name.strip():
-            raise ValueError("Name cannot be empty")
-
-        # Error handling price
-        if not isinstance(price, (float, int)):
-            raise TypeError(f"Price needs to be an integer or a float number: {type(price).__name__} was given")
-        if price < 0:
-            raise ValueError("Price needs to be positive")
-
-        # Error handling quantity
-        if not isinstance(quantity, int):
-            raise TypeError(f"Quantity needs to be an integer: {type(quantity).__name__} was given")
-        if quantity < 0:
-            raise ValueError("Quantity needs to be positive")
+    __slots__ = ("_product_id", "_name", "_price", "_active", "_member", "_quantity", "_observers", "_version",
+                 "__weakref__")
+
+    def __init__(self, name, price, quantity, product_id=None):
+        validate_name(name)
+        validate_price(price)
+        validate_quantity(quantity)
 
         # Instance Variables
+        self._product_id = validate_product_id(product_id)
         self._name = name
-        self._price = float(price)
+        # Whole cents, so totals are summed exactly
+        self._price = to_cents(price)
         self._active = True
         self._member = None
+        self._observers = ()
+        self._version = 0
+        self._quantity = 0
         self.quantity = quantity
 
+    def add_observer(self, observer):
+        """
+        Register a function called after every change of the product.
+
+        :param observer: Function called as observer(product, attribute, old_value, new_value),
+                         where attribute is "price", "quantity", "active", "promotion" or "limit".
+        """
+        self._observers = (*self._observers, observer)
+
+    def remove_observer(self, observer):
+        """
+        Unregister a function registered with add_observer.
+
+        :param observer: The registered function.
+        :raises ValueError: If the function is not registered.
+        """
+        observers = list(self._observers)
+        observers.remove(observer)
+        self._observers = tuple(observers)
+
+    def _notify(self, attribute, old_value, new_value):
+        """Call all observers after a change of the product."""
+        for observer in self._observers:
+            observer(self, attribute, old_value, new_value)
+
     def __lt__(self, product):
         """Check if the product is cheaper than another."""
-        return self._price < product.price
+        return self._price < product.price_cents
 
     def __gt__(self, product):
         """Check if the product is more expensive than another."""
-        return self._price > product.price
+        return self._price > product.price_cents
 
     def __ge__(self, product):
         """Check if the product is as expensive or more than another."""
-        return self._price >= product.price
+        return self._price >= product.price_cents
 
     def __le__(self, product):
         """Check if the product is as cheap or cheaper than another."""
-        return self._price <= product.price
+        return self._price <= product.price_cents
 
     def __eq__(self, product):
         """Check if the product price is equal to another."""
-        return self._price == product.price
+        return self._price == product.price_cents
 
     @property
     def price(self):
         """Get the price of the product."""
+        return self._price / 100
+
+    @property
+    def price_cents(self):
+        """Get the price of the product in whole cents."""
         return self._price
 
+    @property
+    def version(self):
+        """Get the number of price and promotion changes of the product."""
+        return self._version
+
     @price.setter
     def price(self, price):
         """
@@ -72,17 +213,23 @@ class Product:
         :raises TypeError: If the price is not a number.
         :raises ValueError: If the price is negative.
         """
-        if not isinstance(price, (int, float)):
-            raise TypeError(f"Price needs to be an integer or a float number: {type(price).__name__} was given")
-        if price < 0:
-            raise ValueError("Price needs to be positive")
-        self._price = price
+        validate_price(price)
+        old_price = self._price
+        self._price = to_cents(price)
+        self._version += 1
+        if self._observers:
+            self._notify("price", old_price / 100, self._price / 100)
 
     @property
     def name(self):
         """Get the name of the product."""
         return self._name
 
+    @property
+    def product_id(self):
+        """Get the stable id (SKU) of the product."""
+        return self._product_id
+
     @property
     def quantity(self):
         """
@@ -101,12 +248,12 @@ class Product:
         :raises TypeError: If the quantity is not an integer.
         :raises ValueError: If the quantity is negative.
         """
-        if not isinstance(quantity, int):
-            raise TypeError(f"Quantity needs to be an integer: {type(quantity).__name__} was given")
-        if quantity < 0:
-            raise ValueError("Quantity needs to be positive")
+        validate_quantity(quantity)
 
+        old_quantity = self._quantity
         self._quantity = quantity
+        if self._observers:
+            self._notify("quantity", old_quantity, quantity)
         if self._quantity == 0:
             self.deactivate()
 
@@ -121,11 +268,17 @@ class Product:
 
     def activate(self):
         """Activate the product, marking it as in stock."""
-        self._active = True
+        if not self._active:
+            self._active = True
+            if self._observers:
+                self._notify("active", False, True)
 
     def deactivate(self):
         """Deactivate the product, marking it as out of stock."""
-        self._active = False
+        if self._active:
+            self._active = False
+            if self._observers:
+                self._notify("active", True, False)
 
     @property
     def promotion(self):
@@ -143,76 +296,113 @@ class Product:
         if not isinstance(promotion, Promotion):
             raise TypeError(f"Promotion needs to be an instance of class Promotion: "
                             f"{type(promotion).__name__} was given")
+        old_promotion = self._member
         self._member = promotion
+        self._version += 1
+        if self._observers:
+            self._notify("promotion", old_promotion, promotion)
 
     def __str__(self):
         """Display product details including name, price, and quantity."""
-        return f"{self._name}, Price: {self._price}$, Quantity: {self._quantity}, Promotion: {self._member}"
+        return (f"{self._name}, Price: {format_cents(self._price)}$, Quantity: {self._quantity}, "
+                f"Promotion: {self._member}")
+
+    def line_cents(self, quantity):
+        """
+        Calculates the price of a quantity of the product in cents without buying it.
+
+        :param quantity: Number of items.
+        :return: int, total price in cents after applying the promotion.
+        """
+        promotion = self._member
+        if promotion is None:
+            return self._price * quantity
+        try:
+            return promotion.price_cents(self._price, quantity)
+        except NotImplementedError:
+            return to_cents(promotion.apply_promotion(product=self, quantity=quantity))
 
     def buy(self, quantity):
         """
         Processes the purchase by reducing stock and calculating total cost.
 
+        Subclasses can override buy or buy_cents; stores buy through an
+        overridden buy, see purchase_cents.
+
         :param quantity: Number of items to buy.
         :return: Total price for the purchase.
         :raises TypeError: If the quantity is not an integer.
         :raises ValueError: If not enough items are in stock or quantity is negative.
         """
-        if not isinstance(quantity, int):
-            raise TypeError(f"Quantity needs to be an integer: {type(quantity).__name__} was given")
-        if quantity < 0:
-            raise ValueError("Quantity needs to be positive")
+        return self.buy_cents(quantity) / 100
+
+    def buy_cents(self, quantity):
+        """
+        Processes the purchase by reducing stock and calculating the total cost in cents.
+
+        :param quantity: Number of items to buy.
+        :return: int, total price for the purchase in cents.
+        :raises TypeError: If the quantity is not an integer.
+        :raises ValueError: If not enough items are in stock or quantity is negative.
+        """
+        validate_quantity(quantity)
         if not self.is_active:
             raise TypeError(f"Product {self._name} is not active")
         if quantity > self._quantity:
             raise ValueError(f"Not enough quantity in stock for {self._name}")
-        if self._member is not None:
-            total_price = self._member.apply_promotion(product=self, quantity=quantity)
-            self._quantity -= quantity
-            return total_price
-
-        total_price = self._price * quantity
-        self._quantity -= quantity
+        total_price = self.line_cents(quantity)
+        self.quantity -= quantity
         return total_price
 
 
+def purchase_cents(product, quantity):
+    """
+    Buys a quantity of a product in cents, the way stores buy order lines.
+
+    Products whose class overrides buy are bought through it, so buy stays an
+    extension point; all others are bought with the exact buy_cents.
+
+    :param product: The product to be bought.
+    :param quantity: Number of items to buy.
+    :return: int, total price for the purchase in cents.
+    :raises TypeError: If the quantity is not an integer or the product is not active.
+    :raises ValueError: If the product cannot be bought in the quantity.
+    """
+    if type(product).buy is Product.buy:
+        return product.buy_cents(quantity)
+    return to_cents(product.buy(quantity))
+
+
 class NonStockedProduct(Product):
-    def __init__(self, name, price):
-        super().__init__(name, price, quantity=0)
+    __slots__ = ()
+
+    def __init__(self, name, price, product_id=None):
+        super().__init__(name, price, quantity=0, product_id=product_id)
         self._active = True
 
     def __str__(self):
         """Display product details including name, price, and promotion."""
-        return f"{self._name}, Price: {self._price}$, Promotion: {self._member}"
+        return f"{self._name}, Price: {format_cents(self._price)}$, Promotion: {self._member}"
 
-    def buy(self, quantity):
+    def buy_cents(self, quantity):
         """
-        Processes the purchase for non-stocked products.
+        Processes the purchase for non-stocked products in cents.
 
         :param quantity: Number of items to buy.
-        :return: Total price for the purchase.
+        :return: int, total price for the purchase in cents.
         :raises TypeError: If the quantity is not an integer.
         :raises ValueError: If quantity is negative.
         """
-        if not isinstance(quantity, int):
-            raise TypeError(f"Quantity needs to be an integer: {type(quantity).__name__} was given")
-        if quantity < 0:
-            raise ValueError("Quantity needs to be positive")
-        if self._member is not None:
-            total_price = self._member.apply_promotion(product=self, quantity=quantity)
-            return total_price
-
-        total_price = self._price * quantity
-        return total_price
+        validate_quantity(quantity)
+        return self.line_cents(quantity)
 
 
 class LimitedProduct(Product):
-    def __init__(self, name, price, quantity, limit):
-        super().__init__(name, price, quantity)
-        if not isinstance(limit, int):
-            raise TypeError(f"Limit needs to be an integer: {type(limit).__name__} was given")
-        if limit < 0:
-            raise ValueError("Limit needs to be positive")
+    __slots__ = ("_limit",)
+
+    def __init__(self, name, price, quantity, limit, product_id=None):
+        super().__init__(name, price, quantity, product_id=product_id)
+        validate_limit(limit)
         self._limit = limit
 
     @property
@@ -229,32 +419,24 @@ class LimitedProduct(Product):
         :raises TypeError: If the limit is not an integer.
         :raises ValueError: If the limit is negative.
         """
-        if not isinstance(limit, int):
-            raise TypeError(f"Limit needs to be an integer: {type(limit).__name__} was given")
-        if limit < 0:
-            raise ValueError("Limit needs to be positive")
+        validate_limit(limit)
+        old_limit = self._limit
         self._limit = limit
+        if self._observers:
+            self._notify("limit", old_limit, limit)
 
-    def buy(self, quantity):
+    def buy_cents(self, quantity):
         """
-        Processes the purchase considering the limit.
+        Processes the purchase in cents considering the limit.
 
         :param quantity: Number of items to buy.
-        :return: Total price for the purchase.
+        :return: int, total price for the purchase in cents.
         :raises TypeError: If the quantity is not an integer.
         :raises ValueError: If quantity is negative or exceeds limit.
         """
-        if not isinstance(quantity, int):
-            raise TypeError(f"Quantity needs to be an integer: {type(quantity).__name__} was given")
-        if quantity < 0:
-            raise ValueError("Quantity needs to be positive")
+        validate_quantity(quantity)
         if self._limit < quantity:
             raise ValueError(f"Quantity needs to be in range of the Limit ({self._limit})")
-        if self._member is not None:
-            total_price = self._member.apply_promotion(product=self, quantity=quantity)
-            self.quantity -= quantity
-            return total_price
-
-        total_price = self._price * quantity
+        total_price = self.line_cents(quantity)
         self.quantity -= quantity
         return total_price
@@ -1,4 +1,19 @@
 from abc import ABC, abstractmethod
+from decimal import Decimal, ROUND_HALF_UP
+
+from money import round_cents
+
+
+def to_decimal(price):
+    """
+    Converts a price to an exact decimal number.
+
+    :param price: Price as an integer, float or Decimal.
+    :return: Decimal with the shortest representation of the price.
+    """
+    if isinstance(price, Decimal):
+        return price
+    return Decimal(repr(price)) if isinstance(price, float) else Decimal(price)
 
 
 class Promotion(ABC):
@@ -8,9 +23,23 @@ class Promotion(ABC):
     :param name: The name of the promotion.
     """
 
+    # Increased by every change of a public attribute, so cached prices can detect edits
+    _version = 0
+
     def __init__(self, name):
         self.member = name
 
+    def __setattr__(self, name, value):
+        """Sets an attribute, increasing the version when a public attribute changes."""
+        super().__setattr__(name, value)
+        if not name.startswith("_"):
+            super().__setattr__("_version", self._version + 1)
+
+    @property
+    def version(self):
+        """Get the number of changes of the promotion."""
+        return self._version
+
     def __str__(self):
         """Returns the name of the promotion."""
         return self.member
@@ -26,6 +55,20 @@ class Promotion(ABC):
         """
         pass
 
+    def price_cents(self, cents, quantity):
+        """
+        Optional closed form of the promotion in whole cents.
+
+        Promotions implementing it are priced in constant time with integer
+        arithmetic only, which is how products and stores charge them.
+
+        :param cents: Unit price in cents.
+        :param quantity: The quantity of the product being purchased.
+        :return: int, total price after applying the promotion in cents.
+        :raises NotImplementedError: If the promotion has no closed form.
+        """
+        raise NotImplementedError(f"{type(self).__name__} has no closed form price")
+
 
 class SecondHalfPrice(Promotion):
     """
@@ -42,13 +85,17 @@ class SecondHalfPrice(Promotion):
         :param quantity: The quantity of the product being purchased.
         :return: Total price after applying the second half price promotion.
         """
-        total_sum = 0
-        for count in range(1, quantity + 1):
-            if count % 2 == 0:
-                total_sum += 0.5 * product.price
-            else:
-                total_sum += product.price
-        return total_sum
+        return self.price_cents(product.price_cents, quantity) / 100
+
+    def price_cents(self, cents, quantity):
+        """
+        Prices the items in cents, rounding a remaining half cent up.
+
+        :param cents: Unit price in cents.
+        :param quantity: The quantity of the product being purchased.
+        :return: int, total price after applying the second half price promotion in cents.
+        """
+        return (cents * (2 * quantity - quantity // 2) + 1) // 2
 
 
 class ThirdOneFree(Promotion):
@@ -66,26 +113,42 @@ class ThirdOneFree(Promotion):
         :param quantity: The quantity of the product being purchased.
         :return: Total price after applying the third item free promotion.
         """
-        total_sum = 0
-        for count in range(1, quantity + 1):
-            if count % 3 == 0:
-                pass  # No charge for every third item
-            else:
-                total_sum += product.price
-        return total_sum
+        return self.price_cents(product.price_cents, quantity) / 100
+
+    def price_cents(self, cents, quantity):
+        """
+        Prices the items in cents, which needs no rounding.
+
+        :param cents: Unit price in cents.
+        :param quantity: The quantity of the product being purchased.
+        :return: int, total price after applying the third item free promotion in cents.
+        """
+        return cents * (quantity - quantity // 3)
 
 
 class PercentDiscount(Promotion):
     """
     A promotion that offers a percentage discount on the product price.
 
+    The discounted total of a line is rounded to whole cents once, by
+    default half up, so 3 items of 1.25 at 30% cost 2.63.
+
     :param name: The name of the promotion (inherited from Promotion).
     :param percent: The discount percentage to be applied.
+    :param rounding: ROUND_HALF_UP, ROUND_HALF_EVEN, ROUND_DOWN or ROUND_UP of the decimal module.
+    :raises ValueError: If the rounding is not supported.
     """
 
-    def __init__(self, name, percent):
+    # Default of the class, also used by promotions saved before rounding was added
+    rounding = ROUND_HALF_UP
+
+    def __init__(self, name, percent, rounding=ROUND_HALF_UP):
         super().__init__(name)
+        round_cents(0, 1, rounding)
         self.percent = percent
+        # Only stored when it differs from the default, so saved promotions stay unchanged
+        if rounding != ROUND_HALF_UP:
+            self.rounding = rounding
 
     def apply_promotion(self, product, quantity):
         """
@@ -95,5 +158,21 @@ class PercentDiscount(Promotion):
         :param quantity: The quantity of the product being purchased.
         :return: Total price after applying the percentage discount promotion.
         """
-        disc_multiplier = 1 - (self.percent / 100)
-        return (product.price * quantity) * disc_multiplier
+        return self.price_cents(product.price_cents, quantity) / 100
+
+    def price_cents(self, cents, quantity):
+        """
+        Applies the percentage discount in cents, rounding the line total by the rounding of the promotion.
+
+        :param cents: Unit price in cents.
+        :param quantity: The quantity of the product being purchased.
+        :return: int, total price after applying the percentage discount promotion in cents.
+        """
+        percent = self.percent
+        rounding = self.rounding
+        if isinstance(percent, int):
+            if rounding == ROUND_HALF_UP:
+                return (cents * quantity * (100 - percent) + 50) // 100
+            return round_cents(cents * quantity * (100 - percent), 100, rounding)
+        numerator, denominator = to_decimal(percent).as_integer_ratio()
+        return round_cents(cents * quantity * (100 * denominator - numerator), 100 * denominator, rounding)
@@ -0,0 +1,263 @@
+from decimal import Decimal, ROUND_HALF_UP
+
+from money import ONE_CENT
+from promotions import to_decimal, SecondHalfPrice, ThirdOneFree, PercentDiscount
+from store import Store
+
+
+class Rule:
+    """
+    Base class of the promotion rules of a RulesEngine.
+
+    Rules of a product are applied from the highest priority down; an
+    exclusive rule stops all rules with a lower priority. Rules are treated
+    as unchangeable once they are added to an engine.
+
+    :param priority: Rules with a higher priority are applied first.
+    :param exclusive: True to skip all rules with a lower priority.
+    """
+
+    def __init__(self, priority=0, exclusive=False):
+        self.priority = priority
+        self.exclusive = exclusive
+
+
+class PercentOff(Rule):
+    """
+    A product rule taking a percentage off the price; several of them stack.
+
+    :param percent: The discount percentage.
+    """
+
+    def __init__(self, percent, priority=0, exclusive=False):
+        super().__init__(priority, exclusive)
+        if not 0 <= percent <= 100:
+            raise ValueError(f"Percent needs to be between 0 and 100: {percent} was given")
+        self.percent = percent
+
+
+class BuyXGetY(Rule):
+    """
+    A product rule giving get items at a discount for every buy items.
+
+    Only the buy-x-get-y rule with the highest priority of a product is used.
+
+    :param buy: Number of items paid in full.
+    :param get: Number of discounted items that follow them.
+    :param percent_off: Discount of the following items, 100 for free items.
+    """
+
+    def __init__(self, buy, get, percent_off=100, priority=0, exclusive=False):
+        super().__init__(priority, exclusive)
+        if not isinstance(buy, int) or not isinstance(get, int) or buy < 1 or get < 1:
+            raise ValueError("Buy and get need to be positive integers")
+        if not 0 <= percent_off <= 100:
+            raise ValueError(f"Percent needs to be between 0 and 100: {percent_off} was given")
+        self.buy = buy
+        self.get = get
+        self.percent_off = percent_off
+
+
+class CartThreshold(Rule):
+    """
+    A cart rule taking a percentage off carts of at least a total price.
+
+    Only the rule with the highest threshold a cart reaches is used.
+
+    :param threshold: Lowest cart total the discount applies to.
+    :param percent: The discount percentage.
+    """
+
+    def __init__(self, threshold, percent, priority=0):
+        super().__init__(priority)
+        if not 0 <= percent <= 100:
+            raise ValueError(f"Percent needs to be between 0 and 100: {percent} was given")
+        self.threshold = to_decimal(threshold)
+        self.percent = percent
+
+
+class Bundle(Rule):
+    """
+    A cart rule selling a set of products together for a fixed price.
+
+    Bundled items are charged the bundle price instead of their product rules.
+
+    :param items: List of tuples (product, count) in the bundle.
+    :param price: Price of one complete bundle.
+    """
+
+    def __init__(self, items, price, priority=0):
+        super().__init__(priority)
+        if not items:
+            raise ValueError("A bundle needs at least one product")
+        if not all(isinstance(count, int) and count >= 1 for _, count in items):
+            raise ValueError("Counts of a bundle need to be positive integers")
+        self.items = [(product.product_id, count) for product, count in items]
+        self.price = to_decimal(price)
+
+
+def _promotion_rule(promotion):
+    """
+    Converts a promotion of a product to an equivalent rule.
+
+    :param promotion: Promotion instance.
+    :return: Rule or None if the promotion has no equivalent rule.
+    """
+    if type(promotion) is SecondHalfPrice:
+        return BuyXGetY(1, 1, percent_off=50)
+    if type(promotion) is ThirdOneFree:
+        return BuyXGetY(2, 1)
+    if type(promotion) is PercentDiscount and promotion.rounding == ROUND_HALF_UP:
+        return PercentOff(promotion.percent)
+    return None
+
+
+class RulesEngine:
+    """
+    Prices carts with stackable product rules and cart rules.
+
+    The rules of a product, including the rule equivalent to its promotion,
+    are compiled into a plan (discounted unit price, group size, discount per
+    group) so a line costs unit price * quantity - quantity // group * discount,
+    rounded half up to whole cents like the promotions round it.
+    Plans are built on first use and rebuilt when the version of the product
+    or of its promotion changed, so promotions edited in place are seen too.
+
+    :param store: Store whose products are priced.
+    """
+
+    def __init__(self, store):
+        self._store = store
+        self._product_rules = {}
+        self._bundles = []
+        self._thresholds = []
+        # Plans by product id, stored as tuples (versions of the product and its promotion, plan)
+        self._plans = {}
+        store.add_observer(self._store_changed)
+
+    def _store_changed(self, store, action, product):
+        """Forgets the plans of removed products."""
+        if action != "add":
+            self._plans.pop(product.product_id, None)
+
+    def add_rule(self, rule, products=None):
+        """
+        Adds a rule to the engine.
+
+        :param rule: PercentOff or BuyXGetY for the given products, or a cart rule.
+        :param products: List of products a product rule applies to.
+        :raises ValueError: If a product rule has no products.
+        """
+        if isinstance(rule, Bundle):
+            self._bundles.append(rule)
+            self._bundles.sort(key=lambda bundle: -bundle.priority)
+        elif isinstance(rule, CartThreshold):
+            self._thresholds.append(rule)
+            self._thresholds.sort(key=lambda threshold: (-threshold.threshold, -threshold.priority))
+        else:
+            if not products:
+                raise ValueError("Product rules need a list of products")
+            for product in products:
+                self._product_rules.setdefault(product.product_id, []).append(rule)
+                self._plans.pop(product.product_id, None)
+
+    def remove_rule(self, rule):
+        """
+        Removes a rule from the engine.
+
+        :param rule: A rule added with add_rule.
+        """
+        if isinstance(rule, Bundle):
+            self._bundles.remove(rule)
+        elif isinstance(rule, CartThreshold):
+            self._thresholds.remove(rule)
+        else:
+            for product_id, rules in self._product_rules.items():
+                if rule in rules:
+                    rules.remove(rule)
+                    self._plans.pop(product_id, None)
+
+    def invalidate(self, product=None):
+        """
+        Drops compiled plans after a rule was changed in place.
+
+        :param product: The product whose plan is dropped, or None for all products.
+        """
+        if product is None:
+            self._plans.clear()
+        else:
+            self._plans.pop(product.product_id, None)
+
+    def plan(self, product):
+        """
+        Get the compiled plan of a product, compiling it when needed.
+
+        :param product: A product of the store.
+        :return: Tuple (discounted unit price, group size, discount per group, price factor, fallback),
+                 where fallback is the product when its promotion has to be applied itself.
+        """
+        promotion = product.promotion
+        versions = (product.version, -1 if promotion is None else promotion.version)
+        entry = self._plans.get(product.product_id)
+        if entry is None or entry[0] != versions:
+            entry = self._plans[product.product_id] = (versions, self._compile(product))
+        return entry[1]
+
+    def _compile(self, product):
+        """Compiles the rules of a product into a plan."""
+        rules = list(self._product_rules.get(product.product_id, ()))
+        fallback = None
+        if product.promotion is not None:
+            promotion_rule = _promotion_rule(product.promotion)
+            if promotion_rule is None:
+                fallback = product
+            else:
+                rules.append(promotion_rule)
+
+        group, free, factor = 1, Decimal(0), Decimal(1)
+        for rule in sorted(rules, key=lambda rule: -rule.priority):
+            if isinstance(rule, PercentOff):
+                factor = factor * (100 - to_decimal(rule.percent)) / 100
+            elif group == 1 and fallback is None:
+                group = rule.buy + rule.get
+                free = rule.get * to_decimal(rule.percent_off) / 100
+            if rule.exclusive:
+                break
+        unit_price = to_decimal(product.price) * factor
+        return unit_price, group, unit_price * free, factor, fallback
+
+    def price_cart(self, shopping_list):
+        """
+        Calculates the price of a cart without buying it.
+
+        Bundles are taken out first, then the remaining lines are priced with
+        their plans and the best cart threshold reached is applied last.
+
+        :param shopping_list: List of tuples (product, quantity).
+        :return: Total price of the cart as a Decimal.
+        :raises TypeError: If a quantity is not an integer.
+        :raises ValueError: If a product is not found or a quantity is negative.
+        """
+        order_lines = self._store._group_order(shopping_list)
+        quantities = {product_id: quantity for product_id, (_, quantity) in order_lines.items()}
+
+        total = 0
+        for bundle in self._bundles:
+            bundle_count = min(quantities.get(product_id, 0) // count for product_id, count in bundle.items)
+            if bundle_count:
+                for product_id, count in bundle.items:
+                    quantities[product_id] -= bundle_count * count
+                total += bundle_count * bundle.price
+
+        for product_id, quantity in quantities.items():
+            unit_price, group, discount, factor, fallback = self.plan(order_lines[product_id][0])
+            if fallback is None:
+                line_price = unit_price * quantity - quantity // group * discount
+            else:
+                line_price = Store._price_line(fallback, quantity) * factor
+            total += line_price.quantize(ONE_CENT, rounding=ROUND_HALF_UP)
+
+        for threshold in self._thresholds:
+            if total >= threshold.threshold:
+                return (total * (100 - to_decimal(threshold.percent)) / 100).quantize(ONE_CENT, rounding=ROUND_HALF_UP)
+        return Decimal(total)
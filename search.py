@@ -0,0 +1,142 @@
+from bisect import bisect_left, bisect_right, insort
+from itertools import islice
+
+
+class SearchIndex:
+    """
+    Indexes of the products of a store by name, price and promotion.
+
+    The indexes observe the store and its products, so they stay correct
+    when products are added, removed or get a new price or promotion.
+
+    :param store: The store to be indexed.
+    """
+
+    def __init__(self, store):
+        self._products = {}
+        # Sorted lists of (case folded name, product id) and (price, product id)
+        self._names = []
+        self._prices = []
+        # Products by the id of their promotion, and all products with a promotion
+        self._promotions = {}
+        self._promoted = {}
+
+        for product in store:
+            self._products[product.product_id] = product
+            self._index_promotion(product, product.promotion)
+            product.add_observer(self._product_changed)
+        self._names = sorted((product.name.casefold(), product_id) for product_id, product in self._products.items())
+        self._prices = sorted((product.price, product_id) for product_id, product in self._products.items())
+        store.add_observer(self._store_changed)
+
+    def _index_promotion(self, product, promotion):
+        """Adds a product to the promotion indexes."""
+        if promotion is not None:
+            self._promotions.setdefault(id(promotion), {})[product.product_id] = product
+            self._promoted[product.product_id] = product
+
+    def _unindex_promotion(self, product, promotion):
+        """Removes a product from the promotion indexes."""
+        if promotion is not None:
+            promoted_products = self._promotions[id(promotion)]
+            del promoted_products[product.product_id]
+            if not promoted_products:
+                del self._promotions[id(promotion)]
+            self._promoted.pop(product.product_id, None)
+
+    @staticmethod
+    def _remove_sorted(sorted_list, item):
+        """Removes an item from a sorted list."""
+        position = bisect_left(sorted_list, item)
+        if position < len(sorted_list) and sorted_list[position] == item:
+            del sorted_list[position]
+
+    def _store_changed(self, store, action, product):
+        """Indexes products added to the store and drops removed products."""
+        if action == "add":
+            self._products[product.product_id] = product
+            insort(self._names, (product.name.casefold(), product.product_id))
+            insort(self._prices, (product.price, product.product_id))
+            self._index_promotion(product, product.promotion)
+            product.add_observer(self._product_changed)
+        else:
+            del self._products[product.product_id]
+            self._remove_sorted(self._names, (product.name.casefold(), product.product_id))
+            self._remove_sorted(self._prices, (product.price, product.product_id))
+            self._unindex_promotion(product, product.promotion)
+            product.remove_observer(self._product_changed)
+
+    def _product_changed(self, product, attribute, old_value, new_value):
+        """Moves a product in the indexes after its price or promotion changed."""
+        if attribute == "price":
+            self._remove_sorted(self._prices, (old_value, product.product_id))
+            insort(self._prices, (new_value, product.product_id))
+        elif attribute == "promotion":
+            self._unindex_promotion(product, old_value)
+            self._index_promotion(product, new_value)
+
+    def _name_range(self, prefix):
+        """Get the positions of the names starting with a prefix."""
+        prefix = prefix.casefold()
+        start = bisect_left(self._names, (prefix,))
+        if not prefix:
+            return start, len(self._names)
+        # Every name starting with the prefix sorts before the prefix followed by the highest character
+        return start, bisect_left(self._names, (prefix + chr(0x10FFFF),), lo=start)
+
+    def _price_range(self, min_price, max_price):
+        """Get the positions of the prices in a range."""
+        start = 0 if min_price is None else bisect_left(self._prices, (min_price,))
+        end = len(self._prices) if max_price is None else bisect_right(self._prices, (max_price, float("inf")))
+        return start, max(start, end)
+
+    def search(self, name_prefix=None, min_price=None, max_price=None, promotion=None, promoted=None,
+               active_only=True, limit=None):
+        """
+        Finds products matching all given criteria.
+
+        The smallest index matching one criterion is scanned and the other
+        criteria are checked per product. Results are produced lazily and
+        products should not be changed while the results are consumed.
+
+        :param name_prefix: Start of the product names, case insensitive.
+        :param min_price: Lowest price of the products.
+        :param max_price: Highest price of the products.
+        :param promotion: Promotion the products need to have.
+        :param promoted: True for products with any promotion, False for products without one.
+        :param active_only: False to also find inactive products.
+        :param limit: Largest number of products to find or None for all.
+        :return: Iterator of matching products.
+        """
+        candidates = [(len(self._products), lambda: iter(self._products.values()))]
+        if promotion is not None:
+            promoted_products = self._promotions.get(id(promotion), {})
+            candidates.append((len(promoted_products), lambda: iter(promoted_products.values())))
+        elif promoted:
+            candidates.append((len(self._promoted), lambda: iter(self._promoted.values())))
+        if name_prefix is not None:
+            name_start, name_end = self._name_range(name_prefix)
+            candidates.append((name_end - name_start, lambda: (self._products[self._names[position][1]]
+                                                               for position in range(name_start, name_end))))
+        if min_price is not None or max_price is not None:
+            price_start, price_end = self._price_range(min_price, max_price)
+            candidates.append((price_end - price_start, lambda: (self._products[self._prices[position][1]]
+                                                                 for position in range(price_start, price_end))))
+        _, scan = min(candidates, key=lambda candidate: candidate[0])
+
+        folded_prefix = None if name_prefix is None else name_prefix.casefold()
+
+        def matches(product):
+            if active_only and not product.is_active:
+                return False
+            if folded_prefix is not None and not product.name.casefold().startswith(folded_prefix):
+                return False
+            if min_price is not None and product.price < min_price:
+                return False
+            if max_price is not None and product.price > max_price:
+                return False
+            if promotion is not None and product.promotion is not promotion:
+                return False
+            return promoted is None or (product.promotion is not None) == promoted
+
+        return islice(filter(matches, scan()), limit)
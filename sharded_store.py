@@ -0,0 +1,278 @@
+import hashlib
+from bisect import bisect_right
+from itertools import count
+
+from products import Product
+from store import Store
+
+
+def _ring_hash(key):
+    """
+    Hashes a key to a position on the ring, the same in every process.
+
+    :param key: String to be hashed.
+    :return: Integer position.
+    """
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """
+    A consistent hash ring placing product ids on shards.
+
+    Every shard owns virtual_nodes points of the ring and a product id
+    belongs to the shard of the next point after its hash, so adding a
+    shard only moves the ids of the ranges the new points take over.
+
+    :param virtual_nodes: Number of points per shard.
+    """
+
+    def __init__(self, virtual_nodes=64):
+        self._virtual_nodes = virtual_nodes
+        self._points = []
+        self._owners = []
+
+    def add(self, shard_name):
+        """
+        Adds the points of a shard to the ring.
+
+        :param shard_name: Name of the shard.
+        """
+        points = dict(zip(self._points, self._owners))
+        for node in range(self._virtual_nodes):
+            points[_ring_hash(f"{shard_name}#{node}")] = shard_name
+        self._points = sorted(points)
+        self._owners = [points[point] for point in self._points]
+
+    def remove(self, shard_name):
+        """
+        Removes the points of a shard from the ring.
+
+        :param shard_name: Name of the shard.
+        """
+        remaining = [(point, owner) for point, owner in zip(self._points, self._owners) if owner != shard_name]
+        self._points = [point for point, _ in remaining]
+        self._owners = [owner for _, owner in remaining]
+
+    def owner(self, product_id):
+        """
+        Get the shard a product id belongs to.
+
+        :param product_id: Id (SKU) of the product.
+        :return: Name of the shard.
+        :raises ValueError: If the ring has no shards.
+        """
+        if not self._points:
+            raise ValueError("The ring has no shards")
+        position = bisect_right(self._points, _ring_hash(str(product_id)))
+        return self._owners[position % len(self._points)]
+
+
+class ShardedStore:
+    """
+    A store splitting its products across several Store shards by product id.
+
+    Orders spanning several shards use a two-phase commit: every shard
+    reserves its lines first and the reservations are only checked out when
+    all shards accepted them, otherwise they are cancelled. Shards only need
+    the order_cents, reserve, checkout_cents, cancel_reservation and restock methods of Store,
+    so a proxy of a store in another process can serve as a shard.
+
+    :param products: List of products to be placed on the shards.
+    :param shard_count: Number of shards created.
+    :param virtual_nodes: Number of ring points per shard.
+    :param concurrent: True to create concurrent shards.
+    :raises TypeError: If products is not a list or contains non-Product instances.
+    """
+
+    def __init__(self, products, shard_count=4, virtual_nodes=64, concurrent=False):
+        self._ring = HashRing(virtual_nodes)
+        self._shards = {}
+        self._concurrent = concurrent
+        self._shard_numbers = count()
+        for _ in range(shard_count):
+            self._create_shard()
+        self.add_product(products)
+
+    def _create_shard(self):
+        """Creates an empty shard and adds it to the ring."""
+        shard_name = f"shard-{next(self._shard_numbers)}"
+        self._shards[shard_name] = Store([], concurrent=self._concurrent)
+        self._ring.add(shard_name)
+        return shard_name
+
+    @property
+    def shards(self):
+        """Get a dictionary mapping the shard names to their stores."""
+        return dict(self._shards)
+
+    def shard_for(self, product):
+        """
+        Get the shard owning a product.
+
+        :param product: Product instance.
+        :return: Store of the shard.
+        """
+        return self._shards[self._ring.owner(product.product_id)]
+
+    def __iter__(self):
+        """Iterate over all products of all shards, including inactive ones."""
+        for shard in self._shards.values():
+            yield from shard
+
+    def __contains__(self, product):
+        """Check if a product is in the store."""
+        return product in self.shard_for(product)
+
+    def product_by_id(self, product_id):
+        """
+        Looks up a product of the store by its id.
+
+        :param product_id: Id (SKU) of the product.
+        :return: The product or None if no product of the store has the id.
+        """
+        return self._shards[self._ring.owner(product_id)].product_by_id(product_id)
+
+    def add_product(self, products):
+        """
+        Adds products to the shards owning their ids.
+
+        :param products: List of products to be added to the store.
+        :raises TypeError: If products is not a list or contains non-Product instances.
+        :raises ValueError: If a product id is already used by another product in the store.
+        """
+        if not isinstance(products, list):
+            raise TypeError(f"Expected products is a list of Product instances: {type(products).__name__} was given")
+        if not all(isinstance(product, Product) for product in products):
+            raise TypeError("Every product in products needs to be an instance of Product")
+
+        shard_products = {}
+        for product in products:
+            shard_products.setdefault(self._ring.owner(product.product_id), []).append(product)
+        for shard_name, placed_products in shard_products.items():
+            self._shards[shard_name].add_product(placed_products)
+
+    def remove_product(self, product):
+        """
+        Removes a product from its shard.
+
+        :param product: The product to be removed.
+        :raises ValueError: If the product is not found in the store.
+        """
+        self.shard_for(product).remove_product(product)
+
+    @property
+    def total_quantity(self):
+        """
+        Get the total quantity of all products, gathered from the shards.
+
+        :return: int, total quantity of items.
+        """
+        return sum(shard.total_quantity for shard in self._shards.values())
+
+    @property
+    def all_products(self):
+        """
+        Retrieves all active products, gathered from the shards.
+
+        :return: List of active products.
+        """
+        return [product for shard in self._shards.values() for product in shard.all_products]
+
+    def order(self, shopping_list):
+        """
+        Processes an order from a shopping list and calculates the total price.
+
+        Orders within one shard are passed on to it; orders spanning shards
+        reserve their lines on every shard before any of them is bought.
+
+        :param shopping_list: List of tuples (product, quantity) to purchase.
+        :return: Total price of the order.
+        :raises TypeError: If a quantity is not an integer.
+        :raises ValueError: If there is not enough stock to fulfill the order or if a product is not found.
+        """
+        return self.order_cents(shopping_list) / 100
+
+    def order_cents(self, shopping_list):
+        """
+        Processes an order like order, summing the exact totals of the shards in cents.
+
+        :param shopping_list: List of tuples (product, quantity) to purchase.
+        :return: int, total price of the order in cents.
+        :raises TypeError: If a quantity is not an integer.
+        :raises ValueError: If there is not enough stock to fulfill the order or if a product is not found.
+        """
+        shard_lines = {}
+        for product, quantity in shopping_list:
+            shard_lines.setdefault(self._ring.owner(product.product_id), []).append((product, quantity))
+        if len(shard_lines) == 1:
+            (shard_name, lines), = shard_lines.items()
+            return self._shards[shard_name].order_cents(lines)
+
+        # Phase one: every shard holds the stock of its lines
+        prepared = []
+        try:
+            for shard_name, lines in shard_lines.items():
+                shard = self._shards[shard_name]
+                prepared.append((shard, shard.reserve(lines)))
+        except Exception:
+            for shard, reservation in prepared:
+                shard.cancel_reservation(reservation)
+            raise
+        # Phase two: all shards accepted, so every reservation is bought
+        if any(reservation.state != "held" for _, reservation in prepared):
+            for shard, reservation in prepared:
+                shard.cancel_reservation(reservation)
+            raise ValueError("Reservation expired before checkout")
+        total_price = 0
+        checked_out = []
+        for number, (shard, reservation) in enumerate(prepared):
+            lines = [(product, quantity, product.is_active) for product, quantity in reservation.lines]
+            try:
+                total_price += shard.checkout_cents(reservation)
+            except Exception:
+                for other_shard, other_reservation in prepared[number:]:
+                    other_shard.cancel_reservation(other_reservation)
+                for bought_shard, bought_lines in checked_out:
+                    bought_shard.restock(bought_lines)
+                raise
+            checked_out.append((shard, lines))
+        return total_price
+
+    def add_shard(self):
+        """
+        Adds an empty shard and moves the products it now owns onto it.
+
+        Only the products in the ring ranges taken over by the new shard move,
+        about 1/N of all products for N shards.
+
+        :return: Tuple (name of the new shard, number of moved products).
+        """
+        shard_name = self._create_shard()
+        moved_count = 0
+        for old_name, shard in self._shards.items():
+            if old_name == shard_name:
+                continue
+            moving = [product for product in shard if self._ring.owner(product.product_id) == shard_name]
+            for product in moving:
+                shard.remove_product(product)
+            if moving:
+                self._shards[shard_name].add_product(moving)
+            moved_count += len(moving)
+        return shard_name, moved_count
+
+    def remove_shard(self, shard_name):
+        """
+        Removes a shard, moving its products to the shards now owning them.
+
+        :param shard_name: Name of the shard.
+        :raises ValueError: If it is the last shard.
+        """
+        if len(self._shards) == 1:
+            raise ValueError("The last shard cannot be removed")
+        self._ring.remove(shard_name)
+        shard = self._shards.pop(shard_name)
+        products = list(shard)
+        for product in products:
+            shard.remove_product(product)
+        self.add_product(products)
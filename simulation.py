@@ -0,0 +1,224 @@
+import io
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+from multiprocessing import shared_memory
+
+from products import NonStockedProduct
+from snapshot import write_snapshot, snapshot_table
+from store import Store
+
+# Catalog of a worker process, set up by _attach_catalog
+_catalog = None
+
+
+def write_order_log(path, orders):
+    """
+    Writes orders as a JSON lines order log.
+
+    :param path: Path of the order log.
+    :param orders: Iterable of shopping lists, each a list of tuples (product, quantity).
+    """
+    with open(path, "w", encoding="utf-8") as file:
+        for shopping_list in orders:
+            file.write(json.dumps({"lines": [[product.product_id, quantity] for product, quantity in shopping_list]})
+                       + "\n")
+
+
+def _new_stats():
+    """Get empty replay statistics."""
+    return {"orders": 0, "rejected": 0, "revenue": Decimal(0), "sold": {}, "revenue_by_product": {}}
+
+
+def _merge_stats(stats, other_stats):
+    """
+    Adds the statistics of one replay to another.
+
+    :param stats: Statistics to be added to.
+    :param other_stats: Statistics to be added.
+    """
+    stats["orders"] += other_stats["orders"]
+    stats["rejected"] += other_stats["rejected"]
+    stats["revenue"] += other_stats["revenue"]
+    for key in ("sold", "revenue_by_product"):
+        for product_id, value in other_stats[key].items():
+            stats[key][product_id] = stats[key].get(product_id, 0) + value
+
+
+def _count_order(stats, order_lines, line_prices):
+    """
+    Adds an order that was sold to the statistics.
+
+    :param stats: Statistics to be added to.
+    :param order_lines: List of tuples (product, quantity) of the order.
+    :param line_prices: List of the exact prices of the order lines.
+    """
+    stats["orders"] += 1
+    for (product, quantity), price in zip(order_lines, line_prices):
+        stats["revenue"] += price
+        stats["sold"][product.product_id] = stats["sold"].get(product.product_id, 0) + quantity
+        stats["revenue_by_product"][product.product_id] = stats["revenue_by_product"].get(product.product_id, 0) + price
+
+
+def _chunk_offsets(path, chunk_count):
+    """
+    Splits a file into byte ranges starting at line boundaries.
+
+    :param path: Path of the file.
+    :param chunk_count: Wanted number of ranges.
+    :return: List of tuples (start, end).
+    """
+    size = os.path.getsize(path)
+    offsets = [0]
+    with open(path, "rb") as file:
+        for chunk in range(1, chunk_count):
+            file.seek(max(size * chunk // chunk_count, offsets[-1]))
+            file.readline()
+            offsets.append(min(file.tell(), size))
+    offsets.append(size)
+    return [(start, end) for start, end in zip(offsets, offsets[1:]) if start < end]
+
+
+def _attach_catalog(name):
+    """
+    Maps the shared catalog in a worker process.
+
+    :param name: Name of the shared memory block holding the catalog snapshot.
+    """
+    global _catalog
+    memory = shared_memory.SharedMemory(name=name)
+    table = snapshot_table(memory.buf)
+    _catalog = (memory, {product.product_id: product for product in table})
+
+
+def _replay_chunk(path, start, end):
+    """
+    Prices the orders in a byte range of an order log against the shared catalog.
+
+    Orders are checked like Store.order except for the stock, which the
+    workers do not share; they only record the demand.
+
+    :param path: Path of the order log.
+    :param start: Offset of the first order.
+    :param end: Offset after the last order.
+    :return: Statistics of the replayed orders.
+    """
+    _, products = _catalog
+    stats = _new_stats()
+    with open(path, "rb") as file:
+        file.seek(start)
+        for line in io.BytesIO(file.read(end - start)):
+            order_lines = {}
+            try:
+                for product_id, quantity in json.loads(line)["lines"]:
+                    product = products.get(product_id)
+                    if product is None:
+                        raise ValueError(f"Product {product_id} not in store")
+                    if not isinstance(quantity, int) or quantity < 0:
+                        raise ValueError("Quantity needs to be a positive integer")
+                    _, total_quantity = order_lines.get(product_id, (product, 0))
+                    order_lines[product_id] = (product, total_quantity + quantity)
+                for product, quantity in order_lines.values():
+                    if not product.is_active:
+                        raise ValueError(f"{product.name} is not active in the store")
+                    limit = getattr(product, "limit", None)
+                    if limit is not None and quantity > limit:
+                        raise ValueError(f"Quantity needs to be in range of the Limit ({limit})")
+            except (ValueError, TypeError, KeyError):
+                stats["rejected"] += 1
+                continue
+            order_lines = list(order_lines.values())
+            _count_order(stats, order_lines, [Store._price_line(product, quantity)
+                                              for product, quantity in order_lines])
+    return stats
+
+
+def replay_parallel(store, path, workers=None):
+    """
+    Replays an order log in a process pool against a shared copy of the catalog.
+
+    The store is copied once into shared memory as a snapshot and every
+    worker prices its part of the log against it. Stock is not changed.
+
+    :param store: Store whose products the orders refer to.
+    :param path: Path of the JSON lines order log.
+    :param workers: Number of worker processes, the CPU count when None.
+    :return: Merged statistics with the number of orders, rejected orders, revenue,
+             sold quantities and revenue per product id.
+    """
+    workers = workers or os.cpu_count()
+    snapshot = io.BytesIO()
+    write_snapshot(store, snapshot)
+    memory = shared_memory.SharedMemory(create=True, size=max(len(snapshot.getbuffer()), 1))
+    try:
+        memory.buf[:len(snapshot.getbuffer())] = snapshot.getbuffer()
+        stats = _new_stats()
+        with ProcessPoolExecutor(workers, initializer=_attach_catalog, initargs=(memory.name,)) as executor:
+            futures = [executor.submit(_replay_chunk, os.fspath(path), start, end)
+                       for start, end in _chunk_offsets(path, workers * 4)]
+            for future in futures:
+                _merge_stats(stats, future.result())
+    finally:
+        memory.close()
+        memory.unlink()
+    return stats
+
+
+def replay_sequential(store, path):
+    """
+    Replays an order log through Store.order, changing the stock of the store.
+
+    :param store: Store the orders are placed in.
+    :param path: Path of the JSON lines order log.
+    :return: Statistics like replay_parallel.
+    """
+    stats = _new_stats()
+    with open(path, "rb") as file:
+        for line in file:
+            try:
+                shopping_list = [(store.product_by_id(product_id), quantity)
+                                 for product_id, quantity in json.loads(line)["lines"]]
+                if any(product is None for product, _ in shopping_list):
+                    raise ValueError("Product not in store")
+                order_lines = list(store._group_order(shopping_list).values())
+                line_prices = [Store._price_line(product, quantity) for product, quantity in order_lines]
+                store.order(shopping_list)
+            except (ValueError, TypeError, KeyError):
+                stats["rejected"] += 1
+                continue
+            _count_order(stats, order_lines, line_prices)
+    return stats
+
+
+def simulate(store, path, workers=None, verify=False):
+    """
+    Replays an order log in parallel and optionally checks it against a sequential run.
+
+    The check places the orders in a copy of the store and compares the final
+    stock with the stock the parallel run implies. Products whose demand ran
+    over their stock show up as mismatches.
+
+    :param store: Store whose products the orders refer to; it is not changed.
+    :param path: Path of the JSON lines order log.
+    :param workers: Number of worker processes, the CPU count when None.
+    :param verify: True to run the sequential check.
+    :return: Statistics of the parallel run; with verify also "sequential" statistics
+             and "stock_mismatches" mapping product ids to (parallel stock, sequential stock).
+    """
+    stats = replay_parallel(store, path, workers)
+    if not verify:
+        return stats
+
+    snapshot = io.BytesIO()
+    write_snapshot(store, snapshot)
+    reference_store = Store(list(snapshot_table(snapshot.getbuffer())))
+    stats["sequential"] = replay_sequential(reference_store, path)
+    stats["stock_mismatches"] = {}
+    for product in reference_store:
+        if isinstance(product, NonStockedProduct):
+            continue
+        parallel_stock = store.product_by_id(product.product_id).quantity - stats["sold"].get(product.product_id, 0)
+        if parallel_stock != product.quantity:
+            stats["stock_mismatches"][product.product_id] = (parallel_stock, product.quantity)
+    return stats
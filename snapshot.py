@@ -0,0 +1,331 @@
+import json
+import mmap
+import struct
+from array import array
+
+from money import to_cents
+from product_table import ProductTable, PRODUCT, NON_STOCKED, LIMITED, NO_LIMIT
+from products import Product, NonStockedProduct, LimitedProduct, reserve_product_ids
+from promotions import Promotion, SecondHalfPrice, ThirdOneFree, PercentDiscount
+from store import Store
+
+MAGIC = b"BBSNAP02"
+# Snapshots written before prices were stored in cents, with float prices
+LEGACY_MAGIC = b"BBSNAP01"
+# Magic, number of products, size of the names blob, size of the promotions blob, highest product id
+HEADER = struct.Struct("<8sqqqq")
+# Header of legacy snapshots, without the highest product id
+LEGACY_HEADER = struct.Struct("<8sqqq")
+# Columns of the snapshot in file order with their array type codes
+COLUMNS = (("product_ids", "q"), ("prices", "q"), ("quantities", "q"), ("limits", "q"),
+           ("name_offsets", "q"), ("promotions", "i"), ("kinds", "b"), ("active", "B"))
+ALIGNMENT = 8
+
+_KIND_NAMES = {PRODUCT: "Product", NON_STOCKED: "NonStockedProduct", LIMITED: "LimitedProduct"}
+
+
+def _product_kind(product):
+    """
+    Get the table kind of a product.
+
+    :param product: Product instance.
+    :return: int, kind of the product.
+    """
+    if isinstance(product, LimitedProduct):
+        return LIMITED
+    if isinstance(product, NonStockedProduct):
+        return NON_STOCKED
+    return PRODUCT
+
+
+# Promotion classes that can be recreated from saved data, by "module.qualname"
+PROMOTION_CLASSES = {}
+
+
+def register_promotion(promotion_class):
+    """
+    Allows a promotion class to be recreated from snapshots, JSON files, databases and journals.
+
+    :param promotion_class: Subclass of Promotion.
+    :return: The promotion class, so it can be used as a class decorator.
+    :raises TypeError: If the class is not a subclass of Promotion.
+    """
+    if not isinstance(promotion_class, type) or not issubclass(promotion_class, Promotion):
+        raise TypeError(f"Promotion class needs to be a subclass of Promotion: {promotion_class!r} was given")
+    PROMOTION_CLASSES[f"{promotion_class.__module__}.{promotion_class.__qualname__}"] = promotion_class
+    return promotion_class
+
+
+for _promotion_class in (SecondHalfPrice, ThirdOneFree, PercentDiscount):
+    register_promotion(_promotion_class)
+
+
+def _promotion_to_dict(promotion):
+    """
+    Converts a promotion to a dictionary of its class and public attributes.
+
+    :param promotion: Promotion instance.
+    :return: Dictionary describing the promotion.
+    """
+    promotion_class = type(promotion)
+    return {"class": f"{promotion_class.__module__}.{promotion_class.__qualname__}",
+            "attributes": {name: value for name, value in vars(promotion).items() if not name.startswith("_")}}
+
+
+def _promotion_from_dict(promotion_dict):
+    """
+    Recreates a promotion from a dictionary made by _promotion_to_dict.
+
+    Only classes registered with register_promotion are recreated, so saved
+    data can never import modules or create arbitrary objects.
+
+    :param promotion_dict: Dictionary describing the promotion.
+    :return: Promotion instance.
+    :raises ValueError: If the class is not a registered promotion class.
+    """
+    promotion_class = PROMOTION_CLASSES.get(promotion_dict["class"])
+    if promotion_class is None:
+        raise ValueError(f"Unknown promotion class: {promotion_dict['class']}")
+    promotion = object.__new__(promotion_class)
+    vars(promotion).update(promotion_dict["attributes"])
+    return promotion
+
+
+def _collect_promotions(products):
+    """
+    Numbers the distinct promotions used by products.
+
+    :param products: List of products.
+    :return: Tuple (list of promotions, list with the promotion number or -1 per product).
+    """
+    promotions = []
+    numbers = {}
+    product_promotions = []
+    for product in products:
+        promotion = product.promotion
+        if promotion is None:
+            product_promotions.append(-1)
+            continue
+        if id(promotion) not in numbers:
+            numbers[id(promotion)] = len(promotions)
+            promotions.append(promotion)
+        product_promotions.append(numbers[id(promotion)])
+    return promotions, product_promotions
+
+
+def write_snapshot(store, file):
+    """
+    Writes all products of a store as a compact binary snapshot to a file object.
+
+    :param store: Store or any other iterable of products to be written.
+    :param file: Binary file object.
+    """
+    products = list(store)
+    promotions, product_promotions = _collect_promotions(products)
+    names = [product.name.encode() for product in products]
+    name_offsets = array("q", [0])
+    for name in names:
+        name_offsets.append(name_offsets[-1] + len(name))
+
+    columns = {"product_ids": [product.product_id for product in products],
+               "prices": [product.price_cents for product in products],
+               "quantities": [product.quantity for product in products],
+               "limits": [product.limit if isinstance(product, LimitedProduct) else NO_LIMIT
+                          for product in products],
+               "name_offsets": name_offsets,
+               "promotions": product_promotions,
+               "kinds": [_product_kind(product) for product in products],
+               "active": [product.is_active for product in products]}
+    names_blob = b"".join(names)
+    promotions_blob = json.dumps([_promotion_to_dict(promotion) for promotion in promotions]).encode()
+
+    max_product_id = max(columns["product_ids"], default=0)
+    file.write(HEADER.pack(MAGIC, len(products), len(names_blob), len(promotions_blob), max_product_id))
+    for column_name, typecode in COLUMNS:
+        data = array(typecode, columns[column_name]).tobytes()
+        file.write(data + bytes(-len(data) % ALIGNMENT))
+    file.write(names_blob)
+    file.write(promotions_blob)
+
+
+def save_snapshot(store, path):
+    """
+    Saves all products of a store in a compact binary snapshot.
+
+    :param store: Store or any other iterable of products to be saved.
+    :param path: Path of the snapshot file.
+    """
+    with open(path, "wb") as file:
+        write_snapshot(store, file)
+
+
+class _NameColumn:
+    """Names of a snapshot, only decoded when they are accessed."""
+
+    def __init__(self, blob, offsets):
+        self._blob = blob
+        self._offsets = offsets
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, row):
+        return str(self._blob[self._offsets[row]:self._offsets[row + 1]], "utf-8")
+
+
+def load_snapshot(path):
+    """
+    Loads a snapshot lazily into a ProductTable.
+
+    The file is memory-mapped copy-on-write: columns are used in place and
+    rows only become Product views when they are accessed. Changes to the
+    table never modify the file.
+
+    :param path: Path of the snapshot file.
+    :return: ProductTable with the products of the snapshot.
+    :raises ValueError: If the file is not a snapshot.
+    """
+    with open(path, "rb") as file:
+        buffer = memoryview(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_COPY))
+    if bytes(buffer[:len(MAGIC)]) not in (MAGIC, LEGACY_MAGIC):
+        raise ValueError(f"{path} is not a store snapshot")
+    return snapshot_table(buffer)
+
+
+def snapshot_table(buffer):
+    """
+    Creates a ProductTable using the columns of a snapshot in a buffer in place.
+
+    Generated product ids are moved past the highest id of the snapshot, so
+    new products never collide with loaded ones.
+
+    :param buffer: Memoryview of the snapshot, e.g. of a memory map or of shared memory.
+    :return: ProductTable with the products of the snapshot.
+    :raises ValueError: If the buffer does not hold a snapshot.
+    """
+    magic = bytes(buffer[:len(MAGIC)])
+    if magic == MAGIC:
+        _, row_count, names_size, promotions_size, max_product_id = HEADER.unpack_from(buffer)
+        offset = HEADER.size
+    elif magic == LEGACY_MAGIC:
+        _, row_count, names_size, promotions_size = LEGACY_HEADER.unpack_from(buffer)
+        max_product_id = None
+        offset = LEGACY_HEADER.size
+    else:
+        raise ValueError("Buffer does not hold a store snapshot")
+
+    columns = {}
+    for column_name, typecode in COLUMNS:
+        if column_name == "prices" and magic == LEGACY_MAGIC:
+            typecode = "d"
+        item_count = row_count + 1 if column_name == "name_offsets" else row_count
+        size = array(typecode).itemsize * item_count
+        columns[column_name] = buffer[offset:offset + size].cast(typecode)
+        offset += size + -size % ALIGNMENT
+    if magic == LEGACY_MAGIC:
+        columns["prices"] = array("q", map(to_cents, columns["prices"]))
+        max_product_id = max(columns["product_ids"], default=0)
+    reserve_product_ids(max_product_id)
+    names = _NameColumn(buffer[offset:offset + names_size], columns["name_offsets"])
+    offset += names_size
+    promotions = [_promotion_from_dict(promotion_dict)
+                  for promotion_dict in json.loads(bytes(buffer[offset:offset + promotions_size]))]
+
+    product_promotions = {}
+    if promotions:
+        product_promotions = {row: promotions[number] for row, number in enumerate(columns["promotions"])
+                              if number != -1}
+    return ProductTable._from_columns(names, columns["product_ids"], columns["prices"], columns["quantities"],
+                                      columns["limits"], columns["kinds"], columns["active"], product_promotions)
+
+
+def load_store(path, concurrent=False):
+    """
+    Loads a snapshot into a new store.
+
+    :param path: Path of the snapshot file.
+    :param concurrent: True to create a concurrent store.
+    :return: Store with the products of the snapshot.
+    """
+    return Store(list(load_snapshot(path)), concurrent=concurrent)
+
+
+def _product_to_dict(product, promotion):
+    """
+    Converts a product to a dictionary of JSON values.
+
+    :param product: Product instance.
+    :param promotion: JSON value describing the promotion of the product or None.
+    :return: Dictionary describing the product.
+    """
+    product_dict = {"type": _KIND_NAMES[_product_kind(product)], "product_id": product.product_id,
+                    "name": product.name, "price": product.price, "quantity": product.quantity,
+                    "active": product.is_active, "promotion": promotion}
+    if isinstance(product, LimitedProduct):
+        product_dict["limit"] = product.limit
+    return product_dict
+
+
+def _product_from_dict(product_dict, promotion):
+    """
+    Recreates a product from a dictionary made by _product_to_dict.
+
+    :param product_dict: Dictionary describing the product.
+    :param promotion: Promotion of the product or None.
+    :return: Product instance.
+    :raises TypeError: If any of the product values has a wrong type.
+    :raises ValueError: If any of the product values are invalid.
+    """
+    if product_dict["type"] == "LimitedProduct":
+        product = LimitedProduct(product_dict["name"], product_dict["price"], product_dict["quantity"],
+                                 product_dict["limit"], product_id=product_dict["product_id"])
+    elif product_dict["type"] == "NonStockedProduct":
+        product = NonStockedProduct(product_dict["name"], product_dict["price"],
+                                    product_id=product_dict["product_id"])
+    else:
+        product = Product(product_dict["name"], product_dict["price"], product_dict["quantity"],
+                          product_id=product_dict["product_id"])
+    if product_dict["active"]:
+        product.activate()
+    else:
+        product.deactivate()
+    if promotion is not None:
+        product.promotion = promotion
+    return product
+
+
+def export_json(store, path):
+    """
+    Exports all products of a store as JSON.
+
+    :param store: Store to be exported.
+    :param path: Path of the JSON file.
+    """
+    products = list(store)
+    promotions, product_promotions = _collect_promotions(products)
+    product_dicts = [_product_to_dict(product, None if promotion == -1 else promotion)
+                     for product, promotion in zip(products, product_promotions)]
+
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump({"promotions": [_promotion_to_dict(promotion) for promotion in promotions],
+                   "products": product_dicts}, file)
+
+
+def import_json(path, concurrent=False):
+    """
+    Imports products exported by export_json into a new store.
+
+    :param path: Path of the JSON file.
+    :param concurrent: True to create a concurrent store.
+    :return: Store with the imported products.
+    :raises TypeError: If any of the product values has a wrong type.
+    :raises ValueError: If any of the product values are invalid.
+    """
+    with open(path, encoding="utf-8") as file:
+        data = json.load(file)
+    promotions = [_promotion_from_dict(promotion_dict) for promotion_dict in data["promotions"]]
+
+    products = [_product_from_dict(product_dict, None if product_dict["promotion"] is None
+                                   else promotions[product_dict["promotion"]])
+                for product_dict in data["products"]]
+    return Store(products, concurrent=concurrent)
@@ -0,0 +1,327 @@
+import json
+import sqlite3
+from threading import RLock
+
+from money import to_cents
+from products import Product, NonStockedProduct, LimitedProduct, purchase_cents, reserve_product_ids
+from snapshot import _promotion_to_dict, _promotion_from_dict
+from store import Store
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS promotions (
+    promotion_id INTEGER PRIMARY KEY,
+    class TEXT NOT NULL,
+    attributes TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS products (
+    product_id INTEGER PRIMARY KEY,
+    type TEXT NOT NULL,
+    name TEXT NOT NULL,
+    price_cents INTEGER NOT NULL,
+    quantity INTEGER NOT NULL,
+    quantity_limit INTEGER,
+    active INTEGER NOT NULL,
+    promotion_id INTEGER REFERENCES promotions (promotion_id)
+);
+CREATE INDEX IF NOT EXISTS products_active ON products (active, product_id);
+CREATE INDEX IF NOT EXISTS products_promotion ON products (promotion_id);
+"""
+
+PRODUCT_COLUMNS = "product_id, type, name, price_cents, quantity, quantity_limit, active, promotion_id"
+
+# Columns of the products table changed by the attributes of a product
+_ATTRIBUTE_COLUMNS = {"price": "price_cents", "quantity": "quantity", "active": "active", "limit": "quantity_limit",
+                      "promotion": "promotion_id"}
+
+
+class SqliteStore:
+    """
+    A store keeping its products in a SQLite database instead of in memory.
+
+    Products returned by the store are loaded from the database; changing
+    them writes the change back. Orders run as single transactions. The
+    connection is shared by all threads, so every use of it holds a lock:
+    a change made on another thread during an order waits for the order and
+    is committed on its own.
+
+    :param path: Path of the database file, ":memory:" for a temporary database.
+    :param products: List of products to be added to the store.
+    :raises TypeError: If products is not a list or contains non-Product instances.
+    """
+
+    def __init__(self, path=":memory:", products=None):
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        # Reentrant, so changes of products bought in an order can write while the order holds it
+        self._lock = RLock()
+        self._migrate_prices()
+        self._connection.executescript(SCHEMA)
+        # Products created later must not take the id of a stored product
+        max_product_id, = self._connection.execute("SELECT MAX(product_id) FROM products").fetchone()
+        if max_product_id is not None:
+            reserve_product_ids(max_product_id)
+        # Promotions already stored, by object and by id, so products share them
+        self._promotion_ids = {}
+        self._promotions = {}
+        self._in_order = False
+        if products:
+            self.add_product(products)
+
+    def _migrate_prices(self):
+        """Converts the float price column of databases created before prices were stored in cents."""
+        columns = [column[1] for column in self._connection.execute("PRAGMA table_info(products)")]
+        if "price" not in columns:
+            return
+        with self._connection:
+            self._connection.execute("ALTER TABLE products ADD COLUMN price_cents INTEGER NOT NULL DEFAULT 0")
+            self._connection.executemany("UPDATE products SET price_cents = ? WHERE product_id = ?",
+                                         [(to_cents(price), product_id) for product_id, price in
+                                          self._connection.execute("SELECT product_id, price FROM products")])
+            self._connection.execute("ALTER TABLE products DROP COLUMN price")
+
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._connection.close()
+
+    def _promotion_id(self, promotion):
+        """
+        Get the id of a promotion, storing the promotion when it is new.
+
+        :param promotion: Promotion instance or None.
+        :return: Id of the promotion or None.
+        """
+        if promotion is None:
+            return None
+        with self._lock:
+            promotion_id = self._promotion_ids.get(id(promotion))
+            if promotion_id is None:
+                promotion_dict = _promotion_to_dict(promotion)
+                cursor = self._connection.execute("INSERT INTO promotions (class, attributes) VALUES (?, ?)",
+                                                  (promotion_dict["class"], json.dumps(promotion_dict["attributes"])))
+                promotion_id = cursor.lastrowid
+                self._promotion_ids[id(promotion)] = promotion_id
+                self._promotions[promotion_id] = promotion
+            return promotion_id
+
+    def _promotion(self, promotion_id):
+        """
+        Get a stored promotion by its id.
+
+        :param promotion_id: Id of the promotion or None.
+        :return: Promotion instance or None.
+        """
+        if promotion_id is None:
+            return None
+        with self._lock:
+            promotion = self._promotions.get(promotion_id)
+            if promotion is None:
+                promotion_class, attributes = self._connection.execute(
+                    "SELECT class, attributes FROM promotions WHERE promotion_id = ?", (promotion_id,)).fetchone()
+                promotion = _promotion_from_dict({"class": promotion_class, "attributes": json.loads(attributes)})
+                self._promotions[promotion_id] = promotion
+                self._promotion_ids[id(promotion)] = promotion_id
+            return promotion
+
+    def _product_row(self, product):
+        """
+        Converts a product to a row of the products table.
+
+        :param product: Product instance.
+        :return: Tuple of the column values.
+        """
+        if isinstance(product, LimitedProduct):
+            product_type, limit = "LimitedProduct", product.limit
+        elif isinstance(product, NonStockedProduct):
+            product_type, limit = "NonStockedProduct", None
+        else:
+            product_type, limit = "Product", None
+        return (product.product_id, product_type, product.name, product.price_cents, product.quantity, limit,
+                product.is_active, self._promotion_id(product.promotion))
+
+    def _row_product(self, row):
+        """
+        Converts a row of the products table to a product writing its changes back.
+
+        :param row: Tuple of the column values.
+        :return: Product instance.
+        """
+        product_id, product_type, name, price_cents, quantity, limit, active, promotion_id = row
+        price = price_cents / 100
+        if product_type == "LimitedProduct":
+            product = LimitedProduct(name, price, quantity, limit, product_id=product_id)
+        elif product_type == "NonStockedProduct":
+            product = NonStockedProduct(name, price, product_id=product_id)
+        else:
+            product = Product(name, price, quantity, product_id=product_id)
+        if not active:
+            product.deactivate()
+        elif not product.is_active:
+            product.activate()
+        promotion = self._promotion(promotion_id)
+        if promotion is not None:
+            product.promotion = promotion
+        product.add_observer(self._product_changed)
+        return product
+
+    def _product_changed(self, product, attribute, old_value, new_value):
+        """Writes the change of a product back to the database."""
+        with self._lock:
+            if attribute == "promotion":
+                new_value = self._promotion_id(new_value)
+            elif attribute == "price":
+                new_value = product.price_cents
+            self._connection.execute(f"UPDATE products SET {_ATTRIBUTE_COLUMNS[attribute]} = ? WHERE product_id = ?",
+                                     (new_value, product.product_id))
+            # Changes made outside of an order are committed right away; only the ordering thread
+            # can hold the lock during an order
+            if not self._in_order:
+                self._connection.commit()
+
+    def _fetch_products(self, product_ids):
+        """
+        Loads products by their ids.
+
+        :param product_ids: Iterable of product ids.
+        :return: Dictionary mapping the ids of the found products to products.
+        """
+        products = {}
+        with self._lock:
+            for product_id in product_ids:
+                row = self._connection.execute(f"SELECT {PRODUCT_COLUMNS} FROM products WHERE product_id = ?",
+                                               (product_id,)).fetchone()
+                if row is not None:
+                    products[product_id] = self._row_product(row)
+        return products
+
+    def __contains__(self, product):
+        """Check if a product with the same id and name is in the store."""
+        with self._lock:
+            row = self._connection.execute("SELECT name FROM products WHERE product_id = ?",
+                                           (getattr(product, "product_id", None),)).fetchone()
+        return row is not None and row[0] == product.name
+
+    def __iter__(self):
+        """Iterate over all products in the store, including inactive ones."""
+        with self._lock:
+            cursor = self._connection.execute(f"SELECT {PRODUCT_COLUMNS} FROM products ORDER BY product_id")
+        while True:
+            # Rows are fetched in chunks, so other threads can use the connection in between
+            with self._lock:
+                rows = cursor.fetchmany(1_000)
+            if not rows:
+                return
+            for row in rows:
+                yield self._row_product(row)
+
+    def product_by_id(self, product_id):
+        """
+        Looks up a product of the store by its id.
+
+        :param product_id: Id (SKU) of the product.
+        :return: The product or None if no product of the store has the id.
+        """
+        return self._fetch_products([product_id]).get(product_id)
+
+    def add_product(self, products):
+        """
+        Adds products to the store inventory.
+
+        :param products: List of products to be added to the store.
+        :raises TypeError: If products is not a list or contains non-Product instances.
+        :raises ValueError: If a product id is already used by another product in the store.
+        """
+        if not isinstance(products, list):
+            raise TypeError(f"Expected products is a list of Product instances: {type(products).__name__} was given")
+        if not all(isinstance(product, Product) for product in products):
+            raise TypeError("Every product in products needs to be an instance of Product")
+
+        try:
+            with self._lock, self._connection:
+                self._connection.executemany(f"INSERT INTO products ({PRODUCT_COLUMNS}) "
+                                             f"VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                             (self._product_row(product) for product in products))
+        except sqlite3.IntegrityError:
+            raise ValueError("Product id of a product is already in use") from None
+
+    def remove_product(self, product):
+        """
+        Removes a product from the store inventory.
+
+        :param product: The product to be removed.
+        :raises ValueError: If the product is not found in the store.
+        """
+        with self._lock:
+            if product not in self:
+                raise ValueError(f"{product.name} not found in store")
+            with self._connection:
+                self._connection.execute("DELETE FROM products WHERE product_id = ?", (product.product_id,))
+
+    @property
+    def total_quantity(self):
+        """
+        Calculates the total quantity of all products in the store.
+
+        :return: int, total quantity of items.
+        """
+        with self._lock:
+            return self._connection.execute("SELECT COALESCE(SUM(quantity), 0) FROM products").fetchone()[0]
+
+    @property
+    def all_products(self):
+        """
+        Retrieves all active products (in stock) from the store.
+
+        :return: List of active products.
+        """
+        with self._lock:
+            cursor = self._connection.execute(f"SELECT {PRODUCT_COLUMNS} FROM products WHERE active = 1 "
+                                              f"ORDER BY product_id")
+            return [self._row_product(row) for row in cursor.fetchall()]
+
+    def order(self, shopping_list):
+        """
+        Processes an order in a single transaction and calculates the total price.
+
+        Lines for the same product are combined, so every product is validated
+        and bought once with its total quantity.
+
+        :param shopping_list: List of tuples (product, quantity) to purchase.
+        :return: Total price of the order.
+        :raises TypeError: If a quantity is not an integer.
+        :raises ValueError: If there is not enough stock to fulfill the order or if a product is not found.
+        """
+        order_quantities = {}
+        for product, quantity in shopping_list:
+            if not isinstance(quantity, int):
+                raise TypeError(f"Quantity needs to be an integer: {type(quantity).__name__} was given")
+            if quantity < 0:
+                raise ValueError("Quantity needs to be positive")
+            order_quantities[product.product_id] = order_quantities.get(product.product_id, 0) + quantity
+
+        with self._lock:
+            return self._order_locked(shopping_list, order_quantities)
+
+    def _order_locked(self, shopping_list, order_quantities):
+        """
+        Buys the combined lines of an order in one transaction; the lock needs to be held.
+
+        :param shopping_list: List of tuples (product, quantity) to purchase.
+        :param order_quantities: Dictionary mapping product ids to the total quantities.
+        :return: Total price of the order.
+        :raises ValueError: If there is not enough stock to fulfill the order or if a product is not found.
+        """
+        self._in_order = True
+        try:
+            with self._connection:
+                self._connection.execute("BEGIN IMMEDIATE")
+                stored_products = self._fetch_products(order_quantities)
+                for product, _ in shopping_list:
+                    stored_product = stored_products.get(product.product_id)
+                    if stored_product is None or stored_product.name != product.name:
+                        raise ValueError(f"{product.name} not in store")
+                for product_id, quantity in order_quantities.items():
+                    Store._validate_order_line(stored_products[product_id], quantity)
+                return sum(purchase_cents(stored_products[product_id], quantity)
+                           for product_id, quantity in order_quantities.items()) / 100
+        finally:
+            self._in_order = False
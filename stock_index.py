@@ -0,0 +1,218 @@
+import heapq
+from itertools import count
+
+from products import NonStockedProduct
+
+
+class LowStockIndex:
+    """
+    A heap of the stocked products of a store, lowest stock or days of cover first.
+
+    The index observes the store and its products, so every quantity change
+    pushes a new heap entry in O(log n). Entries replaced by a newer one are
+    skipped when they reach the top and dropped for good.
+
+    :param store: The store to be indexed.
+    :param key: "stock" to order by quantity, "cover" to order by quantity divided by daily demand.
+    :raises ValueError: If the key is unknown.
+    """
+
+    def __init__(self, store, key="stock"):
+        if key not in ("stock", "cover"):
+            raise ValueError(f"Key needs to be stock or cover: {key} was given")
+        self._key = key
+        self._products = {}
+        self._daily_demand = {}
+        # Heap of (key, sequence number, product id); only the latest entry of a product is valid
+        self._heap = []
+        self._sequence_numbers = {}
+        self._sequence = count()
+
+        for product in store:
+            self._add(product, push=False)
+        heapq.heapify(self._heap)
+        store.add_observer(self._store_changed)
+
+    @property
+    def key(self):
+        """Get what the index is ordered by, "stock" or "cover"."""
+        return self._key
+
+    def _key_of(self, product):
+        """Get the heap key of a product."""
+        quantity = product.quantity
+        if self._key == "stock" or quantity == 0:
+            return quantity
+        # Products without a known demand never run out
+        daily_demand = self._daily_demand.get(product.product_id, 0)
+        return quantity / daily_demand if daily_demand else float("inf")
+
+    def _entry(self, product):
+        """Creates the heap entry of a product and marks it as the valid one."""
+        sequence_number = next(self._sequence)
+        self._sequence_numbers[product.product_id] = sequence_number
+        return self._key_of(product), sequence_number, product.product_id
+
+    def _add(self, product, push=True):
+        """Adds a stocked product, restoring the heap order unless push is False."""
+        if isinstance(product, NonStockedProduct):
+            return
+        self._products[product.product_id] = product
+        if push:
+            heapq.heappush(self._heap, self._entry(product))
+        else:
+            self._heap.append(self._entry(product))
+        product.add_observer(self._product_changed)
+
+    def _push(self, product):
+        """Pushes a new entry for a product, compacting the heap when most entries are outdated."""
+        heapq.heappush(self._heap, self._entry(product))
+        if len(self._heap) > 2 * len(self._products) + 1024:
+            self._heap = [entry for entry in self._heap if self._sequence_numbers.get(entry[2]) == entry[1]]
+            heapq.heapify(self._heap)
+
+    def _store_changed(self, store, action, product):
+        """Indexes products added to the store and drops removed products."""
+        if action == "add":
+            self._add(product)
+        elif product.product_id in self._products:
+            del self._products[product.product_id]
+            del self._sequence_numbers[product.product_id]
+            self._daily_demand.pop(product.product_id, None)
+            product.remove_observer(self._product_changed)
+
+    def _product_changed(self, product, attribute, old_value, new_value):
+        """Moves a product in the heap after its quantity changed."""
+        if attribute == "quantity":
+            self._push(product)
+
+    def set_daily_demand(self, product, units):
+        """
+        Sets the expected sales of a product per day, used for the days of cover.
+
+        :param product: A stocked product of the store.
+        :param units: Expected units sold per day.
+        :raises ValueError: If the product is not indexed or units is negative.
+        """
+        if product.product_id not in self._products:
+            raise ValueError(f"{product.name} not found in index")
+        if units < 0:
+            raise ValueError("Daily demand needs to be positive")
+        self._daily_demand[product.product_id] = units
+        if self._key == "cover":
+            self._push(product)
+
+    def daily_demand(self, product):
+        """Get the expected sales of a product per day, 0 when unknown."""
+        return self._daily_demand.get(product.product_id, 0)
+
+    def _pop_valid(self):
+        """Pops the valid entry with the lowest key, dropping outdated ones."""
+        heap = self._heap
+        while heap:
+            entry = heapq.heappop(heap)
+            if self._sequence_numbers.get(entry[2]) == entry[1]:
+                return entry
+        return None
+
+    def at_risk(self, k=10, below=None):
+        """
+        Finds the products with the lowest stock or days of cover.
+
+        The valid entries are popped and pushed back, so a query costs
+        O(k log n) plus the outdated entries it drops.
+
+        :param k: Largest number of products to find, None for all below the bound.
+        :param below: Only find products whose key is below this bound, None for no bound.
+        :return: List of tuples (product, key), lowest key first.
+        """
+        found = []
+        while k is None or len(found) < k:
+            entry = self._pop_valid()
+            if entry is None:
+                break
+            if below is not None and entry[0] >= below:
+                heapq.heappush(self._heap, entry)
+                break
+            found.append(entry)
+        for entry in found:
+            heapq.heappush(self._heap, entry)
+        return [(self._products[product_id], key) for key, _, product_id in found]
+
+    def out_of_stock(self):
+        """
+        Finds all stocked products with a quantity of zero.
+
+        Only the products with a key of zero are popped, which are exactly the
+        sold out ones in both orders.
+
+        :return: List of the products.
+        """
+        found = []
+        while True:
+            entry = self._pop_valid()
+            if entry is None:
+                break
+            if entry[0] > 0:
+                heapq.heappush(self._heap, entry)
+                break
+            found.append(entry)
+        for entry in found:
+            heapq.heappush(self._heap, entry)
+        return [self._products[product_id] for _, _, product_id in found]
+
+
+class ReplenishmentPlanner:
+    """
+    Plans restock orders for the products a LowStockIndex finds at risk.
+
+    :param index: LowStockIndex of the store.
+    :param reorder_point: Products with a key below it are restocked.
+    :param target: Key the restocked products should reach, in units or days of cover.
+    :raises ValueError: If the target is not above the reorder point.
+    """
+
+    def __init__(self, index, reorder_point, target):
+        if target <= reorder_point:
+            raise ValueError("Target needs to be above the reorder point")
+        self._index = index
+        self._reorder_point = reorder_point
+        self._target = target
+
+    def _restock_quantity(self, product):
+        """Get the quantity that brings a product up to the target."""
+        if self._index.key == "stock":
+            return self._target - product.quantity
+        return max(round(self._target * self._index.daily_demand(product)) - product.quantity, 0)
+
+    def plan(self, batch_size=100):
+        """
+        Plans restock orders for the products below the reorder point.
+
+        :param batch_size: Number of restock orders per batch.
+        :return: Generator of lists of tuples (product, quantity), most at risk first.
+        """
+        batch = []
+        for product, _ in self._index.at_risk(None, below=self._reorder_point):
+            quantity = self._restock_quantity(product)
+            if quantity <= 0:
+                continue
+            batch.append((product, quantity))
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    @staticmethod
+    def receive(restock_orders):
+        """
+        Adds delivered restock orders to the stock, activating products that were sold out.
+
+        :param restock_orders: List of tuples (product, quantity).
+        """
+        for product, quantity in restock_orders:
+            sold_out = product.quantity == 0
+            product.quantity += quantity
+            if sold_out:
+                product.activate()
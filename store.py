@@ -1,4 +1,57 @@
-from products import Product, NonStockedProduct
+import heapq
+from contextlib import ExitStack, nullcontext
+from itertools import count
+from threading import Lock
+from time import monotonic, perf_counter
+
+from money import cents_to_decimal
+from products import Product, NonStockedProduct, LimitedProduct, purchase_cents
+from search import SearchIndex
+
+
+def _product_type(product):
+    """
+    Get the name of the product class a product is counted as.
+
+    :param product: Product instance.
+    :return: "Product", "NonStockedProduct" or "LimitedProduct".
+    """
+    if isinstance(product, LimitedProduct):
+        return "LimitedProduct"
+    if isinstance(product, NonStockedProduct):
+        return "NonStockedProduct"
+    return "Product"
+
+
+class Reservation:
+    """
+    A time-limited hold on quantities of products of a store, made by Store.reserve.
+
+    :param order_lines: Dictionary mapping product ids to tuples (product, quantity).
+    :param expires_at: Time of the monotonic clock when the hold ends.
+    """
+
+    __slots__ = ("_order_lines", "_expires_at", "_state")
+
+    def __init__(self, order_lines, expires_at):
+        self._order_lines = order_lines
+        self._expires_at = expires_at
+        self._state = "held"
+
+    @property
+    def lines(self):
+        """Get the held quantities as a list of tuples (product, quantity)."""
+        return list(self._order_lines.values())
+
+    @property
+    def expires_at(self):
+        """Get the time of the monotonic clock when the hold ends."""
+        return self._expires_at
+
+    @property
+    def state(self):
+        """Get the state of the reservation: "held", "ordered", "cancelled" or "expired"."""
+        return self._state
 
 
 class Store:
@@ -6,24 +59,144 @@ class Store:
     A class representing a store containing multiple products.
 
     :param products: List of products available in the store.
+    :param concurrent: True to guard orders with a lock per product, so the store
+                       can be shared between threads.
+    :param metrics: Metrics instance recording the orders of the store, or None to record nothing.
+    :param price_cache: PriceCache reused by quote across batches, or None.
     :raises TypeError: If products is not a list or contains non-Product instances.
     """
 
-    def __init__(self, products):
+    def __init__(self, products, concurrent=False, metrics=None, price_cache=None):
         if not isinstance(products, list):
             raise TypeError(f"Expected products is a list of Product instances: {type(products).__name__} was given")
         if not all(isinstance(product, Product) for product in products):
             raise TypeError("Every product in products needs to be an instance of Product")
 
-        self._products = products
+        # Products indexed by their id, kept in insertion order
+        self._products = {}
+        # Locks of the products by their id, only used by concurrent stores
+        self._locks = {}
+        self._concurrent = concurrent
+        self._metrics = metrics
+        self._price_cache = price_cache
+        self._observers = ()
+        # Aggregates kept up to date by observing the products
+        self._aggregates_lock = Lock() if concurrent else nullcontext()
+        self._total_quantity = 0
+        self._product_counts = {"Product": 0, "NonStockedProduct": 0, "LimitedProduct": 0}
+        self._active_products = {}
+        self._active_list = None
+        # Search indexes, built on the first search
+        self._search_index = None
+        # Held quantities by product id and a heap of (expiry, number, reservation) for expiring them
+        self._reserved = {}
+        self._reservation_heap = []
+        self._reservation_numbers = count()
+        self._index_products(products)
+
+    def _index_products(self, products):
+        """
+        Adds products to the id index of the store.
+
+        :param products: List of products to be indexed.
+        :return: List of the products that were not in the store before.
+        :raises ValueError: If a product id is already used by another product in the store.
+        """
+        new_products = {}
+        for product in products:
+            stored_product = new_products.get(product.product_id, self._products.get(product.product_id))
+            if stored_product is not None and stored_product is not product:
+                raise ValueError(f"Product id {product.product_id} of {product.name} is already in use")
+            new_products[product.product_id] = product
+        if self._concurrent:
+            for product_id in new_products:
+                self._locks.setdefault(product_id, Lock())
+        added_products = [product for product_id, product in new_products.items()
+                          if product_id not in self._products]
+        self._products.update(new_products)
+        for product in added_products:
+            self._count_product(product, 1)
+            product.add_observer(self._product_changed)
+        return added_products
+
+    def _count_product(self, product, sign):
+        """
+        Adds a product to or removes it from the aggregates.
+
+        :param product: The product added or removed.
+        :param sign: 1 for an added product, -1 for a removed product.
+        """
+        with self._aggregates_lock:
+            self._total_quantity += sign * product.quantity
+            self._product_counts[_product_type(product)] += sign
+            if sign > 0 and product.is_active:
+                self._active_products[product.product_id] = product
+            else:
+                self._active_products.pop(product.product_id, None)
+            self._active_list = None
+
+    def _product_changed(self, product, attribute, old_value, new_value):
+        """Updates the aggregates after a change of a product."""
+        if attribute == "quantity":
+            with self._aggregates_lock:
+                self._total_quantity += new_value - old_value
+        elif attribute == "active":
+            with self._aggregates_lock:
+                if new_value:
+                    self._active_products[product.product_id] = product
+                else:
+                    self._active_products.pop(product.product_id, None)
+                self._active_list = None
+
+    def add_observer(self, observer):
+        """
+        Register a function called after products are added to or removed from the store.
+
+        :param observer: Function called as observer(store, action, product),
+                         where action is "add" or "remove".
+        """
+        self._observers = (*self._observers, observer)
+
+    def remove_observer(self, observer):
+        """
+        Unregister a function registered with add_observer.
+
+        :param observer: The registered function.
+        :raises ValueError: If the function is not registered.
+        """
+        observers = list(self._observers)
+        observers.remove(observer)
+        self._observers = tuple(observers)
+
+    def _notify(self, action, product):
+        """Call all observers after a product was added or removed."""
+        for observer in self._observers:
+            observer(self, action, product)
+
+    def _get_product(self, product):
+        """
+        Looks up a product of the store by its id.
+
+        :param product: The product to look up.
+        :return: The stored product or None if the product is not in the store.
+        """
+        stored_product = self._products.get(getattr(product, "product_id", None))
+        if stored_product is not product:
+            return None
+        return stored_product
+
+    def __iter__(self):
+        """Iterate over all products in the store, including inactive ones."""
+        return iter(self._products.values())
 
     def __contains__(self, product):
         """Check if a product is in the store."""
-        return product in self._products
+        return self._get_product(product) is not None
 
     def __add__(self, store):
         """Combine two stores into a new store."""
-        return Store(self._products + store.all_products)
+        return Store(list(self._products.values()) + store.all_products, concurrent=self._concurrent,
+                     metrics=self._metrics, price_cache=self._price_cache)
 
     def add_product(self, products):
         """
@@ -37,7 +210,8 @@ class Store:
         if not all(isinstance(product, Product) for product in products):
             raise TypeError("Every product in products needs to be an instance of Product")
 
-        self._products += products
+        for product in self._index_products(products):
+            self._notify("add", product)
 
     def remove_product(self, product):
         """
@@ -46,47 +220,598 @@ class Store:
         :param product: The product to be removed.
         :raises ValueError: If the product is not found in the store.
         """
-        if product not in self._products:
+        if self._get_product(product) is None:
             raise ValueError(f"{product.name} not found in store")
-        self._products.remove(product)
+        del self._products[product.product_id]
+        self._locks.pop(product.product_id, None)
+        product.remove_observer(self._product_changed)
+        self._count_product(product, -1)
+        self._notify("remove", product)
+
+    def product_by_id(self, product_id):
+        """
+        Looks up a product of the store by its id.
+
+        :param product_id: Id (SKU) of the product.
+        :return: The product or None if no product of the store has the id.
+        """
+        return self._products.get(product_id)
+
+    @property
+    def metrics(self):
+        """Get the Metrics instance of the store or None."""
+        return self._metrics
 
     @property
     def total_quantity(self):
         """
-        Calculates the total quantity of all products in the store.
+        Get the total quantity of all products in the store.
 
         :return: int, total quantity of items.
         """
-        total_quantity = sum(product.quantity for product in self._products)
-        return total_quantity
+        return self._total_quantity
+
+    @property
+    def product_counts(self):
+        """
+        Get the number of products in the store per product class.
+
+        :return: Dictionary mapping "Product", "NonStockedProduct" and "LimitedProduct" to counts.
+        """
+        return dict(self._product_counts)
 
     @property
     def all_products(self):
         """
         Retrieves all active products (in stock) from the store.
 
+        Products are listed in the order they became active. The list is shared
+        until the next product is activated or deactivated and must not be changed.
+
         :return: List of active products.
         """
-        active_products = [product for product in self._products if product.is_active]
-        return active_products
+        active_list = self._active_list
+        if active_list is None:
+            with self._aggregates_lock:
+                active_list = self._active_list = list(self._active_products.values())
+        return active_list
+
+    def search(self, name_prefix=None, min_price=None, max_price=None, promotion=None, promoted=None,
+               active_only=True, limit=None):
+        """
+        Finds products of the store by name prefix, price range and promotion.
+
+        The search indexes are built on the first search and kept up to date afterwards.
+
+        :param name_prefix: Start of the product names, case insensitive.
+        :param min_price: Lowest price of the products.
+        :param max_price: Highest price of the products.
+        :param promotion: Promotion the products need to have.
+        :param promoted: True for products with any promotion, False for products without one.
+        :param active_only: False to also find inactive products.
+        :param limit: Largest number of products to find or None for all.
+        :return: Iterator of matching products.
+        """
+        if self._search_index is None:
+            self._search_index = SearchIndex(self)
+        return self._search_index.search(name_prefix, min_price, max_price, promotion, promoted, active_only, limit)
+
+    def _group_order(self, shopping_list):
+        """
+        Sums up the ordered quantities per product in a single pass.
+
+        :param shopping_list: List of tuples (product, quantity) to purchase.
+        :return: Dictionary mapping product ids to tuples (product, total quantity).
+        :raises TypeError: If an item is not a Product instance or a quantity is not an integer.
+        :raises ValueError: If a product is not found or a quantity is negative.
+        """
+        order_lines = {}
+        for product, quantity in shopping_list:
+            if not isinstance(product, Product):
+                raise TypeError(f"Expected a Product instance: {type(product).__name__} was given")
+            if self._get_product(product) is None:
+                raise ValueError(f"{product.name} not in store")
+            if not isinstance(quantity, int):
+                raise TypeError(f"Quantity needs to be an integer: {type(quantity).__name__} was given")
+            if quantity < 0:
+                raise ValueError("Quantity needs to be positive")
+            _, total_quantity = order_lines.get(product.product_id, (product, 0))
+            order_lines[product.product_id] = (product, total_quantity + quantity)
+        return order_lines
+
+    @staticmethod
+    def _check_order_line(product, quantity, claimed=0):
+        """
+        Finds the reason a product cannot be bought in the given total quantity.
+
+        :param product: The product to be bought.
+        :param quantity: Total quantity of the product in the order.
+        :param claimed: Quantity of the stock already claimed by other orders.
+        :return: None if the line can be bought, else a tuple (reason, message) with reason
+                 "inactive", "insufficient_stock" or "over_limit".
+        """
+        if not product.is_active:
+            return "inactive", f"{product.name} is not active in the store"
+        if quantity + claimed > product.quantity and not isinstance(product, NonStockedProduct):
+            return "insufficient_stock", f"Quantity of purchase too high for {product.name}"
+        if isinstance(product, LimitedProduct) and quantity > product.limit:
+            return "over_limit", f"Quantity needs to be in range of the Limit ({product.limit})"
+        return None
+
+    @staticmethod
+    def _validate_order_line(product, quantity, claimed=0):
+        """
+        Checks that a product can be bought in the given total quantity.
+
+        :param product: The product to be bought.
+        :param quantity: Total quantity of the product in the order.
+        :param claimed: Quantity of the stock already claimed by other orders.
+        :raises ValueError: If the product is inactive, out of stock or over its limit.
+        """
+        problem = Store._check_order_line(product, quantity, claimed)
+        if problem is not None:
+            raise ValueError(problem[1])
 
     def order(self, shopping_list):
         """
         Processes an order from a shopping list and calculates the total price.
 
+        Lines for the same product are combined, so every product is validated
+        and bought once with its total quantity.
+
         :param shopping_list: List of tuples (product, quantity) to purchase.
         :return: Total price of the order.
+        :raises TypeError: If a quantity is not an integer.
+        :raises ValueError: If there is not enough stock to fulfill the order or if a product is not found.
+        """
+        return self.order_cents(shopping_list) / 100
+
+    def order_cents(self, shopping_list):
+        """
+        Processes an order like order, calculating the exact total price in cents.
+
+        :param shopping_list: List of tuples (product, quantity) to purchase.
+        :return: int, total price of the order in cents.
+        :raises TypeError: If a quantity is not an integer.
         :raises ValueError: If there is not enough stock to fulfill the order or if a product is not found.
         """
-        for product, _ in shopping_list:
-            if product not in self._products:
+        if self._metrics is not None:
+            return self._measured_order(shopping_list)
+        order_lines = self._group_order(shopping_list)
+        if self._reservation_heap:
+            self.expire_reservations()
+        reserved = self._reserved
+        with self._lock_products(order_lines):
+            for product_id, (product, quantity) in order_lines.items():
+                self._validate_order_line(product, quantity, reserved.get(product_id, 0))
+            return self._buy_all(order_lines.values())
+
+    def _measured_order(self, shopping_list):
+        """
+        Processes an order like order_cents, recording it in the metrics of the store.
+
+        :param shopping_list: List of tuples (product, quantity) to purchase.
+        :return: int, total price of the order in cents.
+        """
+        metrics = self._metrics
+        start = perf_counter()
+        try:
+            order_lines = self._group_order(shopping_list)
+        except (TypeError, ValueError):
+            metrics.increment("bestbuy_validation_failures_total", reason="invalid_line")
+            raise
+        if self._reservation_heap:
+            self.expire_reservations()
+        lock_start = perf_counter()
+        with self._lock_products(order_lines):
+            if self._concurrent:
+                metrics.observe("bestbuy_lock_wait_seconds", perf_counter() - lock_start)
+            for product_id, (product, quantity) in order_lines.items():
+                problem = self._check_order_line(product, quantity, self._reserved.get(product_id, 0))
+                if problem is not None:
+                    metrics.increment("bestbuy_validation_failures_total", reason=problem[0])
+                    raise ValueError(problem[1])
+            total_price = self._buy_all(order_lines.values(), metrics)
+        metrics.increment("bestbuy_orders_total")
+        metrics.observe("bestbuy_order_lines", len(order_lines))
+        metrics.observe("bestbuy_order_seconds", perf_counter() - start)
+        return total_price
+
+    def order_many(self, shopping_lists, priorities=None):
+        """
+        Processes a batch of orders with one stock update per product.
+
+        Orders are accepted first come, first served, or from the highest
+        priority down when priorities are given (ties keep their batch order).
+        An order is accepted if its lines fit into the stock left by the orders
+        accepted before it; the stock of every product is then decreased once
+        for all accepted orders. Products whose class overrides buy are bought
+        through it order by order instead.
+
+        :param shopping_lists: List of shopping lists, each a list of tuples (product, quantity).
+        :param priorities: List with a priority per shopping list, or None for first come, first served.
+        :return: List with the total price or the raised TypeError or ValueError per order,
+                 in the order of shopping_lists.
+        :raises ValueError: If the number of priorities does not match the number of orders.
+        """
+        if priorities is not None and len(priorities) != len(shopping_lists):
+            raise ValueError("Expected one priority per shopping list")
+        results = [None] * len(shopping_lists)
+        grouped_orders = []
+        for number, shopping_list in enumerate(shopping_lists):
+            try:
+                grouped_orders.append((number, self._group_order(shopping_list)))
+            except (TypeError, ValueError) as error:
+                results[number] = error
+                self._count_failure("invalid_line")
+        if priorities is not None:
+            grouped_orders.sort(key=lambda grouped_order: -priorities[grouped_order[0]])
+
+        if self._reservation_heap:
+            self.expire_reservations()
+        products = {product_id: order_line for _, order_lines in grouped_orders
+                    for product_id, order_line in order_lines.items()}
+        accepted_orders = []
+        demand = {}
+        with self._lock_products(products):
+            for number, order_lines in grouped_orders:
+                problem = None
+                for product_id, (product, quantity) in order_lines.items():
+                    problem = self._check_order_line(product, quantity,
+                                                     demand.get(product_id, 0) + self._reserved.get(product_id, 0))
+                    if problem is not None:
+                        break
+                if problem is not None:
+                    results[number] = ValueError(problem[1])
+                    self._count_failure(problem[0])
+                    continue
+                for product_id, (_, quantity) in order_lines.items():
+                    demand[product_id] = demand.get(product_id, 0) + quantity
+                accepted_orders.append((number, order_lines))
+
+            bought_orders, bought_prices = self._buy_overridden(accepted_orders, demand, results)
+            for product_id, quantity in demand.items():
+                product, _ = products[product_id]
+                if not isinstance(product, NonStockedProduct) and type(product).buy is Product.buy:
+                    product.quantity -= quantity
+
+        # Every distinct product and quantity of the batch is priced once
+        line_prices = {}
+        price_line = self._price_line_cents if self._price_cache is None else self._price_cache.price_cents
+        for number, order_lines in bought_orders:
+            total_price = bought_prices.get(number, 0)
+            for product_id, (product, quantity) in order_lines.items():
+                if type(product).buy is not Product.buy:
+                    continue
+                line_price = line_prices.get((product_id, quantity))
+                if line_price is None:
+                    line_price = line_prices[(product_id, quantity)] = price_line(product, quantity)
+                total_price += line_price
+            results[number] = total_price / 100
+        if self._metrics is not None and bought_orders:
+            self._metrics.increment("bestbuy_orders_total", len(bought_orders))
+        return results
+
+    def _buy_overridden(self, accepted_orders, demand, results):
+        """
+        Buys the lines of accepted orders whose product class overrides buy, order by order.
+
+        An order whose purchase fails is rejected and its quantities are taken
+        out of the demand; an unexpected error restores the stock of all lines
+        bought so far. The locks of the products need to be held.
+
+        :param accepted_orders: List of tuples (number of the order, order lines).
+        :param demand: Dictionary mapping product ids to the total quantity of the accepted orders.
+        :param results: List with the result per order, where the errors of rejected orders are set.
+        :return: Tuple (list of the bought orders, dictionary mapping order numbers to the
+                 price in cents of their overridden lines).
+        """
+        bought_orders = []
+        bought_prices = {}
+        bought = []
+        try:
+            for number, order_lines in accepted_orders:
+                overridden_lines = [(product, quantity) for product, quantity in order_lines.values()
+                                    if type(product).buy is not Product.buy]
+                if overridden_lines:
+                    stock = [(product, product.quantity, product.is_active) for product, _ in overridden_lines]
+                    try:
+                        bought_prices[number] = self._buy_all(overridden_lines)
+                    except (TypeError, ValueError) as error:
+                        results[number] = error
+                        self._count_failure("purchase_failed")
+                        for product_id, (_, quantity) in order_lines.items():
+                            demand[product_id] -= quantity
+                        continue
+                    bought.extend(stock)
+                bought_orders.append((number, order_lines))
+        except Exception:
+            self._restore_stock(bought)
+            raise
+        return bought_orders, bought_prices
+
+    def _count_failure(self, reason):
+        """Counts a rejected order in the metrics of the store, if it has metrics."""
+        if self._metrics is not None:
+            self._metrics.increment("bestbuy_validation_failures_total", reason=reason)
+
+    def reserve(self, shopping_list, ttl=900, reservation=None):
+        """
+        Holds quantities of products for a later checkout.
+
+        Held stock is left out of the stock other orders and reservations can
+        take until the reservation is checked out, cancelled or expires.
+
+        :param shopping_list: List of tuples (product, quantity) to hold.
+        :param ttl: Seconds until the hold expires.
+        :param reservation: Reservation to add the lines to, renewing its expiry, or None for a new one.
+        :return: The reservation.
+        :raises TypeError: If a quantity is not an integer.
+        :raises ValueError: If a product is not found, cannot be bought in the quantity
+                            or the reservation is not held anymore.
+        """
+        self.expire_reservations()
+        order_lines = self._group_order(shopping_list)
+        if reservation is not None and reservation.state != "held":
+            raise ValueError(f"Reservation is {reservation.state}")
+        with self._lock_products(order_lines):
+            for product_id, (product, quantity) in order_lines.items():
+                _, held = (reservation._order_lines.get(product_id, (product, 0)) if reservation is not None
+                           else (product, 0))
+                # Limits count for the whole reservation, stock only for the quantity not held yet
+                self._validate_order_line(product, quantity + held, self._reserved.get(product_id, 0) - held)
+            with self._aggregates_lock:
+                if reservation is None:
+                    reservation = Reservation({}, 0)
+                for product_id, (product, quantity) in order_lines.items():
+                    _, held = reservation._order_lines.get(product_id, (product, 0))
+                    reservation._order_lines[product_id] = (product, held + quantity)
+                    if not isinstance(product, NonStockedProduct):
+                        self._reserved[product_id] = self._reserved.get(product_id, 0) + quantity
+                reservation._expires_at = monotonic() + ttl
+                heapq.heappush(self._reservation_heap,
+                               (reservation._expires_at, next(self._reservation_numbers), reservation))
+        return reservation
+
+    def _release(self, reservation, state):
+        """
+        Ends the hold of a reservation; the aggregates lock needs to be held.
+
+        :param reservation: A held reservation.
+        :param state: New state of the reservation.
+        """
+        for product_id, (product, quantity) in reservation._order_lines.items():
+            if not isinstance(product, NonStockedProduct):
+                remaining = self._reserved[product_id] - quantity
+                if remaining:
+                    self._reserved[product_id] = remaining
+                else:
+                    del self._reserved[product_id]
+        reservation._state = state
+
+    def _hold(self, reservation):
+        """
+        Holds the stock of a released reservation again; the aggregates lock needs to be held.
+
+        :param reservation: A reservation released by _release.
+        """
+        for product_id, (product, quantity) in reservation._order_lines.items():
+            if not isinstance(product, NonStockedProduct):
+                self._reserved[product_id] = self._reserved.get(product_id, 0) + quantity
+        reservation._state = "held"
+        # Its entry may have been skipped while it was released, so it expires with a new one
+        heapq.heappush(self._reservation_heap, (reservation._expires_at, next(self._reservation_numbers), reservation))
+
+    def expire_reservations(self):
+        """
+        Ends the holds of all reservations whose time ran out.
+
+        Every expired reservation is taken from a heap, so expiring costs
+        O(log n) per reservation instead of a scan over all of them.
+
+        :return: Number of reservations that expired.
+        """
+        heap = self._reservation_heap
+        now = monotonic()
+        expired_count = 0
+        with self._aggregates_lock:
+            while heap and heap[0][0] <= now:
+                expires_at, _, reservation = heapq.heappop(heap)
+                # Entries of renewed, ordered or cancelled reservations are skipped
+                if reservation._state == "held" and reservation._expires_at == expires_at:
+                    self._release(reservation, "expired")
+                    expired_count += 1
+        return expired_count
+
+    def cancel_reservation(self, reservation):
+        """
+        Ends the hold of a reservation without buying it.
+
+        :param reservation: A reservation of the store.
+        """
+        with self._aggregates_lock:
+            if reservation._state == "held":
+                self._release(reservation, "cancelled")
+
+    def checkout(self, reservation):
+        """
+        Buys the products of a reservation.
+
+        The stock was checked when it was reserved, so it is not validated again.
+
+        :param reservation: A held reservation of the store.
+        :return: Total price of the order.
+        :raises ValueError: If the reservation is not held anymore or a product left the store.
+        """
+        return self.checkout_cents(reservation) / 100
+
+    def checkout_cents(self, reservation):
+        """
+        Buys the products of a reservation like checkout, calculating the exact total price in cents.
+
+        :param reservation: A held reservation of the store.
+        :return: int, total price of the order in cents.
+        :raises ValueError: If the reservation is not held anymore or a product left the store.
+        """
+        self.expire_reservations()
+        if reservation.state != "held":
+            raise ValueError(f"Reservation is {reservation.state}")
+        order_lines = reservation._order_lines
+        for product, _ in order_lines.values():
+            if self._get_product(product) is None:
                 raise ValueError(f"{product.name} not in store")
-            if not product.is_active:
-                raise ValueError(f"{product.name} is not active in the store")
+        with self._lock_products(order_lines):
+            # Checked again under the locks, so a reservation that another thread checked out
+            # or expired in the meantime is not bought
+            with self._aggregates_lock:
+                if reservation._state != "held":
+                    raise ValueError(f"Reservation is {reservation._state}")
+                self._release(reservation, "ordered")
+            try:
+                total_price = self._buy_all(order_lines.values())
+            except Exception:
+                with self._aggregates_lock:
+                    self._hold(reservation)
+                raise
+        return total_price
 
-            quantity = sum(quant for prod, quant in shopping_list if prod == product)
-            if quantity > product.quantity and not isinstance(product, NonStockedProduct):
-                raise ValueError(f"Quantity of purchase too high for {product.name}")
+    def restock(self, lines):
+        """
+        Gives back the stock of bought lines whose order could not be completed.
+
+        :param lines: List of tuples (product, quantity, whether the product was active before buying).
+        """
+        # Products removed from the store in the meantime have no lock to take
+        order_lines = {product.product_id: (product, quantity) for product, quantity, _ in lines
+                       if self._get_product(product) is not None}
+        with self._lock_products(order_lines):
+            for product, quantity, active in lines:
+                if not isinstance(product, NonStockedProduct):
+                    product.quantity += quantity
+                if active:
+                    product.activate()
 
-        total_price = sum(product.buy(quantity) for product, quantity in shopping_list)
+    def available(self, product):
+        """
+        Get the stock of a product that is not held by reservations.
+
+        :param product: A product of the store.
+        :return: Quantity on hand minus the held quantity.
+        """
+        return product.quantity - self._reserved.get(product.product_id, 0)
+
+    def _lock_products(self, order_lines):
+        """
+        Acquires the locks of all products of an order.
+
+        Locks are always taken in the order of the product ids, so two orders
+        can never wait for each other.
+
+        :param order_lines: Dictionary mapping product ids to order lines.
+        :return: Context manager holding the locks.
+        """
+        locks = ExitStack()
+        if self._concurrent:
+            for product_id in sorted(order_lines):
+                lock = self._locks.get(product_id)
+                if lock is None:
+                    locks.close()
+                    product, _ = order_lines[product_id]
+                    raise ValueError(f"{product.name} not in store")
+                locks.enter_context(lock)
+        return locks
+
+    @staticmethod
+    def _buy_all(order_lines, metrics=None):
+        """
+        Buys all lines of an order, restoring the stock if any purchase fails.
+
+        :param order_lines: List of tuples (product, quantity) to buy.
+        :param metrics: Metrics instance recording the time per line by promotion, or None.
+        :return: int, total price of the order in cents.
+        """
+        bought = []
+        total_price = 0
+        try:
+            for product, quantity in order_lines:
+                stock = (product, product.quantity, product.is_active)
+                if metrics is None:
+                    total_price += purchase_cents(product, quantity)
+                else:
+                    start = perf_counter()
+                    total_price += purchase_cents(product, quantity)
+                    promotion = product.promotion
+                    metrics.observe("bestbuy_promotion_seconds", perf_counter() - start,
+                                    promotion="none" if promotion is None else str(promotion))
+                bought.append(stock)
+        except Exception:
+            Store._restore_stock(bought)
+            raise
         return total_price
+
+    @staticmethod
+    def _restore_stock(bought):
+        """
+        Gives back the stock of bought lines, the last bought line first.
+
+        :param bought: List of tuples (product, quantity and whether it was active before buying).
+        """
+        for product, quantity, active in reversed(bought):
+            product.quantity = quantity
+            if active:
+                product.activate()
+            else:
+                product.deactivate()
+
+    @staticmethod
+    def _price_line(product, quantity):
+        """
+        Calculates the exact price of a product without buying it.
+
+        :param product: The product to be priced.
+        :param quantity: Quantity of the product.
+        :return: Total price as a Decimal.
+        """
+        return cents_to_decimal(product.line_cents(quantity))
+
+    @staticmethod
+    def _price_line_cents(product, quantity):
+        """
+        Calculates the price of a product in cents without buying it.
+
+        :param product: The product to be priced.
+        :param quantity: Quantity of the product.
+        :return: int, total price in cents.
+        """
+        return product.line_cents(quantity)
+
+    def quote(self, carts):
+        """
+        Prices a batch of carts without changing any stock.
+
+        Carts are priced like orders, with the lines of a product combined.
+        Every distinct product and quantity of the batch is priced only once,
+        through the price cache of the store when it has one.
+
+        :param carts: List of shopping lists, each a list of tuples (product, quantity).
+        :return: List with a tuple (line totals, cart total) per cart, where line totals
+                 is a list of tuples (product, quantity, total price).
+        :raises TypeError: If a quantity is not an integer.
+        :raises ValueError: If a product is not found or a quantity is negative.
+        """
+        grouped_carts = [self._group_order(cart).values() for cart in carts]
+        line_prices = {}
+        price_line = self._price_line_cents if self._price_cache is None else self._price_cache.price_cents
+        for order_lines in grouped_carts:
+            for product, quantity in order_lines:
+                key = (product.product_id, quantity)
+                if key not in line_prices:
+                    line_prices[key] = price_line(product, quantity)
+
+        quotes = []
+        for order_lines in grouped_carts:
+            exact_totals = [line_prices[(product.product_id, quantity)] for product, quantity in order_lines]
+            line_totals = [(product, quantity, total / 100)
+                           for (product, quantity), total in zip(order_lines, exact_totals)]
+            quotes.append((line_totals, sum(exact_totals) / 100))
+        return quotes
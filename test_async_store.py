@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+from async_store import *
+from products import *
+from promotions import *
+from store import *
+
+
+def test_async_orders_do_not_oversell():
+    pixel = Product("Google Pixel 7", price=500, quantity=10)
+    macbook = Product("MacBook Air M2", price=1450, quantity=100)
+    macbook.promotion = SecondHalfPrice("Second Half price!")
+    async_store = AsyncStore(Store([pixel, macbook]))
+
+    async def checkout():
+        orders = [async_store.order([(pixel, 1), (macbook, 2)]) for _ in range(15)]
+        return await asyncio.gather(*orders, return_exceptions=True)
+
+    results = asyncio.run(checkout())
+    assert results[:10] == [2675] * 10
+    assert all(isinstance(result, ValueError) for result in results[10:])
+    assert pixel.quantity == 0
+    assert not pixel.is_active
+    assert macbook.quantity == 80
+
+
+def test_async_order_errors():
+    pixel = Product("Google Pixel 7", price=500, quantity=10)
+    ipod = Product("Ipod", price=100, quantity=150)
+    async_store = AsyncStore(Store([pixel]))
+
+    async def checkout():
+        with pytest.raises(ValueError, match="Ipod not in store"):
+            await async_store.order([(pixel, 1), (ipod, 1)])
+        await async_store.add_product([ipod])
+        return await async_store.order([(pixel, 1), (ipod, 1)])
+
+    assert asyncio.run(checkout()) == 600
+    assert pixel.quantity == 9
+
+
+# Test that a malformed order only fails itself, not the other orders of its batch.
+def test_async_order_malformed_line():
+    pixel = Product("Google Pixel 7", price=500, quantity=10)
+    async_store = AsyncStore(Store([pixel]))
+
+    async def checkout():
+        return await asyncio.wait_for(asyncio.gather(async_store.order([("not a product", 1)]),
+                                                     async_store.order([(pixel, 1)]), return_exceptions=True), 1)
+
+    results = asyncio.run(checkout())
+    assert isinstance(results[0], TypeError)
+    assert results[1] == 500
+    assert pixel.quantity == 9
+
+
+# Test that an unexpected error in a batch fails its orders instead of leaving them waiting.
+def test_async_order_unexpected_error(monkeypatch):
+    pixel = Product("Google Pixel 7", price=500, quantity=10)
+    store = Store([pixel])
+    async_store = AsyncStore(store)
+
+    def failing_order_many(shopping_lists):
+        raise RuntimeError("Database is gone")
+
+    monkeypatch.setattr(store, "order_many", failing_order_many)
+
+    async def checkout():
+        return await asyncio.wait_for(asyncio.gather(async_store.order([(pixel, 1)]),
+                                                     async_store.order([(pixel, 2)]), return_exceptions=True), 1)
+
+    results = asyncio.run(checkout())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert pixel.quantity == 10
+
+
+# Test that cancelled orders are left out of the batch.
+def test_cancelled_async_order():
+    pixel = Product("Google Pixel 7", price=500, quantity=5)
+    async_store = AsyncStore(Store([pixel]))
+
+    async def checkout():
+        cancelled = asyncio.ensure_future(async_store.order([(pixel, 3)]))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        return await async_store.order([(pixel, 1)])
+
+    assert asyncio.run(checkout()) == 500
+    assert pixel.quantity == 4
+
+
+def test_async_quote():
+    pixel = Product("Google Pixel 7", price=500, quantity=10)
+    async_store = AsyncStore(Store([pixel]))
+    quotes = asyncio.run(async_store.quote([[(pixel, 2)]]))
+    assert quotes == [([(pixel, 2, 1000)], 1000)]
+    assert pixel.quantity == 10
@@ -0,0 +1,31 @@
+import io
+import json
+
+from batch import process_orders, percentile
+from products import Product
+from store import Store
+
+
+def test_process_orders():
+    ipod = Product("Ipod", price=100, quantity=3, product_id=7)
+    best_buy = Store([ipod])
+    orders = io.StringIO('{"lines": [[7, 2]]}\n\n{"lines": [["Ipod", 2]]}\n{"lines": [["Ipod", 1]]}\n[1, 2\n')
+    output = io.StringIO()
+    summary = process_orders(best_buy, orders, output, buffer_size=2)
+
+    records = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert [record["ok"] for record in records] == [True, False, True, False]
+    assert records[0]["total"] == 200
+    assert records[1]["error"] == "Quantity of purchase too high for Ipod"
+    assert [record["order"] for record in records] == [1, 2, 3, 4]
+    assert (summary["orders"], summary["accepted"], summary["rejected"]) == (4, 2, 2)
+    assert 0 < summary["p50"] <= summary["max"]
+    assert ipod.quantity == 0
+
+
+def test_percentile():
+    values = list(range(1, 101))
+    assert percentile(values, 0.5) == 50
+    assert percentile(values, 0.99) == 99
+    assert percentile([3], 0.9) == 3
+    assert percentile([], 0.5) == 0.0
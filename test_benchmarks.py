@@ -0,0 +1,22 @@
+from benchmarks import generate_products, generate_carts, compare_results
+
+
+def test_generators_are_reproducible():
+    first = generate_products(50, "mixed", seed=3)
+    second = generate_products(50, "mixed", seed=3)
+    assert [(product.price, type(product.promotion)) for product in first] == \
+           [(product.price, type(product.promotion)) for product in second]
+    assert all(product.promotion is None for product in generate_products(20, "none"))
+    assert all(product.promotion is not None for product in generate_products(20, "all"))
+
+    carts = generate_carts(first, 5, 3, seed=1)
+    assert [[(product.product_id, quantity) for product, quantity in cart] for cart in carts] == \
+           [[(product.product_id, quantity) for product, quantity in cart]
+            for cart in generate_carts(first, 5, 3, seed=1)]
+    assert all(len(cart) == 3 for cart in carts)
+
+
+def test_compare_results():
+    baseline = {"fast": 1.0, "slow": 1.0, "gone": 1.0}
+    results = {"fast": 1.2, "slow": 1.5, "new": 9.0}
+    assert compare_results(results, baseline, 0.25) == [("slow", 1.0, 1.5)]
@@ -0,0 +1,66 @@
+from cli_functions import CatalogPager, handle_page_command, renew_reservation, print_shopping_cart
+from products import Product
+from store import Store
+
+
+def test_pager_loads_only_shown_pages():
+    products_list = [Product(f"Product {number}", price=10, quantity=1) for number in range(25)]
+    products_list[1].deactivate()
+    pager = CatalogPager(Store(products_list), page_size=10)
+    assert pager.page(1) == products_list[:1] + products_list[2:11]
+    assert len(pager._loaded) == 10
+    assert pager.product(12) is products_list[12]
+    assert pager.page(3) == products_list[21:]
+    assert pager.page(4) == []
+    assert pager.product(25) is None
+
+
+def test_pager_while_store_changes():
+    products_list = [Product(f"Product {number}", price=10, quantity=1) for number in range(5)]
+    store_obj = Store(list(products_list))
+    pager = CatalogPager(store_obj, page_size=2)
+    assert [product.name for product in pager.page(1)] == ["Product 0", "Product 1"]
+    store_obj.add_product([Product("Product 5", price=10, quantity=1)])
+    store_obj.remove_product(products_list[3])
+    store_obj.remove_product(products_list[0])
+    assert [product.name for product in pager.page(2)] == ["Product 2", "Product 4"]
+    assert [product.name for product in pager.page(3)] == ["Product 5"]
+    assert pager.product(1) is products_list[0]
+    pager.search("Product")
+    assert [product.name for product in pager.page(1)] == ["Product 1", "Product 2"]
+    store_obj.add_product([Product("Product 0", price=10, quantity=1)])
+    assert [product.name for product in pager.page(2)] == ["Product 4", "Product 5"]
+    assert [product.name for product in pager.page(3)] == ["Product 0"]
+
+
+def test_page_commands(capsys):
+    products_list = [Product(name, price=10, quantity=1) for name in ("Ipod", "Ipad", "Mac")]
+    pager = CatalogPager(Store(products_list), page_size=2)
+    assert handle_page_command(pager, "n")
+    assert pager.current_page == 2
+    assert "3. Mac" in capsys.readouterr().out
+    assert handle_page_command(pager, "g 5")
+    assert "Not found page 5" in capsys.readouterr().out
+    assert handle_page_command(pager, "/ip")
+    assert pager.product(2) is products_list[0]
+    assert "1. Ipad" in capsys.readouterr().out
+    assert not handle_page_command(pager, "2")
+
+
+def test_renew_expired_reservation():
+    product = Product("Ipod", price=10, quantity=5)
+    store_obj = Store([product])
+    order_list = [(product, 2)]
+    reservation = store_obj.reserve(order_list, ttl=0)
+    renewed = renew_reservation(store_obj, reservation, order_list)
+    assert reservation.state == "expired"
+    assert renewed.state == "held" and renewed.lines == order_list
+    assert store_obj.reserve([(product, 1)], reservation=renewed).lines == [(product, 3)]
+    assert renew_reservation(store_obj, renewed, order_list) is renewed
+    assert store_obj.checkout(renewed) == 30
+
+
+def test_shopping_cart_shows_cents(capsys):
+    cable = Product("Cable", price=19.9, quantity=10)
+    print_shopping_cart([(cable, 1), (cable, 2)])
+    assert "1. Cable, Price: 19.90, Quantity: 3" in capsys.readouterr().out
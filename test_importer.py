@@ -0,0 +1,75 @@
+import json
+
+from importer import *
+from promotions import *
+from store import *
+
+CSV_CATALOG = """name,price,quantity,limit,stocked,product_id,promotion
+MacBook Air M2,1450,100,,,1,Second Half price!
+Windows License,125,,,false,2,30% off!
+Shipping,10,250,1,,3,
+,100,150,,,4,
+Ipod,-100,150,,,5,
+Ipad,100,many,,,6,
+Pixel,500,250,,,1,
+Earbuds,250,500,,,7,Unknown
+"""
+
+
+def make_promotions():
+    """Creates the promotions the catalogs refer to."""
+    return [SecondHalfPrice("Second Half price!"), PercentDiscount("30% off!", percent=30)]
+
+
+def test_import_csv(tmp_path):
+    (tmp_path / "catalog.csv").write_text(CSV_CATALOG)
+    best_buy = Store([])
+    promotions = make_promotions()
+    assert import_catalog(tmp_path / "catalog.csv", best_buy, promotions, tmp_path / "rejects.jsonl",
+                          batch_size=3) == (3, 5)
+
+    macbook, windows, shipping = list(best_buy)
+    assert str(macbook) == "MacBook Air M2, Price: 1450.00$, Quantity: 100, Promotion: Second Half price!"
+    assert isinstance(windows, NonStockedProduct)
+    assert windows.promotion is promotions[1]
+    assert isinstance(shipping, LimitedProduct) and shipping.limit == 1
+
+    rejects = [json.loads(line) for line in (tmp_path / "rejects.jsonl").read_text().splitlines()]
+    assert [(reject["line"], reject["error"]) for reject in rejects] == [
+        (5, "Name cannot be empty"),
+        (6, "Price needs to be positive"),
+        (7, "invalid literal for int() with base 10: 'many'"),
+        (8, "Product id 1 is already in use"),
+        (9, "Unknown promotion: Unknown")]
+
+
+def test_import_json_lines(tmp_path):
+    lines = [{"name": "MacBook Air M2", "price": 1450, "quantity": 100, "promotion": "Second Half price!"},
+             {"name": "Ipod", "price": "cheap", "quantity": 150},
+             {"name": "Shipping", "price": 10, "quantity": 250, "limit": 1}]
+    (tmp_path / "catalog.jsonl").write_text("\n".join(map(json.dumps, lines)) + "\n{broken\n")
+    best_buy = Store([])
+    assert import_catalog(tmp_path / "catalog.jsonl", best_buy, make_promotions()) == (2, 2)
+    assert [product.name for product in best_buy] == ["MacBook Air M2", "Shipping"]
+
+
+# Test that ids generated for rows without one skip the explicit ids of later rows.
+def test_import_mixed_product_ids(tmp_path):
+    first_id = Product("Probe", price=1, quantity=0).product_id + 1
+    lines = [{"name": "Ipod", "price": 100}, {"name": "Ipad", "price": 400, "product_id": first_id}]
+    (tmp_path / "catalog.jsonl").write_text("\n".join(map(json.dumps, lines)) + "\n")
+    best_buy = Store([])
+    assert import_catalog(tmp_path / "catalog.jsonl", best_buy) == (2, 0)
+    assert best_buy.product_by_id(first_id).name == "Ipad"
+
+
+# Test that JSON lines which are not objects are rejected instead of stopping the import.
+def test_import_json_lines_not_objects(tmp_path):
+    (tmp_path / "catalog.jsonl").write_text('[1, 2]\n{"name": "Ipod", "price": 100}\n"Ipad"\n')
+    best_buy = Store([])
+    assert import_catalog(tmp_path / "catalog.jsonl", best_buy, reject_path=tmp_path / "rejects.jsonl") == (1, 2)
+    assert [product.name for product in best_buy] == ["Ipod"]
+    rejects = [json.loads(line) for line in (tmp_path / "rejects.jsonl").read_text().splitlines()]
+    assert [(reject["line"], reject["error"]) for reject in rejects] == [
+        (1, "Row needs to be a JSON object"),
+        (3, "Row needs to be a JSON object")]
@@ -0,0 +1,117 @@
+import random
+import stat
+
+import pytest
+from journal import *
+from products import *
+from promotions import *
+
+
+def store_state(store):
+    """Get the comparable state of all products of a store."""
+    return [(product.product_id, type(product).__name__.replace("Row", ""), str(product), product.is_active,
+             getattr(product, "limit", None)) for product in store]
+
+
+def mutate(store, generator, product_ids):
+    """Applies a random change to the store."""
+    products_list = list(store)
+    action = generator.randrange(6)
+    if action == 0 or not products_list:
+        product_id = next(product_ids)
+        store.add_product([LimitedProduct(f"Product {product_id}", price=generator.randint(1, 100),
+                                          quantity=generator.randint(0, 20), limit=5, product_id=product_id)])
+        return
+    product = generator.choice(products_list)
+    if action == 1:
+        store.remove_product(product)
+    elif action == 2:
+        product.price = generator.randint(1, 100)
+    elif action == 3:
+        product.promotion = PercentDiscount(f"{action}% off!", percent=generator.randint(1, 50))
+    elif action == 4 and product.is_active and product.quantity:
+        store.order([(product, 1)])
+    else:
+        product.quantity = generator.randint(0, 20)
+
+
+def make_journal(tmp_path, batch_size=1):
+    """Opens a journal of a store with a few products."""
+    journal = Journal.open(tmp_path / "store.snapshot", tmp_path / "store.log", batch_size=batch_size)
+    journal.store.add_product([Product("MacBook Air M2", price=1450, quantity=100, product_id=1),
+                               NonStockedProduct("Windows License", price=125, product_id=2)])
+    return journal
+
+
+# Test that every committed change survives a crash at a random point.
+@pytest.mark.parametrize("seed", range(10))
+def test_recovery_after_crash(tmp_path, seed):
+    generator = random.Random(seed)
+    journal = make_journal(tmp_path, batch_size=generator.randint(1, 8))
+    product_ids = iter(range(100, 1000))
+    committed_state = store_state(journal.store)
+    journal.commit()
+    for _ in range(generator.randint(1, 60)):
+        mutate(journal.store, generator, product_ids)
+        if generator.random() < 0.2:
+            journal.commit()
+        # Full batches are written without an explicit commit
+        if not journal._pending_records:
+            committed_state = store_state(journal.store)
+    # Simulate a crash while the next batch was written
+    journal._file.write(b'{"op": "set", "id": 1, "attri')
+    journal._file.flush()
+
+    store, _ = recover(tmp_path / "store.snapshot", tmp_path / "store.log")
+    assert store_state(store) == committed_state
+
+
+def test_recovery_with_compaction(tmp_path):
+    generator = random.Random(1)
+    journal = Journal.open(tmp_path / "store.snapshot", tmp_path / "store.log", batch_size=4, compact_after=8)
+    product_ids = iter(range(100, 1000))
+    for _ in range(50):
+        mutate(journal.store, generator, product_ids)
+    journal.close()
+    expected_state = store_state(journal.store)
+
+    reopened = Journal.open(tmp_path / "store.snapshot", tmp_path / "store.log")
+    assert store_state(reopened.store) == expected_state
+    assert os.path.getsize(tmp_path / "store.log") == 0
+
+
+# Test that compaction syncs the new snapshot and its directory before emptying the journal.
+def test_compaction_is_durable(tmp_path, monkeypatch):
+    journal = Journal.open(tmp_path / "store.snapshot", tmp_path / "store.log")
+    journal.store.add_product([Product("Ipod", price=100, quantity=10)])
+    events = []
+    real_fsync, real_replace = os.fsync, os.replace
+
+    def fsync(file_descriptor):
+        status = os.fstat(file_descriptor)
+        events.append(("fsync", "directory" if stat.S_ISDIR(status.st_mode) else status.st_size))
+        real_fsync(file_descriptor)
+
+    def replace(source, destination):
+        events.append(("replace", os.path.getsize(source)))
+        real_replace(source, destination)
+
+    monkeypatch.setattr(os, "fsync", fsync)
+    monkeypatch.setattr(os, "replace", replace)
+    journal.compact()
+    journal.close()
+    snapshot_size = os.path.getsize(tmp_path / "store.snapshot")
+    assert events[-4:] == [("fsync", snapshot_size), ("replace", snapshot_size), ("fsync", "directory"),
+                           ("fsync", 0)]
+
+
+def test_uncommitted_changes_lost(tmp_path):
+    journal = make_journal(tmp_path, batch_size=100)
+    journal.commit()
+    macbook = journal.store.product_by_id(1)
+    journal.store.order([(macbook, 10)])
+    store, _ = recover(tmp_path / "store.snapshot", tmp_path / "store.log")
+    assert store.product_by_id(1).quantity == 100
+    journal.commit()
+    store, _ = recover(tmp_path / "store.snapshot", tmp_path / "store.log")
+    assert store.product_by_id(1).quantity == 90
@@ -0,0 +1,60 @@
+import pytest
+from metrics import Metrics
+from products import Product, LimitedProduct
+from promotions import ThirdOneFree
+from store import Store
+
+
+def test_order_metrics():
+    metrics = Metrics()
+    promotion = ThirdOneFree("Third One Free!")
+    ipod = Product("Ipod", price=100, quantity=10)
+    ipod.promotion = promotion
+    mac = LimitedProduct("Mac", price=1000, quantity=10, limit=1)
+    best_buy = Store([ipod, mac], concurrent=True, metrics=metrics)
+
+    assert best_buy.order([(ipod, 3), (mac, 1)]) == 1200
+    with pytest.raises(ValueError, match="Quantity of purchase too high for Ipod"):
+        best_buy.order([(ipod, 8)])
+    with pytest.raises(ValueError, match=r"Quantity needs to be in range of the Limit \(1\)"):
+        best_buy.order([(mac, 2)])
+    with pytest.raises(TypeError):
+        best_buy.order([(ipod, "1")])
+    mac.deactivate()
+    with pytest.raises(ValueError, match="Mac is not active in the store"):
+        best_buy.order([(mac, 1)])
+
+    snapshot = metrics.snapshot()
+    assert snapshot["counters"][("bestbuy_orders_total", ())] == 1
+    failures = {labels[0][1]: value for (name, labels), value in snapshot["counters"].items()
+                if name == "bestbuy_validation_failures_total"}
+    assert failures == {"insufficient_stock": 1, "over_limit": 1, "invalid_line": 1, "inactive": 1}
+    assert snapshot["histograms"][("bestbuy_order_lines", ())]["sum"] == 2
+    assert snapshot["histograms"][("bestbuy_promotion_seconds", (("promotion", "Third One Free!"),))]["count"] == 1
+    assert snapshot["histograms"][("bestbuy_promotion_seconds", (("promotion", "none"),))]["count"] == 1
+    assert snapshot["histograms"][("bestbuy_lock_wait_seconds", ())]["count"] == 4
+    assert snapshot["orders_per_second"] > 0
+
+
+def test_prometheus_format():
+    metrics = Metrics()
+    metrics.increment("bestbuy_orders_total", 2)
+    metrics.observe("bestbuy_order_lines", 3)
+    metrics.observe("bestbuy_promotion_seconds", 0.001, promotion='Say "hi"\\')
+    text = metrics.to_prometheus()
+    assert "# TYPE bestbuy_orders_total counter\nbestbuy_orders_total 2\n" in text
+    assert 'bestbuy_order_lines_bucket{le="2"} 0\n' in text
+    assert 'bestbuy_order_lines_bucket{le="5"} 1\n' in text
+    assert 'bestbuy_order_lines_bucket{le="+Inf"} 1\n' in text
+    assert "bestbuy_order_lines_sum 3\nbestbuy_order_lines_count 1\n" in text
+    assert 'bestbuy_promotion_seconds_count{promotion="Say \\"hi\\"\\\\"} 1' in text
+
+    metrics.reset()
+    assert metrics.snapshot()["counters"] == {}
+
+
+def test_store_without_metrics():
+    ipod = Product("Ipod", price=100, quantity=10)
+    best_buy = Store([ipod])
+    assert best_buy.metrics is None
+    assert best_buy.order([(ipod, 1)]) == 100
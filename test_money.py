@@ -0,0 +1,52 @@
+from decimal import Decimal, ROUND_HALF_UP, ROUND_HALF_EVEN, ROUND_DOWN, ROUND_UP
+
+import pytest
+from money import *
+from products import *
+from store import Store
+
+
+def test_to_cents():
+    assert to_cents(19.99) == 1999
+    assert to_cents(0.1) == 10
+    assert to_cents(7) == 700
+    assert to_cents(Decimal("2.675")) == 268
+    # The float 1.005 is slightly below 1.005 but is read by its shortest representation
+    assert to_cents(1.005) == 101
+
+
+@pytest.mark.parametrize("rounding, expected", [(ROUND_HALF_UP, [2, 3, 3, 4]), (ROUND_HALF_EVEN, [2, 2, 3, 4]),
+                                                (ROUND_DOWN, [2, 2, 2, 4]), (ROUND_UP, [3, 3, 3, 4])])
+def test_round_cents(rounding, expected):
+    assert [round_cents(numerator, 4, rounding) for numerator in (9, 10, 11, 16)] == expected
+
+
+def test_round_cents_unknown_rounding():
+    with pytest.raises(ValueError, match="Rounding is not supported: ROUND_CEILING was given"):
+        round_cents(1, 2, "ROUND_CEILING")
+
+
+def test_format_cents():
+    assert format_cents(1230) == "12.30"
+    assert format_cents(5) == "0.05"
+    assert format_cents(-105) == "-1.05"
+
+
+# Test that prices set as floats are kept exactly in whole cents.
+def test_product_price_cents():
+    cable = Product("Cable", price=0.1, quantity=10)
+    assert cable.price_cents == 10
+    assert cable.price == 0.1
+    cable.price = 19.99
+    assert cable.price_cents == 1999
+    assert str(cable) == "Cable, Price: 19.99$, Quantity: 10, Promotion: None"
+
+
+# Test that totals of many lines have no float rounding errors.
+def test_order_total_is_exact():
+    products_list = [Product(f"Cable {number}", price=0.1, quantity=10) for number in range(1_000)]
+    best_buy = Store(list(products_list))
+    assert sum(0.1 for _ in products_list) != 100
+    assert best_buy.order_cents([(product, 1) for product in products_list]) == 10_000
+    assert best_buy.order([(product, 1) for product in products_list]) == 100
+    assert best_buy.order_many([[(product, 7) for product in products_list]]) == [700]
@@ -0,0 +1,60 @@
+from decimal import Decimal
+
+import pytest
+from price_cache import PriceCache
+from products import Product
+from promotions import PercentDiscount, ThirdOneFree
+from snapshot import _promotion_to_dict
+from store import Store
+
+
+def test_cache_hits_and_evictions():
+    cache = PriceCache(maxsize=2)
+    ipod = Product("Ipod", price=100, quantity=10)
+    assert cache.price(ipod, 1) == Decimal(100)
+    assert cache.price(ipod, 1) == Decimal(100)
+    assert cache.price(ipod, 2) == Decimal(200)
+    assert cache.price(ipod, 1) == Decimal(100)
+    assert cache.price(ipod, 3) == Decimal(300)
+    # Quantity 2 was used least recently
+    assert cache.stats == {"hits": 2, "misses": 3, "evictions": 1, "size": 2, "maxsize": 2}
+    cache.price(ipod, 2)
+    assert cache.stats["misses"] == 4
+
+    with pytest.raises(ValueError, match="Maxsize needs to be positive"):
+        PriceCache(maxsize=0)
+
+
+def test_changes_are_never_served_stale():
+    cache = PriceCache()
+    ipod = Product("Ipod", price=100, quantity=10, product_id=1)
+    assert cache.price(ipod, 3) == Decimal(300)
+    ipod.price = 50
+    assert cache.price(ipod, 3) == Decimal(150)
+    ipod.promotion = ThirdOneFree("Third One Free!")
+    assert cache.price(ipod, 3) == Decimal(100)
+    discount = PercentDiscount("30% off!", percent=30)
+    ipod.promotion = discount
+    assert cache.price(ipod, 3) == Decimal(105)
+    discount.percent = 50
+    assert cache.price(ipod, 3) == Decimal(75)
+    # Another product with the same id does not get the price of the first
+    other = Product("Ipod", price=10, quantity=10, product_id=1)
+    assert cache.price(other, 3) == Decimal(30)
+    assert cache.stats["hits"] == 0
+
+
+def test_promotion_version_is_not_saved():
+    discount = PercentDiscount("30% off!", percent=30)
+    discount.percent = 40
+    assert discount.version == 3
+    assert _promotion_to_dict(discount)["attributes"] == {"member": "30% off!", "percent": 40}
+
+
+def test_store_quote_uses_cache():
+    cache = PriceCache()
+    ipod = Product("Ipod", price=100, quantity=10)
+    best_buy = Store([ipod], price_cache=cache)
+    assert best_buy.quote([[(ipod, 2)]]) == [([(ipod, 2, 200.0)], 200.0)]
+    assert best_buy.quote([[(ipod, 2)]]) == [([(ipod, 2, 200.0)], 200.0)]
+    assert cache.stats["hits"] == 1
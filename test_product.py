@@ -105,5 +105,24 @@ def test_greater_than():
     assert ipad > ipod
 
 
+# Test that observers are told about every change of a product.
+def test_product_observer():
+    changes = []
+    ipod = Product("Ipod", price=100, quantity=2)
+    ipod.add_observer(lambda product, *change: changes.append(change))
+    ipod.price = 90
+    ipod.promotion = PercentDiscount("30% off!", percent=30)
+    ipod.buy(2)
+    ipod.activate()
+    assert changes == [("price", 100, 90), ("promotion", None, ipod.promotion), ("quantity", 2, 0),
+                       ("active", True, False), ("active", False, True)]
+
+
+def test_buying_last_item_deactivates():
+    ipod = Product("Ipod", price=100, quantity=2)
+    ipod.buy(2)
+    assert not ipod.is_active
+
+
 if __name__ == '__main__':
     pytest.main()
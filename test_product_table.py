@@ -0,0 +1,62 @@
+import pytest
+from product_table import *
+from store import *
+
+
+def make_table():
+    """Creates a table with one row of every product kind."""
+    table = ProductTable()
+    table.append("MacBook Air M2", price=1450, quantity=100)
+    table.append("Windows License", price=125, stocked=False)
+    table.append("Shipping", price=10, quantity=250, limit=1)
+    return table
+
+
+# Test that rows are viewed as the matching product classes.
+def test_row_classes():
+    table = make_table()
+    assert len(table) == 3
+    assert [type(product) for product in table] == [ProductRow, NonStockedProductRow, LimitedProductRow]
+    assert isinstance(table[1], NonStockedProduct)
+    assert isinstance(table[2], LimitedProduct)
+    assert table[0] is table[0]
+
+
+# Test that changing a view changes the table.
+def test_view_writes_to_table():
+    table = make_table()
+    macbook = table[0]
+    macbook.promotion = SecondHalfPrice("Second Half price!")
+    assert macbook.buy(2) == 2175
+    macbook.price = 1000
+    assert table[0].quantity == 98
+    assert table[0].price == 1000
+    assert str(table[0]) == "MacBook Air M2, Price: 1000.00$, Quantity: 98, Promotion: Second Half price!"
+    with pytest.raises(ValueError, match="Quantity needs to be in range of the Limit"):
+        table[2].buy(2)
+
+
+def test_product_slots():
+    ipod = Product("Ipod", price=100, quantity=150)
+    with pytest.raises(AttributeError):
+        ipod.color = "white"
+
+
+def test_append_validation():
+    table = ProductTable()
+    with pytest.raises(ValueError, match="Name cannot be empty"):
+        table.append("", price=100, quantity=150)
+    with pytest.raises(TypeError, match="Limit needs to be an integer: str was given"):
+        table.append("Shipping", price=10, quantity=250, limit="1")
+    table.append("Ipod", price=100, quantity=0)
+    assert not table[0].is_active
+    with pytest.raises(IndexError):
+        table[1]
+
+
+def test_store_of_table_rows():
+    table = make_table()
+    best_buy = Store(list(table))
+    assert table[0] in best_buy
+    assert best_buy.order([(table[0], 2), (table[1], 3), (table[2], 1)]) == 2900 + 375 + 10
+    assert best_buy.total_quantity == 98 + 249
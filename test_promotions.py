@@ -0,0 +1,79 @@
+import random
+from decimal import ROUND_HALF_UP, ROUND_HALF_EVEN
+from fractions import Fraction
+
+import pytest
+from products import *
+from money import round_cents
+from promotions import *
+
+
+def loop_second_half_price(price, quantity):
+    """Reference per item pricing of SecondHalfPrice."""
+    return sum(price / 2 if count % 2 == 0 else price for count in range(1, quantity + 1))
+
+
+def loop_third_one_free(price, quantity):
+    """Reference per item pricing of ThirdOneFree."""
+    return sum(0 if count % 3 == 0 else price for count in range(1, quantity + 1))
+
+
+# Test that the closed form prices match pricing every item on its own.
+@pytest.mark.parametrize("promotion, reference", [(SecondHalfPrice("Second Half price!"), loop_second_half_price),
+                                                  (ThirdOneFree("Third One Free!"), loop_third_one_free)])
+def test_closed_form_matches_loop(promotion, reference):
+    generator = random.Random(42)
+    for _ in range(500):
+        price = generator.choice([generator.randint(0, 5000), round(generator.uniform(0, 5000), 2)])
+        quantity = generator.randint(0, 200)
+        product = Product("Ipod", price=price, quantity=quantity)
+        expected = reference(Fraction(repr(float(price))), quantity)
+        # Promotions charge whole cents, rounding a half cent up
+        cents = expected * 100
+        assert promotion.price_cents(product.price_cents, quantity) == round_cents(cents.numerator, cents.denominator)
+        assert promotion.apply_promotion(product, quantity) == round_cents(cents.numerator, cents.denominator) / 100
+
+
+def test_closed_form_is_exact():
+    product = Product("Cable", price=0.1, quantity=1_000_000)
+    assert SecondHalfPrice("Second Half price!").apply_promotion(product, 1_000_000) == 75000.0
+    assert ThirdOneFree("Third One Free!").apply_promotion(product, 1_000_000) == 66666.7
+
+
+def test_percent_discount():
+    product = Product("Windows License", price=125, quantity=10)
+    assert PercentDiscount("30% off!", percent=30).apply_promotion(product, 3) == 262.5
+
+
+# Test that the discounted line total is rounded once, by the rounding of the promotion.
+@pytest.mark.parametrize("rounding, cents", [(ROUND_HALF_UP, 263), (ROUND_HALF_EVEN, 262), ("ROUND_DOWN", 262),
+                                             ("ROUND_UP", 263)])
+def test_percent_discount_rounding(rounding, cents):
+    product = Product("Cable", price=1.25, quantity=10)
+    product.promotion = PercentDiscount("30% off!", percent=30, rounding=rounding)
+    assert product.line_cents(3) == cents
+    assert product.promotion.price_cents(125, 3) == cents
+    assert PercentDiscount("50% off!", percent=50, rounding=rounding).price_cents(1, 1) == cents - 262
+
+
+def test_percent_discount_fractional_percent():
+    discount = PercentDiscount("12.5% off!", percent=12.5)
+    assert discount.price_cents(8, 1) == 7
+    assert discount.price_cents(4, 1) == 4
+
+
+def test_percent_discount_unknown_rounding():
+    with pytest.raises(ValueError, match="Rounding is not supported: ROUND_05UP was given"):
+        PercentDiscount("30% off!", percent=30, rounding="ROUND_05UP")
+
+
+def test_promotion_without_closed_form():
+    class BuyOneGetNothing(Promotion):
+        def apply_promotion(self, product, quantity):
+            return product.price * quantity
+
+    with pytest.raises(NotImplementedError):
+        BuyOneGetNothing("Nothing").price_cents(1000, 1)
+    product = Product("Ipod", price=10.5, quantity=3)
+    product.promotion = BuyOneGetNothing("Nothing")
+    assert product.buy_cents(3) == 3150
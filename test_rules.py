@@ -0,0 +1,102 @@
+from decimal import Decimal
+
+import pytest
+from products import Product
+from promotions import Promotion, SecondHalfPrice, ThirdOneFree, PercentDiscount
+from rules import RulesEngine, PercentOff, BuyXGetY, CartThreshold, Bundle
+from store import Store
+
+
+def test_promotions_match_apply_promotion():
+    promotions = [SecondHalfPrice("Second Half price!"), ThirdOneFree("Third One Free!"),
+                  PercentDiscount("30% off!", percent=30)]
+    products_list = [Product(f"Product {number}", price=19.99 + number, quantity=100) for number in range(4)]
+    for product, promotion in zip(products_list, promotions):
+        product.promotion = promotion
+    best_buy = Store(products_list)
+    engine = RulesEngine(best_buy)
+    for product in products_list:
+        for quantity in range(8):
+            assert engine.price_cart([(product, quantity)]) == Store._price_line(product, quantity)
+
+
+def test_stacked_rules():
+    ipod = Product("Ipod", price=100, quantity=100)
+    engine = RulesEngine(Store([ipod]))
+    engine.add_rule(PercentOff(10), [ipod])
+    engine.add_rule(BuyXGetY(2, 1), [ipod])
+    # 6 items, 2 free, then 10% off
+    assert engine.price_cart([(ipod, 6)]) == Decimal(360)
+
+    # A second percentage stacks, a lower buy-x-get-y is ignored
+    engine.add_rule(PercentOff(50, priority=-1), [ipod])
+    engine.add_rule(BuyXGetY(1, 1, priority=-1), [ipod])
+    assert engine.price_cart([(ipod, 6)]) == Decimal(180)
+
+    # An exclusive rule stops the rules below it
+    exclusive = PercentOff(20, priority=5, exclusive=True)
+    engine.add_rule(exclusive, [ipod])
+    assert engine.price_cart([(ipod, 6)]) == Decimal(480)
+    engine.remove_rule(exclusive)
+    assert engine.price_cart([(ipod, 6)]) == Decimal(180)
+
+
+def test_cart_rules():
+    ipod = Product("Ipod", price=100, quantity=100)
+    case = Product("Case", price=20, quantity=100)
+    engine = RulesEngine(Store([ipod, case]))
+    engine.add_rule(Bundle([(ipod, 1), (case, 2)], price=110))
+    assert engine.price_cart([(ipod, 2), (case, 3)]) == Decimal(110 + 100 + 20)
+
+    engine.add_rule(CartThreshold(200, 10))
+    engine.add_rule(CartThreshold(500, 20))
+    assert engine.price_cart([(ipod, 2), (case, 3)]) == Decimal(207)
+    assert engine.price_cart([(ipod, 5)]) == Decimal(400)
+    assert engine.price_cart([(case, 1)]) == Decimal(20)
+
+    for count in (0, -1, 1.5):
+        with pytest.raises(ValueError, match="positive integers"):
+            Bundle([(ipod, 1), (case, count)], price=110)
+
+
+@pytest.mark.parametrize("make_rule", [lambda percent: PercentOff(percent),
+                                       lambda percent: BuyXGetY(1, 1, percent_off=percent),
+                                       lambda percent: CartThreshold(200, percent)])
+def test_rule_percent_range(make_rule):
+    for percent in (-10, 150):
+        with pytest.raises(ValueError, match=f"Percent needs to be between 0 and 100: {percent} was given"):
+            make_rule(percent)
+    assert make_rule(0).priority == make_rule(100).priority == 0
+
+
+def test_plans_follow_changes():
+    ipod = Product("Ipod", price=100, quantity=100)
+    best_buy = Store([ipod])
+    engine = RulesEngine(best_buy)
+    assert engine.price_cart([(ipod, 3)]) == Decimal(300)
+    ipod.promotion = ThirdOneFree("Third One Free!")
+    assert engine.price_cart([(ipod, 3)]) == Decimal(200)
+    ipod.price = 50
+    assert engine.price_cart([(ipod, 3)]) == Decimal(100)
+
+    class HalfPrice(Promotion):
+        def apply_promotion(self, product, quantity):
+            return product.price * quantity / 2
+
+    ipod.promotion = HalfPrice("Half price")
+    percent_off = PercentOff(10)
+    engine.add_rule(percent_off, [ipod])
+    assert engine.price_cart([(ipod, 2)]) == Decimal(45)
+
+    # Promotions edited in place change their version, so the plan is rebuilt
+    discount = PercentDiscount("10% off!", percent=10)
+    ipod.promotion = discount
+    engine.remove_rule(percent_off)
+    assert engine.price_cart([(ipod, 2)]) == Decimal(90)
+    discount.percent = 50
+    assert engine.price_cart([(ipod, 2)]) == Decimal(50)
+    assert best_buy.quote([[(ipod, 2)]])[0][1] == 50
+
+    best_buy.remove_product(ipod)
+    with pytest.raises(ValueError, match="Ipod not in store"):
+        engine.price_cart([(ipod, 1)])
@@ -0,0 +1,64 @@
+import random
+
+from store import *
+from promotions import *
+
+
+def make_store():
+    """Creates a store with products in different price ranges and promotions."""
+    second_half_price = SecondHalfPrice("Second Half price!")
+    products_list = [Product("MacBook Air M2", price=1450, quantity=100),
+                     Product("MacBook Pro", price=2500, quantity=10),
+                     Product("Bose QuietComfort Earbuds", price=250, quantity=500),
+                     Product("Google Pixel 7", price=500, quantity=250),
+                     NonStockedProduct("Windows License", price=125),
+                     LimitedProduct("Shipping", price=10, quantity=250, limit=1)]
+    products_list[0].promotion = second_half_price
+    products_list[2].promotion = ThirdOneFree("Third One Free!")
+    products_list[4].promotion = PercentDiscount("30% off!", percent=30)
+    return Store(products_list), products_list
+
+
+def names(products):
+    """Get the sorted names of products."""
+    return sorted(product.name for product in products)
+
+
+def test_search_criteria():
+    best_buy, products_list = make_store()
+    assert names(best_buy.search(name_prefix="macbook")) == ["MacBook Air M2", "MacBook Pro"]
+    assert names(best_buy.search(min_price=125, max_price=500)) == ["Bose QuietComfort Earbuds", "Google Pixel 7",
+                                                                    "Windows License"]
+    assert names(best_buy.search(max_price=300, promoted=True)) == ["Bose QuietComfort Earbuds", "Windows License"]
+    assert names(best_buy.search(promotion=products_list[0].promotion)) == ["MacBook Air M2"]
+    assert names(best_buy.search(name_prefix="m", promoted=False)) == ["MacBook Pro"]
+    assert len(list(best_buy.search(limit=2))) == 2
+
+
+def test_search_follows_changes():
+    best_buy, products_list = make_store()
+    assert names(best_buy.search(max_price=300)) == ["Bose QuietComfort Earbuds", "Shipping", "Windows License"]
+    products_list[3].price = 299
+    products_list[2].price = 301
+    products_list[5].promotion = products_list[0].promotion
+    best_buy.remove_product(products_list[4])
+    products_list[1].quantity = 0
+    best_buy.add_product([Product("Macintosh Classic", price=100, quantity=1)])
+
+    assert names(best_buy.search(max_price=300)) == ["Google Pixel 7", "Macintosh Classic", "Shipping"]
+    assert names(best_buy.search(promotion=products_list[0].promotion)) == ["MacBook Air M2", "Shipping"]
+    assert names(best_buy.search(name_prefix="mac")) == ["MacBook Air M2", "Macintosh Classic"]
+    assert names(best_buy.search(name_prefix="mac", active_only=False)) == ["MacBook Air M2", "MacBook Pro",
+                                                                            "Macintosh Classic"]
+
+
+# Test that searches match a full scan after random price changes.
+def test_search_matches_scan():
+    generator = random.Random(3)
+    products_list = [Product(f"Product {number}", price=generator.randint(1, 100), quantity=1)
+                     for number in range(200)]
+    best_buy = Store(list(products_list))
+    for product in generator.sample(products_list, 100):
+        product.price = generator.randint(1, 100)
+    found = best_buy.search(min_price=20, max_price=40)
+    assert sorted(map(id, found)) == sorted(id(product) for product in products_list if 20 <= product.price <= 40)
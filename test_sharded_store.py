@@ -0,0 +1,94 @@
+import pytest
+from products import Product
+from sharded_store import ShardedStore, HashRing
+
+
+def test_placement_is_stable():
+    first, second = HashRing(), HashRing()
+    for name in ("a", "b", "c"):
+        first.add(name)
+    for name in ("c", "a", "b"):
+        second.add(name)
+    assert [first.owner(product_id) for product_id in range(100)] == \
+           [second.owner(product_id) for product_id in range(100)]
+    with pytest.raises(ValueError, match="The ring has no shards"):
+        HashRing().owner(1)
+
+
+def test_scatter_gather():
+    products_list = [Product(f"Product {number}", price=10, quantity=2) for number in range(100)]
+    sharded_store = ShardedStore(products_list, shard_count=4)
+    assert all(len(list(shard)) > 0 for shard in sharded_store.shards.values())
+    assert sharded_store.total_quantity == 200
+    assert len(sharded_store.all_products) == 100
+    assert all(product in sharded_store for product in products_list)
+    assert sharded_store.product_by_id(products_list[5].product_id) is products_list[5]
+    sharded_store.remove_product(products_list[5])
+    assert products_list[5] not in sharded_store
+
+
+def test_order_across_shards():
+    products_list = [Product(f"Product {number}", price=10, quantity=2) for number in range(20)]
+    sharded_store = ShardedStore(products_list, shard_count=4)
+    first = products_list[0]
+    other = next(product for product in products_list
+                 if sharded_store.shard_for(product) is not sharded_store.shard_for(first))
+    assert sharded_store.order([(first, 1), (other, 2)]) == 30
+    assert (first.quantity, other.quantity) == (1, 0)
+
+    # A failing shard leaves the stock of every shard unchanged
+    third = next(product for product in products_list
+                 if sharded_store.shard_for(product) not in (sharded_store.shard_for(first),
+                                                             sharded_store.shard_for(other)))
+    with pytest.raises(ValueError, match=f"{other.name} is not active in the store"):
+        sharded_store.order([(first, 1), (third, 1), (other, 1)])
+    assert (first.quantity, third.quantity) == (1, 2)
+    assert all(shard.available(product) == product.quantity
+               for shard in sharded_store.shards.values() for product in shard)
+
+
+# Test that a checkout failing on a later shard gives back the stock bought on the earlier ones.
+@pytest.mark.parametrize("concurrent", [False, True])
+def test_failed_checkout_restocks(monkeypatch, concurrent):
+    products_list = [Product(f"Product {number}", price=10, quantity=1) for number in range(20)]
+    sharded_store = ShardedStore(products_list, shard_count=4, concurrent=concurrent)
+    first = products_list[0]
+    first_shard = sharded_store.shard_for(first)
+    other = next(product for product in products_list if sharded_store.shard_for(product) is not first_shard)
+
+    def failing_checkout(reservation):
+        raise RuntimeError("Shard unavailable")
+
+    # The stock is given back under the locks of the shard
+    locked = []
+    lock_products = first_shard._lock_products
+
+    def recording_lock_products(order_lines):
+        locked.append(sorted(order_lines))
+        return lock_products(order_lines)
+
+    monkeypatch.setattr(sharded_store.shard_for(other), "checkout_cents", failing_checkout)
+    monkeypatch.setattr(first_shard, "_lock_products", recording_lock_products)
+    with pytest.raises(RuntimeError, match="Shard unavailable"):
+        sharded_store.order([(first, 1), (other, 1)])
+    assert locked[-1] == [first.product_id]
+    assert (first.quantity, first.is_active) == (1, True)
+    assert sharded_store.shard_for(other).available(other) == 1
+
+
+def test_add_shard_moves_few_products():
+    products_list = [Product(f"Product {number}", price=10, quantity=1) for number in range(2000)]
+    sharded_store = ShardedStore(products_list, shard_count=4)
+    placement = {product.product_id: sharded_store.shard_for(product) for product in products_list}
+    shard_name, moved_count = sharded_store.add_shard()
+    new_shard = sharded_store.shards[shard_name]
+    assert 200 < moved_count < 700
+    for product in products_list:
+        shard = sharded_store.shard_for(product)
+        assert shard is new_shard or shard is placement[product.product_id]
+        assert product in shard
+    assert len(list(new_shard)) == moved_count
+
+    sharded_store.remove_shard(shard_name)
+    assert sharded_store.total_quantity == 2000
+    assert all(sharded_store.shard_for(product) is placement[product.product_id] for product in products_list)
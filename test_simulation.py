@@ -0,0 +1,49 @@
+import random
+
+from simulation import *
+from products import *
+from promotions import *
+
+
+def make_store():
+    """Creates a store with promotions and a limited product."""
+    products_list = [Product("MacBook Air M2", price=1450, quantity=10_000),
+                     Product("Bose QuietComfort Earbuds", price=250, quantity=10_000),
+                     NonStockedProduct("Windows License", price=125),
+                     LimitedProduct("Shipping", price=10, quantity=10_000, limit=1),
+                     Product("Google Pixel 7", price=500, quantity=20)]
+    products_list[0].promotion = SecondHalfPrice("Second Half price!")
+    products_list[1].promotion = ThirdOneFree("Third One Free!")
+    products_list[2].promotion = PercentDiscount("30% off!", percent=30)
+    return Store(products_list), products_list
+
+
+def write_random_orders(path, products_list, order_count=300):
+    """Writes an order log of random orders."""
+    generator = random.Random(9)
+    write_order_log(path, [[(generator.choice(products_list[:4]), generator.randint(1, 4))
+                            for _ in range(generator.randint(1, 3))] for _ in range(order_count)])
+
+
+def test_parallel_replay_matches_sequential(tmp_path):
+    best_buy, products_list = make_store()
+    write_random_orders(tmp_path / "orders.jsonl", products_list)
+    stats = simulate(best_buy, tmp_path / "orders.jsonl", workers=2, verify=True)
+
+    assert stats["orders"] + stats["rejected"] == 300
+    assert stats["rejected"] > 0
+    assert stats["orders"] == stats["sequential"]["orders"]
+    assert stats["revenue"] == stats["sequential"]["revenue"]
+    assert stats["sold"] == stats["sequential"]["sold"]
+    assert stats["stock_mismatches"] == {}
+    assert products_list[0].quantity == 10_000
+
+
+def test_stock_mismatch_reported(tmp_path):
+    best_buy, products_list = make_store()
+    pixel = products_list[4]
+    write_order_log(tmp_path / "orders.jsonl", [[(pixel, 15)], [(pixel, 15)]])
+    stats = simulate(best_buy, tmp_path / "orders.jsonl", workers=2, verify=True)
+    assert stats["sold"] == {pixel.product_id: 30}
+    assert stats["sequential"]["sold"] == {pixel.product_id: 15}
+    assert stats["stock_mismatches"] == {pixel.product_id: (-10, 5)}
@@ -0,0 +1,125 @@
+import pytest
+import products
+from snapshot import *
+from promotions import *
+
+
+def make_store():
+    """Creates a store with every product kind, promotions and an inactive product."""
+    second_half_price = SecondHalfPrice("Second Half price!")
+    products_list = [Product("MacBook Air M2", price=1450, quantity=100, product_id=7),
+                     NonStockedProduct("Windows License", price=125),
+                     LimitedProduct("Shipping", price=10, quantity=250, limit=1),
+                     Product("Kopfhörer für Öl", price=2.5, quantity=3)]
+    products_list[0].promotion = second_half_price
+    products_list[1].promotion = PercentDiscount("30% off!", percent=30)
+    products_list[2].promotion = second_half_price
+    products_list[3].deactivate()
+    return Store(products_list)
+
+
+def assert_same_products(loaded_products, products_list):
+    """Checks that loaded products match the original products."""
+    assert len(loaded_products) == len(products_list)
+    for loaded, product in zip(loaded_products, products_list):
+        assert isinstance(loaded, type(product))
+        assert str(loaded) == str(product)
+        assert loaded.product_id == product.product_id
+        assert loaded.is_active == product.is_active
+        assert getattr(loaded, "limit", None) == getattr(product, "limit", None)
+        assert type(loaded.promotion) is type(product.promotion)
+    assert loaded_products[0].promotion is loaded_products[2].promotion
+    assert loaded_products[1].promotion.percent == 30
+
+
+def test_snapshot_round_trip(tmp_path):
+    best_buy = make_store()
+    save_snapshot(best_buy, tmp_path / "store.snapshot")
+    loaded_store = load_store(tmp_path / "store.snapshot")
+    assert_same_products(list(loaded_store), list(best_buy))
+    assert loaded_store.order([(list(loaded_store)[0], 2)]) == 2175
+
+
+def test_snapshot_table_is_copy_on_write(tmp_path):
+    save_snapshot(make_store(), tmp_path / "store.snapshot")
+    table = load_snapshot(tmp_path / "store.snapshot")
+    table[0].buy(10)
+    table.append("Ipod", price=100, quantity=150)
+    assert table[0].quantity == 90
+    assert len(table) == 5
+    assert load_snapshot(tmp_path / "store.snapshot")[0].quantity == 100
+
+
+def test_json_of_snapshot(tmp_path):
+    best_buy = make_store()
+    save_snapshot(best_buy, tmp_path / "store.snapshot")
+    export_json(load_store(tmp_path / "store.snapshot"), tmp_path / "store.json")
+    assert_same_products(list(import_json(tmp_path / "store.json")), list(best_buy))
+
+
+# Test that snapshots written with float prices are still loaded, in cents.
+def test_legacy_snapshot(tmp_path):
+    best_buy = make_store()
+    save_snapshot(best_buy, tmp_path / "store.snapshot")
+    data = (tmp_path / "store.snapshot").read_bytes()
+    _, row_count, names_size, promotions_size, _ = HEADER.unpack_from(data)
+    data = bytearray(LEGACY_HEADER.pack(LEGACY_MAGIC, row_count, names_size, promotions_size) + data[HEADER.size:])
+    products_list = list(best_buy)
+    prices_offset = LEGACY_HEADER.size + 8 * len(products_list)
+    data[prices_offset:prices_offset + 8 * len(products_list)] = array("d", [product.price
+                                                                            for product in products_list]).tobytes()
+    (tmp_path / "store.snapshot").write_bytes(data)
+    loaded_products = list(load_snapshot(tmp_path / "store.snapshot"))
+    assert_same_products(loaded_products, products_list)
+    assert [product.price_cents for product in loaded_products] == [145000, 12500, 1000, 250]
+
+    table = load_snapshot(tmp_path / "store.snapshot")
+    row = table.append("Cable", price=0.1, quantity=10)
+    assert table[row].price_cents == 10
+    assert table[0].price_cents == 145000
+
+
+def test_not_a_snapshot(tmp_path):
+    (tmp_path / "store.snapshot").write_bytes(bytes(64))
+    with pytest.raises(ValueError, match="is not a store snapshot"):
+        load_snapshot(tmp_path / "store.snapshot")
+
+
+def test_json_round_trip(tmp_path):
+    best_buy = make_store()
+    export_json(best_buy, tmp_path / "store.json")
+    assert_same_products(list(import_json(tmp_path / "store.json")), list(best_buy))
+
+
+# Test that saved data can only recreate registered promotion classes.
+def test_unknown_promotion_class(tmp_path):
+    export_json(make_store(), tmp_path / "store.json")
+    data = (tmp_path / "store.json").read_text(encoding="utf-8").replace("promotions.SecondHalfPrice", "this.x")
+    (tmp_path / "store.json").write_text(data, encoding="utf-8")
+    with pytest.raises(ValueError, match="Unknown promotion class: this.x"):
+        import_json(tmp_path / "store.json")
+    with pytest.raises(TypeError, match="Promotion class needs to be a subclass of Promotion"):
+        register_promotion(dict)
+
+
+def test_registered_promotion_class(tmp_path):
+    @register_promotion
+    class HalfPrice(Promotion):
+        def apply_promotion(self, product, quantity):
+            return product.price * quantity / 2
+
+    best_buy = make_store()
+    list(best_buy)[0].promotion = HalfPrice("Half price!")
+    export_json(best_buy, tmp_path / "store.json")
+    assert type(list(import_json(tmp_path / "store.json"))[0].promotion) is HalfPrice
+
+
+# Test that products created after loading a snapshot in a new process get unused ids.
+def test_generated_ids_after_load(tmp_path, monkeypatch):
+    best_buy = make_store()
+    save_snapshot(best_buy, tmp_path / "store.snapshot")
+    monkeypatch.setattr(products, "_next_product_id", 1)
+    loaded_store = load_store(tmp_path / "store.snapshot")
+    new_product = Product("New", 10, 5)
+    assert new_product.product_id > max(product.product_id for product in best_buy)
+    loaded_store.add_product([new_product])
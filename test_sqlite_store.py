@@ -0,0 +1,105 @@
+import sqlite3
+import threading
+
+import pytest
+from sqlite_store import *
+from promotions import *
+
+
+def make_products():
+    """Creates products of every kind with promotions."""
+    second_half_price = SecondHalfPrice("Second Half price!")
+    products_list = [Product("MacBook Air M2", price=1450, quantity=100),
+                     NonStockedProduct("Windows License", price=125),
+                     LimitedProduct("Shipping", price=10, quantity=250, limit=1),
+                     Product("Google Pixel 7", price=500, quantity=0)]
+    products_list[0].promotion = second_half_price
+    products_list[1].promotion = PercentDiscount("30% off!", percent=30)
+    products_list[2].promotion = second_half_price
+    return products_list
+
+
+def test_sqlite_store_matches_store():
+    products_list = make_products()
+    sqlite_store = SqliteStore(products=products_list)
+    best_buy = Store(make_products())
+    assert sqlite_store.total_quantity == best_buy.total_quantity == 350
+    assert [str(product) for product in sqlite_store.all_products] == [str(product) for product in
+                                                                       best_buy.all_products]
+    assert products_list[0] in sqlite_store
+    assert Product("MacBook Air M2", price=1450, quantity=100) not in sqlite_store
+
+    shopping_list = [(products_list[0], 3), (products_list[1], 2), (products_list[2], 1)]
+    assert sqlite_store.order(shopping_list) == best_buy.order([(product, quantity) for product, quantity in
+                                                                zip(list(best_buy), [3, 2, 1])])
+    assert sqlite_store.total_quantity == 346
+    assert sqlite_store.all_products[0].promotion is sqlite_store.all_products[2].promotion
+
+
+def test_sqlite_order_is_one_transaction():
+    products_list = make_products()
+    sqlite_store = SqliteStore(products=products_list)
+    with pytest.raises(ValueError, match="Quantity needs to be in range of the Limit"):
+        sqlite_store.order([(products_list[0], 3), (products_list[2], 2)])
+    with pytest.raises(ValueError, match="Ipod not in store"):
+        sqlite_store.order([(products_list[0], 3), (Product("Ipod", price=100, quantity=150), 1)])
+    assert sqlite_store.product_by_id(products_list[0].product_id).quantity == 100
+
+
+def test_sqlite_product_changes_written_back(tmp_path):
+    products_list = make_products()
+    sqlite_store = SqliteStore(tmp_path / "store.db", products=products_list)
+    macbook = sqlite_store.product_by_id(products_list[0].product_id)
+    macbook.price = 1000
+    macbook.promotion = PercentDiscount("10% off!", percent=10)
+    sqlite_store.remove_product(products_list[2])
+    sqlite_store.close()
+
+    reopened = SqliteStore(tmp_path / "store.db")
+    assert [product.name for product in reopened] == ["MacBook Air M2", "Windows License", "Google Pixel 7"]
+    assert str(reopened.product_by_id(products_list[0].product_id)) == ("MacBook Air M2, Price: 1000.00$, "
+                                                                        "Quantity: 100, Promotion: 10% off!")
+    with pytest.raises(ValueError, match="Product id of a product is already in use"):
+        reopened.add_product([products_list[0]])
+
+
+# Test that a change made on another thread during an order is committed on its own.
+def test_sqlite_change_from_other_thread_during_order(monkeypatch):
+    products_list = make_products()
+    sqlite_store = SqliteStore(products=products_list)
+    pixel = sqlite_store.product_by_id(products_list[3].product_id)
+    changed = threading.Event()
+    original_validate = Store._validate_order_line
+
+    def validate_and_wait(product, quantity, claimed=0):
+        changer = threading.Thread(target=lambda: (setattr(pixel, "quantity", 7), changed.set()))
+        changer.start()
+        # The other thread has to wait for the order
+        assert not changed.wait(0.1)
+        original_validate(product, quantity, claimed)
+        raise ValueError("Order failed")
+
+    monkeypatch.setattr(Store, "_validate_order_line", staticmethod(validate_and_wait))
+    with pytest.raises(ValueError, match="Order failed"):
+        sqlite_store.order([(products_list[0], 1)])
+    assert changed.wait(1)
+    assert sqlite_store.product_by_id(pixel.product_id).quantity == 7
+
+
+# Test that prices are stored in cents and databases with float prices are converted.
+def test_sqlite_prices_in_cents(tmp_path):
+    connection = sqlite3.connect(tmp_path / "store.db")
+    connection.executescript(SCHEMA.replace("price_cents INTEGER", "price REAL")
+                             .replace("CREATE INDEX IF NOT EXISTS products_promotion ON products (promotion_id);", ""))
+    connection.execute("INSERT INTO products (product_id, type, name, price, quantity, active) "
+                       "VALUES (1, 'Product', 'Cable', 19.99, 5, 1)")
+    connection.commit()
+    connection.close()
+
+    sqlite_store = SqliteStore(tmp_path / "store.db")
+    cable = sqlite_store.product_by_id(1)
+    assert (cable.price, cable.price_cents) == (19.99, 1999)
+    cable.price = 0.1
+    assert sqlite_store._connection.execute("SELECT price_cents FROM products").fetchall() == [(10,)]
+    assert sqlite_store._connection.execute("SELECT name FROM sqlite_master WHERE type = 'index' "
+                                            "AND name = 'products_promotion'").fetchall() == [("products_promotion",)]
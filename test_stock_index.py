@@ -0,0 +1,57 @@
+import pytest
+from products import Product, NonStockedProduct
+from stock_index import LowStockIndex, ReplenishmentPlanner
+from store import Store
+
+
+def test_stock_order_follows_changes():
+    products_list = [Product(f"Product {number}", price=10, quantity=number + 1) for number in range(10)]
+    best_buy = Store(products_list + [NonStockedProduct("License", price=10)])
+    index = LowStockIndex(best_buy)
+    assert [key for _, key in index.at_risk(3)] == [1, 2, 3]
+
+    best_buy.order([(products_list[9], 10), (products_list[5], 5)])
+    assert index.at_risk(3) == [(products_list[9], 0), (products_list[0], 1), (products_list[5], 1)]
+    assert index.out_of_stock() == [products_list[9]]
+    assert not products_list[9].is_active
+    assert [product for product, _ in index.at_risk(None, below=2)] == [products_list[9], products_list[0],
+                                                                       products_list[5]]
+
+    best_buy.remove_product(products_list[0])
+    added = Product("New", price=10, quantity=0)
+    best_buy.add_product([added])
+    assert index.out_of_stock() == [products_list[9], added]
+    assert len(index.at_risk(None)) == 10
+
+
+def test_heap_is_compacted():
+    product = Product("Ipod", price=10, quantity=10 ** 6)
+    index = LowStockIndex(Store([product]))
+    for _ in range(5000):
+        product.quantity -= 1
+    assert len(index._heap) <= 2 + 1024
+    assert index.at_risk(1) == [(product, 10 ** 6 - 5000)]
+
+
+def test_days_of_cover_and_replenishment():
+    fast = Product("Fast", price=10, quantity=20)
+    slow = Product("Slow", price=10, quantity=5)
+    unknown = Product("Unknown", price=10, quantity=1)
+    best_buy = Store([fast, slow, unknown])
+    index = LowStockIndex(best_buy, key="cover")
+    index.set_daily_demand(fast, 10)
+    index.set_daily_demand(slow, 1)
+    assert index.at_risk(3) == [(fast, 2), (slow, 5), (unknown, float("inf"))]
+
+    best_buy.order([(fast, 20)])
+    planner = ReplenishmentPlanner(index, reorder_point=3, target=7)
+    batches = list(planner.plan(batch_size=1))
+    assert batches == [[(fast, 70)]]
+    ReplenishmentPlanner.receive(batches[0])
+    assert fast.is_active and fast.quantity == 70
+    assert index.at_risk(1) == [(slow, 5)]
+
+    with pytest.raises(ValueError, match="Key needs to be stock or cover: price was given"):
+        LowStockIndex(best_buy, key="price")
+    with pytest.raises(ValueError, match="Target needs to be above the reorder point"):
+        ReplenishmentPlanner(index, reorder_point=3, target=3)
@@ -0,0 +1,390 @@
+import random
+import threading
+import time
+
+import pytest
+from products import *
+from promotions import *
+from store import *
+
+
+# Test that products with the same price are still different products in the store.
+def test_same_price_not_in_store():
+    ipod = Product("Ipod", price=100, quantity=150)
+    ipad = Product("Ipad", price=100, quantity=150)
+    best_buy = Store([ipod])
+    assert ipod in best_buy
+    assert ipad not in best_buy
+
+
+def test_duplicate_product_id():
+    ipod = Product("Ipod", price=100, quantity=150, product_id=1)
+    ipad = Product("Ipad", price=100, quantity=150, product_id=1)
+    with pytest.raises(ValueError, match="Product id 1 of Ipad is already in use"):
+        Store([ipod, ipad])
+
+
+def test_wrong_type_product_id():
+    with pytest.raises(TypeError, match="Product id needs to be an integer: str was given"):
+        Product("Ipod", price=100, quantity=150, product_id="1")
+
+
+def test_remove_product():
+    ipod = Product("Ipod", price=100, quantity=150)
+    ipad = Product("Ipad", price=100, quantity=150)
+    best_buy = Store([ipod, ipad])
+    best_buy.remove_product(ipod)
+    assert ipod not in best_buy
+    assert best_buy.all_products == [ipad]
+    with pytest.raises(ValueError, match="Ipod not found in store"):
+        best_buy.remove_product(ipod)
+
+
+def test_order_product_with_same_price_not_in_store():
+    ipod = Product("Ipod", price=100, quantity=150)
+    ipad = Product("Ipad", price=100, quantity=150)
+    best_buy = Store([ipod])
+    with pytest.raises(ValueError, match="Ipad not in store"):
+        best_buy.order([(ipad, 1)])
+    assert ipad.quantity == 150
+
+
+def make_promotion_products():
+    """Creates products with each kind of promotion for order tests."""
+    macbook = Product("MacBook Air M2", price=1450, quantity=100)
+    macbook.promotion = SecondHalfPrice("Second Half price!")
+    earbuds = Product("Bose QuietComfort Earbuds", price=250, quantity=500)
+    earbuds.promotion = ThirdOneFree("Third One Free!")
+    windows = NonStockedProduct("Windows License", price=125)
+    windows.promotion = PercentDiscount("30% off!", percent=30)
+    pixel = Product("Google Pixel 7", price=500, quantity=250)
+    return [macbook, earbuds, windows, pixel]
+
+
+# Test that the order total matches buying every line on its own.
+def test_order_total_matches_line_by_line():
+    shopping_list = [(product, 5) for product in make_promotion_products()]
+    expected = sum(product.buy(quantity) for product, quantity in shopping_list)
+
+    products_list = make_promotion_products()
+    best_buy = Store(products_list)
+    assert best_buy.order([(product, 5) for product in products_list]) == pytest.approx(expected)
+    assert [product.quantity for product in products_list] == [95, 495, 0, 245]
+
+
+# Test that lines of the same product are bought together.
+def test_order_combines_lines():
+    products_list = make_promotion_products()
+    best_buy = Store(products_list)
+    pixel = products_list[3]
+    assert best_buy.order([(pixel, 2), (pixel, 3)]) == 2500
+    assert pixel.quantity == 245
+
+    macbook = products_list[0]
+    assert best_buy.order([(macbook, 1), (macbook, 1)]) == 1450 + 725
+    assert macbook.quantity == 98
+
+
+def test_order_combined_lines_too_high():
+    pixel = Product("Google Pixel 7", price=500, quantity=3)
+    best_buy = Store([pixel])
+    with pytest.raises(ValueError, match="Quantity of purchase too high for Google Pixel 7"):
+        best_buy.order([(pixel, 2), (pixel, 2)])
+    assert pixel.quantity == 3
+
+
+def test_order_combined_lines_over_limit():
+    shipping = LimitedProduct("Shipping", price=10, quantity=250, limit=1)
+    pixel = Product("Google Pixel 7", price=500, quantity=3)
+    best_buy = Store([pixel, shipping])
+    with pytest.raises(ValueError, match="Quantity needs to be in range of the Limit"):
+        best_buy.order([(pixel, 1), (shipping, 1), (shipping, 1)])
+    assert pixel.quantity == 3
+    assert shipping.quantity == 250
+
+
+# Test that quoting prices carts like orders without changing the stock.
+def test_quote_matches_order():
+    products_list = make_promotion_products()
+    best_buy = Store(products_list)
+    carts = [[(product, 4) for product in products_list],
+             [(products_list[0], 1), (products_list[0], 2)],
+             []]
+    quotes = best_buy.quote(carts)
+    assert [product.quantity for product in products_list] == [100, 500, 0, 250]
+    assert quotes[2] == ([], 0)
+
+    line_totals, cart_total = quotes[0]
+    assert [total for _, _, total in line_totals] == [4350, 750, 350, 2000]
+    assert cart_total == best_buy.order(carts[0])
+    assert quotes[1] == ([(products_list[0], 3, 3625)], best_buy.order(carts[1]))
+
+
+def test_quote_product_not_in_store():
+    ipod = Product("Ipod", price=100, quantity=150)
+    with pytest.raises(ValueError, match="Ipod not in store"):
+        Store([]).quote([[(ipod, 1)]])
+
+
+# Test that an order is rolled back completely when a purchase fails.
+def test_order_rolled_back():
+    class FailingProduct(Product):
+        __slots__ = ()
+
+        def buy(self, quantity):
+            raise ValueError("Payment failed")
+
+    pixel = Product("Google Pixel 7", price=500, quantity=3)
+    failing = FailingProduct("Failing", price=1, quantity=1)
+    best_buy = Store([pixel, failing])
+    with pytest.raises(ValueError, match="Payment failed"):
+        best_buy.order([(pixel, 3), (failing, 1)])
+    assert pixel.quantity == 3
+    assert pixel.is_active
+
+
+class GiftWrappedProduct(Product):
+    __slots__ = ()
+
+    def buy(self, quantity):
+        return super().buy(quantity) + 2.5 * quantity
+
+
+# Test that stores buy through an overridden buy.
+def test_order_uses_overridden_buy():
+    scarf = GiftWrappedProduct("Scarf", price=19.99, quantity=3)
+    best_buy = Store([scarf])
+    assert best_buy.order_cents([(scarf, 2)]) == 4498
+    assert scarf.quantity == 1
+
+
+# Test that batches buy through an overridden buy and reject orders whose purchase fails.
+def test_order_many_uses_overridden_buy():
+    scarf = GiftWrappedProduct("Scarf", price=19.99, quantity=5)
+    ipod = Product("Ipod", price=100, quantity=10)
+    best_buy = Store([scarf, ipod])
+    results = best_buy.order_many([[(scarf, 2), (ipod, 1)], [(scarf, -1)], [(scarf, 1), (ipod, 2)]])
+    assert results[0] == 144.98
+    assert isinstance(results[1], ValueError)
+    assert results[2] == 222.49
+    assert (scarf.quantity, ipod.quantity) == (2, 7)
+
+    def failing_buy(self, quantity):
+        raise ValueError("Out of wrapping paper")
+
+    GiftWrappedProduct.buy, buy = failing_buy, GiftWrappedProduct.buy
+    try:
+        results = best_buy.order_many([[(ipod, 1)], [(scarf, 1), (ipod, 2)]])
+    finally:
+        GiftWrappedProduct.buy = buy
+    assert results[0] == 100
+    assert str(results[1]) == "Out of wrapping paper"
+    assert (scarf.quantity, ipod.quantity) == (2, 6)
+
+
+# Test that items which are not products are rejected with a TypeError.
+def test_order_rejects_non_products():
+    ipod = Product("Ipod", price=100, quantity=10)
+    best_buy = Store([ipod])
+    with pytest.raises(TypeError, match="Expected a Product instance: str was given"):
+        best_buy.order([("Ipod", 1)])
+    results = best_buy.order_many([[("Ipod", 1)], [(ipod, 1)]])
+    assert isinstance(results[0], TypeError)
+    assert results[1] == 100
+    assert ipod.quantity == 9
+
+
+# Test that threads ordering from a concurrent store never oversell.
+def test_concurrent_orders_do_not_oversell():
+    products_list = [Product(f"Product {number}", price=10, quantity=200) for number in range(5)]
+    best_buy = Store(products_list, concurrent=True)
+    sold = [0] * len(products_list)
+    sold_lock = threading.Lock()
+
+    def checkout(seed):
+        generator = random.Random(seed)
+        for _ in range(300):
+            numbers = generator.sample(range(len(products_list)), 2)
+            try:
+                best_buy.order([(products_list[number], 1) for number in numbers])
+            except (ValueError, TypeError):
+                continue
+            with sold_lock:
+                for number in numbers:
+                    sold[number] += 1
+
+    threads = [threading.Thread(target=checkout, args=(seed,)) for seed in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for product, product_sold in zip(products_list, sold):
+        assert product_sold <= 200
+        assert product.quantity == 200 - product_sold
+
+
+# Test that a reservation checked out by several threads at once is bought once.
+def test_concurrent_checkouts_buy_once(monkeypatch):
+    buy_cents = Product.buy_cents
+
+    def slow_buy_cents(self, quantity):
+        # Gives the other threads time to get past the first state check
+        time.sleep(0.01)
+        return buy_cents(self, quantity)
+
+    monkeypatch.setattr(Product, "buy_cents", slow_buy_cents)
+    ipod = Product("Ipod", price=10, quantity=10)
+    best_buy = Store([ipod], concurrent=True)
+    reservation = best_buy.reserve([(ipod, 3)])
+    barrier = threading.Barrier(8)
+    results = []
+
+    def checkout():
+        barrier.wait()
+        try:
+            results.append(best_buy.checkout(reservation))
+        except ValueError as error:
+            results.append(str(error))
+
+    threads = [threading.Thread(target=checkout) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(results, key=str) == [30.0] + 7 * ["Reservation is ordered"]
+    assert ipod.quantity == 7
+    assert best_buy.available(ipod) == 7
+
+
+# Test that a reservation is held again when its checkout fails.
+def test_failed_checkout_keeps_reservation(monkeypatch):
+    ipod = Product("Ipod", price=10, quantity=10)
+    best_buy = Store([ipod])
+    reservation = best_buy.reserve([(ipod, 3)])
+    monkeypatch.setattr(Product, "buy_cents", lambda self, quantity: 1 / 0)
+    with pytest.raises(ZeroDivisionError):
+        best_buy.checkout(reservation)
+    monkeypatch.undo()
+    assert reservation.state == "held"
+    assert best_buy.available(ipod) == 7
+    assert best_buy.checkout(reservation) == 30
+    assert ipod.quantity == 7
+
+
+# Test that the aggregates of the store stay consistent after random changes.
+@pytest.mark.parametrize("seed", range(5))
+def test_aggregates_after_random_changes(seed):
+    generator = random.Random(seed)
+    products_list = make_promotion_products() + [LimitedProduct("Shipping", price=10, quantity=250, limit=3)]
+    best_buy = Store(list(products_list))
+    for _ in range(300):
+        product = generator.choice(products_list)
+        action = generator.randrange(6)
+        if action == 0:
+            product.quantity = generator.randint(0, 50)
+        elif action == 1:
+            product.activate()
+        elif action == 2:
+            product.deactivate()
+        elif action == 3 and product in best_buy:
+            best_buy.remove_product(product)
+        elif action == 4:
+            best_buy.add_product([product])
+        else:
+            try:
+                best_buy.order([(product, generator.randint(1, 3))])
+            except (ValueError, TypeError):
+                pass
+
+        stored_products = list(best_buy)
+        assert best_buy.total_quantity == sum(product.quantity for product in stored_products)
+        assert sorted(best_buy.all_products, key=id) == sorted((product for product in stored_products
+                                                               if product.is_active), key=id)
+        assert sum(best_buy.product_counts.values()) == len(stored_products)
+        assert best_buy.product_counts["LimitedProduct"] == sum(isinstance(product, LimitedProduct)
+                                                                for product in stored_products)
+
+
+def test_reservations_hold_stock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("store.monotonic", lambda: now[0])
+    ipod = Product("Ipod", price=100, quantity=10)
+    mac = LimitedProduct("Mac", price=1000, quantity=10, limit=2)
+    best_buy = Store([ipod, mac])
+
+    reservation = best_buy.reserve([(ipod, 6), (mac, 1)], ttl=60)
+    assert best_buy.available(ipod) == 4
+    assert ipod.quantity == 10
+    with pytest.raises(ValueError, match="Quantity of purchase too high for Ipod"):
+        best_buy.order([(ipod, 5)])
+    with pytest.raises(ValueError, match="Quantity of purchase too high for Ipod"):
+        best_buy.reserve([(ipod, 5)])
+    # The limit counts for all lines of a reservation
+    with pytest.raises(ValueError, match=r"Quantity needs to be in range of the Limit \(2\)"):
+        best_buy.reserve([(mac, 2)], reservation=reservation)
+    assert best_buy.order([(ipod, 4)]) == 400
+
+    best_buy.reserve([(mac, 1)], ttl=60, reservation=reservation)
+    assert best_buy.checkout(reservation) == 2600
+    assert (ipod.quantity, mac.quantity) == (0, 8)
+    assert reservation.state == "ordered"
+    with pytest.raises(ValueError, match="Reservation is ordered"):
+        best_buy.checkout(reservation)
+
+
+def test_reservations_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("store.monotonic", lambda: now[0])
+    ipod = Product("Ipod", price=100, quantity=10)
+    best_buy = Store([ipod], concurrent=True)
+    first = best_buy.reserve([(ipod, 5)], ttl=60)
+    second = best_buy.reserve([(ipod, 3)], ttl=120)
+    # Renewing moves the expiry of the first reservation behind the second one
+    now[0] = 1050.0
+    best_buy.reserve([(ipod, 1)], ttl=100, reservation=first)
+    assert best_buy.available(ipod) == 1
+
+    now[0] = 1125.0
+    assert best_buy.expire_reservations() == 1
+    assert second.state == "expired"
+    assert best_buy.available(ipod) == 4
+    with pytest.raises(ValueError, match="Reservation is expired"):
+        best_buy.checkout(second)
+
+    best_buy.cancel_reservation(first)
+    assert first.state == "cancelled"
+    assert best_buy.available(ipod) == 10
+    now[0] = 2000.0
+    assert best_buy.expire_reservations() == 0
+
+
+def test_order_many():
+    ipod = Product("Ipod", price=100, quantity=5)
+    mac = LimitedProduct("Mac", price=1000, quantity=10, limit=1)
+    license = NonStockedProduct("License", price=10)
+    best_buy = Store([ipod, mac, license])
+    other = Product("Other", price=1, quantity=1)
+
+    results = best_buy.order_many([[(ipod, 3), (license, 2)], [(ipod, 3)], [(mac, 2)], [(other, 1)],
+                                   [(ipod, 1), (mac, 1)], [(ipod, "1")]])
+    assert results[0] == 320
+    assert str(results[1]) == "Quantity of purchase too high for Ipod"
+    assert str(results[2]) == "Quantity needs to be in range of the Limit (1)"
+    assert str(results[3]) == "Other not in store"
+    assert results[4] == 1100
+    assert isinstance(results[5], TypeError)
+    assert (ipod.quantity, mac.quantity) == (1, 9)
+
+
+def test_order_many_priorities():
+    ipod = Product("Ipod", price=100, quantity=5)
+    best_buy = Store([ipod], concurrent=True)
+    results = best_buy.order_many([[(ipod, 3)], [(ipod, 4)], [(ipod, 1)]], priorities=[0, 1, 1])
+    assert isinstance(results[0], ValueError)
+    assert results[1:] == [400, 100]
+    assert ipod.quantity == 0
+    assert not ipod.is_active
+    with pytest.raises(ValueError, match="Expected one priority per shopping list"):
+        best_buy.order_many([[(ipod, 1)]], priorities=[])